@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the DTW kernel on reference landmark sequences.
+
+Compares a pure-Python double loop with the row-vectorized kernel,
+unconstrained and with a Sakoe-Chiba band, and a one-vs-all comparison of
+a query against every reference, looped pairwise vs batched, with and
+without early abandoning.
+
+Usage:
+    python backend/app/benchmarks/bench_dtw.py [query_word] [--window 0.1] [--repeat N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from app.services.dtw import dtw, dtw_features, dtw_one_to_many, frame_distances, landmark_frames
+from app.services.landmark_load import load_reference_sequence
+from app.services.reference_store import reference_store
+
+
+def python_dtw(cost: np.ndarray) -> float:
+    n, m = cost.shape
+    acc = [[float("inf")] * (m + 1) for _ in range(n + 1)]
+    acc[0][0] = 0.0
+    rows = cost.tolist()
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            acc[i][j] = rows[i - 1][j - 1] + min(acc[i - 1][j - 1], acc[i - 1][j], acc[i][j - 1])
+    return acc[n][m]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query", nargs="?", default="hello")
+    parser.add_argument("--window", type=float, default=0.1, help="band half-width as a fraction of length")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    words = reference_store.words()
+    refs = {w: landmark_frames(load_reference_sequence(w)) for w in words}
+    query = refs[args.query]
+    # Pair benchmarks use the reference closest in length to the query
+    other = min((w for w in words if w != args.query), key=lambda w: abs(len(refs[w]) - len(query)))
+    other = refs[other]
+    candidates = [refs[w] for w in words]
+    cost = frame_distances(query, other)
+
+    # Threshold for abandoning: the 3rd best distance, as a k-NN search would use
+    limit = float(np.sort(dtw_one_to_many(query, candidates, window=args.window))[2])
+
+    cases = [
+        ("pair: python loop", lambda: python_dtw(cost)),
+        ("pair: vectorized", lambda: dtw(cost)),
+        ("pair: vectorized + band", lambda: dtw(cost, window=args.window)),
+        ("pair: + path", lambda: dtw(cost, window=args.window, return_path=True)),
+        ("1-vs-all: pairwise loop", lambda: [dtw_features(query, c, window=args.window) for c in candidates]),
+        ("1-vs-all: pairwise + abandon",
+         lambda: [dtw_features(query, c, window=args.window, max_cost=limit) for c in candidates]),
+        ("1-vs-all: batched", lambda: dtw_one_to_many(query, candidates, window=args.window)),
+        ("1-vs-all: batched + abandon",
+         lambda: dtw_one_to_many(query, candidates, window=args.window, max_cost=limit)),
+    ]
+
+    print(f"\nQuery '{args.query}' ({len(query)} frames) vs {len(candidates)} references, "
+          f"band {args.window:.0%}, best of {args.repeat}\n")
+    print(f"{'case':<32}{'ms':>10}")
+    for name, fn in cases:
+        print(f"{name:<32}{best_of(fn, args.repeat) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark extraction throughput for each frame-sampling policy.
+
+'all' runs FaceMesh on every frame and keeps every 10th result, which is what
+the extractors did before sampling policies existed.
+
+Usage:
+    python backend/app/benchmarks/bench_frame_sampling.py [video.mp4] [--repeat N]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from app.services.detector_pool import detector_pool
+from app.services.frame_sampling import SAMPLING_POLICIES, make_sampling_policy
+from app.services.video_convert import _extract_landmarks
+
+DEFAULT_VIDEO = backend_dir / "app" / "services" / "reference_videos" / "hello.mp4"
+
+
+def bench_policy(video_path: Path, policy_name: str, repeat: int) -> dict:
+    policy = make_sampling_policy(policy_name, face_sample_rate=10)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = json.loads(_extract_landmarks(str(video_path), video_path.stem, sampling_policy=policy))
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    return {
+        "policy": policy_name,
+        "frames": output["total_frames"],
+        "frames_with_hands": output["frames_with_hands"],
+        "frames_with_face": output["frames_with_face"],
+        "best_seconds": round(best, 4),
+        "frames_per_second": round(output["total_frames"] / best, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?", type=Path, default=DEFAULT_VIDEO)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Load models up front so the first policy isn't charged for it
+    detector_pool.preload()
+
+    results = [bench_policy(args.video, name, args.repeat) for name in SAMPLING_POLICIES]
+    baseline = results[0]["best_seconds"]
+
+    print(f"\nVideo: {args.video} (best of {args.repeat})\n")
+    print(f"{'policy':<14}{'frames':>8}{'face':>6}{'seconds':>10}{'fps':>8}{'speedup':>9}")
+    for r in results:
+        print(f"{r['policy']:<14}{r['frames']:>8}{r['frames_with_face']:>6}"
+              f"{r['best_seconds']:>10.3f}{r['frames_per_second']:>8.1f}{baseline / r['best_seconds']:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Per-frame cost of turning MediaPipe results into the landmark JSON document.
+
+Rebuilds the MediaPipe landmark protobufs of a recorded landmark file (hands
+on every frame, the face mesh on its face frames) and times, per frame:
+
+  convert    protobuf landmarks -> frame dicts: one dict and three round()
+             calls per landmark (before) vs one vectorized pass (_points)
+  serialize  the whole document: json.dumps(indent=2) (before) vs the compact
+             writer (json_codec), with and without orjson
+
+Both conversions are checked to produce the same frames. Timings are the
+best of --repeat runs, so they show the code's cost rather than noise.
+
+Usage:
+    python backend/app/benchmarks/bench_landmark_convert.py [landmarks.json] [--repeat 5] [--roi]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from mediapipe.framework.formats import landmark_pb2
+
+from app.services import json_codec, video_convert
+from app.services.frame_preprocess import Box, to_full_frame
+from app.services.video_convert import FACE_KEY_POINTS, _landmarks_json, _points
+
+DEFAULT_LANDMARKS = backend_dir / "app" / "gemini" / "test_files" / "example" / "greeting.json"
+FACE_MESH_POINTS = 478
+ROI_BOX = Box(0.1, 0.05, 0.9, 0.95)
+
+
+def landmark_list(points) -> landmark_pb2.NormalizedLandmarkList:
+    proto = landmark_pb2.NormalizedLandmarkList()
+    for p in points:
+        proto.landmark.add(x=p["x"], y=p["y"], z=p["z"])
+    return proto
+
+
+def mediapipe_frames(data: dict) -> list:
+    """(hand landmark lists, face mesh landmarks or None) for each frame of a landmark document."""
+    frames = []
+    for frame in data["frames"]:
+        hands = [landmark_list(hand["landmarks"]) for hand in frame["hands"]]
+        face = None
+        if frame["face_reference"]:
+            mesh = [{"x": 0.5, "y": 0.5, "z": 0.0}] * FACE_MESH_POINTS
+            for name, idx in FACE_KEY_POINTS.items():
+                mesh[idx] = frame["face_reference"][name]
+            face = landmark_list(mesh).landmark
+        frames.append((hands, face))
+    return frames
+
+
+def _point(lm, box) -> dict:
+    x, y, z = to_full_frame(lm.x, lm.y, lm.z, box)
+    return {'x': round(x, 4), 'y': round(y, 4), 'z': round(z, 4)}
+
+
+def convert_before(frames: list, box) -> list:
+    out = []
+    for number, (hands, face) in enumerate(frames):
+        out.append({
+            'frame_number': number,
+            'hands': [{'handedness': 'Left', 'landmarks': [_point(lm, box) for lm in hand.landmark]} for hand in hands],
+            'face_reference': (
+                {name: _point(face[idx], box) for name, idx in FACE_KEY_POINTS.items()} if face is not None else None
+            ),
+        })
+    return out
+
+
+def convert_after(frames: list, box) -> list:
+    out = []
+    for number, (hands, face) in enumerate(frames):
+        face_landmarks = [face[idx] for idx in FACE_KEY_POINTS.values()] if face is not None else []
+        *hand_points, face_points = _points([hand.landmark for hand in hands] + [face_landmarks], box)
+        out.append({
+            'frame_number': number,
+            'hands': [{'handedness': 'Left', 'landmarks': points} for points in hand_points],
+            'face_reference': dict(zip(FACE_KEY_POINTS, face_points)) if face_points else None,
+        })
+    return out
+
+
+def serializer(dumps):
+    """_landmarks_json writing its document with `dumps`."""
+    def serialize(frames: list) -> str:
+        original, video_convert.dumps = video_convert.dumps, dumps
+        try:
+            return _landmarks_json('bench', 30.0, frames, 10, 'every_nth')
+        finally:
+            video_convert.dumps = original
+    return serialize
+
+
+def stdlib_dumps(obj) -> str:
+    orjson, json_codec.orjson = json_codec.orjson, None
+    try:
+        return json_codec.dumps(obj)
+    finally:
+        json_codec.orjson = orjson
+
+
+def best_time(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("landmarks", nargs="?", type=Path, default=DEFAULT_LANDMARKS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--roi", action="store_true", help="map landmarks back from a crop, as FRAME_ROI_CROP=1 does")
+    args = parser.parse_args()
+
+    frames = mediapipe_frames(json.loads(args.landmarks.read_text()))
+    box = ROI_BOX if args.roi else None
+    count = len(frames)
+    hand_count = sum(len(hands) for hands, _ in frames)
+
+    convert = {name: best_time(lambda fn=fn: fn(frames, box), args.repeat)
+               for name, fn in (("before", convert_before), ("after", convert_after))}
+    if convert["before"][1] != convert["after"][1]:
+        sys.exit("vectorized conversion does not match the per-landmark one")
+    converted = convert["after"][1]
+
+    serializers = [("before", serializer(lambda obj: json.dumps(obj, indent=2))),
+                   ("after (stdlib)", serializer(stdlib_dumps))]
+    if json_codec.orjson is not None:
+        serializers.append(("after (orjson)", serializer(json_codec.dumps)))
+    serialize = {name: best_time(lambda fn=fn: fn(converted), args.repeat) for name, fn in serializers}
+
+    print(f"\nLandmarks: {args.landmarks} ({count} frames, {hand_count} hands, roi={bool(box)})\n")
+    print(f"{'stage':<12}{'version':<16}{'us/frame':>10}{'bytes/frame':>13}{'speedup':>9}")
+    for stage, results in (("convert", convert), ("serialize", serialize)):
+        baseline = results["before"][0]
+        for name, (seconds, output) in results.items():
+            size = f"{len(output) / count:.0f}" if isinstance(output, str) else "-"
+            print(f"{stage:<12}{name:<16}{seconds / count * 1e6:>10.1f}{size:>13}{baseline / seconds:>8.1f}x")
+    before = convert["before"][0] + serialize["before"][0]
+    after = convert["after"][0] + min(seconds for seconds, _ in list(serialize.values())[1:])
+    print(f"\ntotal: {before / count * 1e6:.1f} -> {after / count * 1e6:.1f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the rating pipeline, stage by stage.
+
+Everything runs locally: test videos are drawn with OpenCV (a moving
+skin-toned hand shape in front of a face-like oval), the landmark and
+response JSON comes from app/gemini/test_files, and the Gemini client is
+replaced by a stub that answers with a recorded response, so no request
+leaves the machine. Each stage is timed on its own:
+
+    transcode       WebM -> H.264 MP4 with ffmpeg, as uploads were handled
+                    before they were decoded through a pipe (for comparison)
+    decode          PipeDecoder over the upload bytes (WebM and MP4)
+    hand_inference  MediaPipe Hands, per frame
+    face_inference  MediaPipe FaceMesh, per frame
+    serialization   landmark frames -> landmark JSON (_landmarks_json)
+    prompt          prompt encoding + request construction (PROMPT_ENCODING)
+    parse           parse_gemini_json_response on recorded responses
+    evaluate_stub   get_gemini_response end to end against the stub
+
+MediaPipe rarely finds a hand in the drawn frames, so the inference stages
+measure the palm-detection path on every frame (the slow path; tracking a
+found hand is cheaper). Pass real recordings with --video to measure that.
+
+Results are written as JSON (one record per stage and input, with the
+run's commit, machine and configuration) so runs can be compared over
+time; --compare prints the change in median against an earlier file.
+
+Usage:
+    python backend/app/benchmarks/bench_pipeline.py [--video clip.webm ...] [--output results.json]
+                                                   [--compare previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+# getresponse builds a genai client at import; the stub replaces it before any call
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+from app.gemini import getresponse
+from app.gemini.prompt_encoding import encode_landmarks, encode_reference
+from app.services.detector_pool import detector_pool
+from app.services.video_convert import FRAME_SAMPLING_POLICY, _landmarks_json, extractor_fingerprint
+from app.services.video_decode import PipeDecoder
+
+TEST_FILES = backend_dir / "app" / "gemini" / "test_files"
+REFERENCE_JSON = TEST_FILES / "example" / "greeting.json"
+ATTEMPT_JSON = TEST_FILES / "attempt" / "greeting_attempt.json"
+RECORDED_RESPONSES = sorted(TEST_FILES.glob("output_*.json"))
+
+# (name, width, height) of the generated videos; 3 s at 30 fps each
+SYNTHETIC_SIZES = (("synthetic-480p", 640, 480), ("synthetic-720p", 1280, 720))
+SYNTHETIC_SECONDS = 3
+SYNTHETIC_FPS = 30
+
+
+class StubModels:
+    """Answers generate_content with recorded Gemini responses, in turn."""
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.calls = 0
+
+    def generate_content(self, *, model, contents, config=None):
+        text = self.texts[self.calls % len(self.texts)]
+        self.calls += 1
+        return SimpleNamespace(text=text, usage_metadata=None)
+
+
+def install_stub_gemini(texts: List[str]) -> None:
+    getresponse.client = SimpleNamespace(models=StubModels(texts))
+    getresponse.CONTEXT_CACHE_ENABLED = False
+
+
+def recorded_response_texts() -> List[str]:
+    """The recorded results as Gemini returns them: bare, fenced, and wrapped in prose."""
+    texts = []
+    for path in RECORDED_RESPONSES:
+        result = json.dumps(json.loads(path.read_text())["result"], indent=2)
+        texts += [result, f"```json\n{result}\n```", f"Here is the evaluation:\n{result}\nLet me know."]
+    return texts
+
+
+def draw_frame(index: int, width: int, height: int) -> np.ndarray:
+    """One frame of the synthetic signer: a face oval and a hand moving in an arc."""
+    frame = np.full((height, width, 3), (70, 80, 90), np.uint8)
+    scale = height / 480
+    cv2.ellipse(frame, (width // 2, int(150 * scale)), (int(55 * scale), int(75 * scale)), 0, 0, 360,
+                (140, 170, 210), -1)
+    angle = 2 * np.pi * index / SYNTHETIC_FPS
+    cx = int(width / 2 + 140 * scale * np.cos(angle))
+    cy = int(300 * scale + 50 * scale * np.sin(angle))
+    cv2.ellipse(frame, (cx, cy), (int(38 * scale), int(45 * scale)), 0, 0, 360, (120, 160, 205), -1)
+    for finger in range(5):
+        tip = (cx - int((40 - finger * 20) * scale), cy - int((95 - abs(finger - 2) * 12) * scale))
+        cv2.line(frame, (cx - int((30 - finger * 15) * scale), cy - int(30 * scale)), tip,
+                 (120, 160, 205), max(2, int(13 * scale)))
+    return frame
+
+
+def make_synthetic_video(out_dir: Path, name: str, width: int, height: int) -> Dict[str, bytes]:
+    """{'.mp4': ..., '.webm': ...} for a synthetic clip (MP4 from OpenCV, WebM/VP8 like a browser's)."""
+    mp4_path = out_dir / f"{name}.mp4"
+    writer = cv2.VideoWriter(str(mp4_path), cv2.VideoWriter_fourcc(*"mp4v"), SYNTHETIC_FPS, (width, height))
+    for index in range(SYNTHETIC_SECONDS * SYNTHETIC_FPS):
+        writer.write(draw_frame(index, width, height))
+    writer.release()
+    webm_path = out_dir / f"{name}.webm"
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y", "-i", str(mp4_path), "-c:v", "libvpx", "-b:v", "2M", "-an", str(webm_path),
+    ], check=True)
+    return {".mp4": mp4_path.read_bytes(), ".webm": webm_path.read_bytes()}
+
+
+def transcode_to_mp4(video: bytes, suffix: str) -> bytes:
+    """The ffmpeg re-encode uploads went through before pipe decoding."""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / f"upload{suffix}"
+        target = Path(tmp) / "converted.mp4"
+        source.write_bytes(video)
+        subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", str(source), "-c:v", "libx264",
+                        "-preset", "ultrafast", "-an", str(target)], check=True, timeout=60)
+        return target.read_bytes()
+
+
+def decode(video: bytes, suffix: str) -> List[np.ndarray]:
+    with PipeDecoder(video, suffix=suffix) as decoder:
+        return list(decoder)
+
+
+def timed(fn: Callable[[], object], repeat: int) -> List[float]:
+    """Wall times of `repeat` calls, in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def per_frame(model, frames: List[np.ndarray], reset: Callable[[], None], repeat: int) -> List[float]:
+    """Milliseconds per model call, over `repeat` passes that each start with fresh tracking."""
+    samples = []
+    for _ in range(repeat):
+        reset()
+        for rgb in frames:
+            start = time.perf_counter()
+            model.process(rgb)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(stage: str, input_name: str, unit: str, samples: List[float], **extra) -> dict:
+    ordered = sorted(samples)
+    return {
+        "stage": stage,
+        "input": input_name,
+        "unit": unit,
+        "samples": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 4),
+        "min_ms": round(ordered[0], 4),
+        "max_ms": round(ordered[-1], 4),
+        **extra,
+    }
+
+
+def bench_video(name: str, uploads: Dict[str, bytes], repeat: int) -> List[dict]:
+    results = []
+    for suffix, video in uploads.items():
+        if suffix != ".mp4":
+            samples = timed(lambda: transcode_to_mp4(video, suffix), repeat)
+            results.append(summarize("transcode", f"{name}{suffix}", "video", samples, bytes=len(video)))
+        frames = decode(video, suffix)
+        samples = timed(lambda: decode(video, suffix), repeat)
+        results.append(summarize("decode", f"{name}{suffix}", "video", samples, bytes=len(video),
+                                 frames=len(frames), width=frames[0].shape[1], height=frames[0].shape[0]))
+
+    with detector_pool.acquire() as detectors:
+        for stage, model in (("hand_inference", detectors.hands), ("face_inference", detectors.face_mesh)):
+            samples = per_frame(model, frames, detectors.reset, repeat)
+            results.append(summarize(stage, name, "frame", samples,
+                                     width=frames[0].shape[1], height=frames[0].shape[0]))
+        detectors.reset()
+    return results
+
+
+def bench_text_stages(iterations: int) -> List[dict]:
+    reference = REFERENCE_JSON.read_text()
+    attempt = ATTEMPT_JSON.read_text()
+    attempt_data = json.loads(attempt)
+    frames = attempt_data["frames"]
+    encoding = getresponse.PROMPT_ENCODING
+    results = []
+
+    samples = timed(lambda: _landmarks_json(attempt_data["word"], attempt_data["fps"], frames,
+                                            attempt_data["face_sample_rate"], FRAME_SAMPLING_POLICY), iterations)
+    results.append(summarize("serialization", ATTEMPT_JSON.name, "document", samples, frames=len(frames)))
+
+    def build_prompt():
+        getresponse._build_request(encode_reference(reference, encoding),
+                                   getresponse._attempt_contents(encode_landmarks(attempt, encoding)),
+                                   attempt_data["word"])
+
+    samples = timed(build_prompt, iterations)
+    results.append(summarize("prompt", f"{REFERENCE_JSON.name}+{ATTEMPT_JSON.name}", "request", samples,
+                             encoding=encoding.name))
+
+    texts = recorded_response_texts()
+    samples = [ms for text in texts for ms in timed(lambda: getresponse.parse_gemini_json_response(
+        text, word_hint="greeting"), iterations)]
+    results.append(summarize("parse", "recorded responses", "response", samples, responses=len(texts)))
+
+    samples = timed(lambda: getresponse.get_gemini_response(reference, attempt, encoding=encoding), iterations)
+    results.append(summarize("evaluate_stub", f"{REFERENCE_JSON.name}+{ATTEMPT_JSON.name}", "request", samples,
+                             encoding=encoding.name))
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=backend_dir, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_info(args: argparse.Namespace) -> dict:
+    import mediapipe
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": {"opencv": cv2.__version__, "mediapipe": mediapipe.__version__, "numpy": np.__version__},
+        "config": {
+            "extractor": extractor_fingerprint(),
+            "prompt_encoding": getresponse.PROMPT_ENCODING.name,
+            "model": getresponse.MODEL,
+        },
+        "repeat": args.repeat,
+        "iterations": args.iterations,
+    }
+
+
+def compare(results: List[dict], baseline_path: Path) -> None:
+    baseline = {(r["stage"], r["input"]): r for r in json.loads(baseline_path.read_text())["results"]}
+    print(f"\nAgainst {baseline_path} (median, current / baseline):\n")
+    for r in results:
+        before = baseline.get((r["stage"], r["input"]))
+        if before is None:
+            print(f"{r['stage']:<16}{r['input']:<36}{'new':>10}")
+        else:
+            print(f"{r['stage']:<16}{r['input']:<36}{r['p50_ms'] / before['p50_ms']:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", type=Path, action="append", default=[],
+                        help="a real recording to time alongside the synthetic ones (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over each video")
+    parser.add_argument("--iterations", type=int, default=50, help="calls per text stage")
+    parser.add_argument("--output", type=Path,
+                        default=Path(f"bench_pipeline-{datetime.now():%Y%m%d-%H%M%S}.json"))
+    parser.add_argument("--compare", type=Path, help="an earlier results file")
+    args = parser.parse_args()
+
+    install_stub_gemini(recorded_response_texts())
+    detector_pool.preload()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, width, height in SYNTHETIC_SIZES:
+            results += bench_video(name, make_synthetic_video(Path(tmp), name, width, height), args.repeat)
+    for path in args.video:
+        results += bench_video(path.stem, {path.suffix.lower(): path.read_bytes()}, args.repeat)
+    results += bench_text_stages(args.iterations)
+
+    args.output.write_text(json.dumps({"run": run_info(args), "results": results}, indent=2))
+
+    print(f"\n{'stage':<16}{'input':<36}{'unit':<10}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for r in results:
+        print(f"{r['stage']:<16}{r['input']:<36}{r['unit']:<10}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}"
+              f"{r['mean_ms']:>10.3f}")
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Accuracy vs speed of frame preprocessing (frame_preprocess.py).
+
+Extracts a video at full resolution (the current output) and then with each
+resolution cap, with and without the hand/face ROI crop. For each setting it
+reports time, the frames whose hand count differs from the full-resolution
+run, and how far the landmarks of the other frames move (normalized
+full-frame units; 0.005 is about 5 px on a 1080p frame's width).
+
+Without a video argument, a reference video is upscaled to 1080p and 4K with
+ffmpeg to stand in for phone uploads.
+
+Usage:
+    python backend/app/benchmarks/bench_preprocess.py [video.mp4 ...] [--caps 1280 960 640 480]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from app.services.detector_pool import detector_pool
+from app.services.frame_preprocess import RoiCropper
+from app.services.video_convert import _extract_landmarks
+
+DEFAULT_SOURCE = backend_dir / "app" / "services" / "reference_videos" / "greeting.mp4"
+UPSCALED_HEIGHTS = (1080, 2160)
+
+
+def upscale(source: Path, height: int, out_dir: Path) -> Path:
+    out = out_dir / f"{source.stem}-{height}p.mp4"
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y", "-i", str(source), "-vf", f"scale=-2:{height}:flags=bicubic",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-an", str(out),
+    ], check=True)
+    return out
+
+
+def hand_points(frame: dict) -> np.ndarray:
+    return np.array([[[p["x"], p["y"]] for p in hand["landmarks"]] for hand in frame["hands"]])
+
+
+def compare(baseline: dict, output: dict) -> dict:
+    """Frames whose hand count changed, and landmark drift on the rest (hands paired by wrist)."""
+    changed = 0
+    errors = []
+    for a, b in zip(baseline["frames"], output["frames"]):
+        if len(a["hands"]) != len(b["hands"]):
+            changed += 1
+            continue
+        if not a["hands"]:
+            continue
+        pa, pb = hand_points(a), hand_points(b)
+        for hand in pa:
+            nearest = pb[np.argmin(np.linalg.norm(pb[:, 0] - hand[0], axis=1))]
+            errors.append(np.linalg.norm(nearest - hand, axis=1))
+    errors = np.concatenate(errors) if errors else np.zeros(1)
+    return {
+        "hand_count_changed": changed / len(baseline["frames"]),
+        "mean_error": float(errors.mean()),
+        "p95_error": float(np.percentile(errors, 95)),
+    }
+
+
+def run(video: Path, repeat: int, **kwargs) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = json.loads(_extract_landmarks(str(video), video.stem, **kwargs))
+        timings.append(time.perf_counter() - start)
+    return output, min(timings)
+
+
+def bench_video(video: Path, caps: list, repeat: int) -> None:
+    baseline, base_seconds = run(video, repeat)
+    print(f"\nVideo: {video.name} ({baseline['total_frames']} frames), best of {repeat}\n")
+    print(f"{'setting':<18}{'seconds':>9}{'speedup':>9}{'hands changed':>15}{'mean err':>10}{'p95 err':>9}")
+    print(f"{'full (current)':<18}{base_seconds:>9.3f}{1:>8.2f}x")
+
+    # A second full-resolution run shows how much MediaPipe alone varies between runs
+    settings = [("full (rerun)", {})]
+    settings += [(f"cap {cap}", {"max_long_edge": cap}) for cap in caps]
+    settings += [("roi", {"roi": RoiCropper()})]
+    settings += [(f"cap {cap} + roi", {"max_long_edge": cap, "roi": RoiCropper()}) for cap in caps]
+    for name, kwargs in settings:
+        output, seconds = run(video, repeat, **kwargs)
+        r = compare(baseline, output)
+        print(f"{name:<18}{seconds:>9.3f}{base_seconds / seconds:>8.2f}x{r['hand_count_changed']:>15.1%}"
+              f"{r['mean_error']:>10.4f}{r['p95_error']:>9.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="*", type=Path)
+    parser.add_argument("--caps", type=int, nargs="+", default=[1280, 960, 640, 480])
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    detector_pool.preload()
+    with tempfile.TemporaryDirectory() as tmp:
+        videos = args.videos or [upscale(DEFAULT_SOURCE, height, Path(tmp)) for height in UPSCALED_HEIGHTS]
+        for video in videos:
+            bench_video(video, args.caps, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
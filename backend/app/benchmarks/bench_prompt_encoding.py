@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compare prompt size for each landmark encoding.
+
+Encodes a demonstrator/attempt pair with every preset and reports characters
+and estimated tokens for the full request, relative to the raw JSON ('json').
+With --live, each encoding is also sent to Gemini once and the token counts
+and latency reported by the API are printed alongside the score.
+
+Usage:
+    python backend/app/benchmarks/bench_prompt_encoding.py [reference.json attempt.json] [--live]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from app.gemini.prompt_encoding import PRESETS, encode_landmarks, estimate_tokens
+
+TEST_FILES = backend_dir / "app" / "gemini" / "test_files"
+DEFAULT_REFERENCE = TEST_FILES / "example" / "greeting.json"
+DEFAULT_ATTEMPT = TEST_FILES / "attempt" / "greeting_attempt.json"
+
+
+def bench_encoding(reference: str, attempt: str, name: str) -> dict:
+    encoding = PRESETS[name]
+    start = time.perf_counter()
+    text = encode_landmarks(reference, encoding) + encode_landmarks(attempt, encoding)
+    elapsed = time.perf_counter() - start
+    return {
+        "encoding": name,
+        "chars": len(text),
+        "estimated_tokens": estimate_tokens(text),
+        "encode_ms": round(elapsed * 1000, 2),
+    }
+
+
+def live_call(reference: str, attempt: str, name: str) -> dict:
+    from app.gemini.getresponse import get_gemini_response
+    from app.gemini.prompt_encoding import token_usage
+
+    start = time.perf_counter()
+    result = get_gemini_response(reference, attempt, encoding=PRESETS[name])
+    usage = token_usage.stats().get(name, {})
+    return {
+        "score": result.overall_score_0_to_4,
+        "prompt_tokens": usage.get("avg_prompt_tokens", 0),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("reference", nargs="?", type=Path, default=DEFAULT_REFERENCE)
+    parser.add_argument("attempt", nargs="?", type=Path, default=DEFAULT_ATTEMPT)
+    parser.add_argument("--live", action="store_true", help="also call Gemini once per encoding")
+    args = parser.parse_args()
+
+    reference = args.reference.read_text()
+    attempt = args.attempt.read_text()
+
+    results = [bench_encoding(reference, attempt, name) for name in PRESETS]
+    baseline = results[0]["estimated_tokens"]
+
+    print(f"\nReference: {args.reference}\nAttempt:   {args.attempt}\n")
+    print(f"{'encoding':<14}{'chars':>10}{'~tokens':>10}{'encode ms':>11}{'ratio':>8}")
+    for r in results:
+        print(f"{r['encoding']:<14}{r['chars']:>10}{r['estimated_tokens']:>10}"
+              f"{r['encode_ms']:>11.2f}{r['estimated_tokens'] / baseline:>8.2f}")
+
+    if args.live:
+        print(f"\n{'encoding':<14}{'score':>7}{'prompt tokens':>15}{'seconds':>9}")
+        for name in PRESETS:
+            r = live_call(reference, attempt, name)
+            print(f"{name:<14}{r['score']:>7}{r['prompt_tokens']:>15}{r['seconds']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
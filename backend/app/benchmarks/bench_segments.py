@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark segment-parallel extraction against one sequential pass.
+
+Without a video argument, a long recording is made by joining several
+reference videos with ffmpeg. Each worker count extracts the video in that
+many segments on a process pool of that size; the table shows wall time,
+speedup over the sequential pass and how closely the stitched landmarks
+match it (segments start tracking fresh, so frames right after a boundary
+can differ slightly).
+
+Usage:
+    python backend/app/benchmarks/bench_segments.py [video.mp4] [--workers 1 2 4]
+"""
+import argparse
+import json
+import multiprocessing
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from app.services.detector_pool import detector_pool, preload_detectors
+from app.services.segment_extract import extract_video_segmented
+from app.services.video_convert import _extract_landmarks
+
+REFERENCE_VIDEOS = backend_dir / "app" / "services" / "reference_videos"
+JOINED_WORDS = ("hello", "greeting", "father", "family", "thank-you", "sorry", "please", "goodbye")
+
+
+def join_videos(out_path: Path) -> Path:
+    """One video from several reference videos (re-encoded to a common frame rate)."""
+    inputs = [REFERENCE_VIDEOS / f"{word}.mp4" for word in JOINED_WORDS]
+    streams = "".join(f"[{i}:v]" for i in range(len(inputs)))
+    command = ["ffmpeg", "-v", "error", "-y"]
+    for path in inputs:
+        command += ["-i", str(path)]
+    command += [
+        "-filter_complex", f"{streams}concat=n={len(inputs)}:v=1:a=0,fps=30000/1001[v]",
+        "-map", "[v]", "-c:v", "libx264", "-preset", "veryfast", str(out_path),
+    ]
+    subprocess.run(command, check=True)
+    return out_path
+
+
+def agreement(sequential: dict, segmented: dict) -> dict:
+    pairs = list(zip(sequential["frames"], segmented["frames"]))
+    return {
+        "frames_match": sequential["total_frames"] == segmented["total_frames"],
+        "identical_frames": sum(a["hands"] == b["hands"] for a, b in pairs) / len(pairs),
+        "handedness": sum(
+            [h["handedness"] for h in a["hands"]] == [h["handedness"] for h in b["hands"]] for a, b in pairs
+        ) / len(pairs),
+    }
+
+
+def bench_workers(video_path: Path, workers: int, sequential: dict) -> dict:
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=preload_detectors,
+    ) as executor:
+        # Start every worker (and load its models) before timing
+        wait([executor.submit(preload_detectors) for _ in range(workers)])
+        start = time.perf_counter()
+        output = json.loads(extract_video_segmented(str(video_path), video_path.stem, workers, executor))
+        seconds = time.perf_counter() - start
+    return {"workers": workers, "seconds": round(seconds, 3), **agreement(sequential, output)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?", type=Path)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = args.video or join_videos(Path(tmp) / "joined.mp4")
+
+        detector_pool.preload()
+        start = time.perf_counter()
+        sequential = json.loads(_extract_landmarks(str(video), video.stem))
+        baseline = time.perf_counter() - start
+
+        results = [bench_workers(video, workers, sequential) for workers in args.workers]
+
+    print(f"\nVideo: {args.video or 'joined ' + ', '.join(JOINED_WORDS)} "
+          f"({sequential['total_frames']} frames), {multiprocessing.cpu_count()} CPU(s)\n")
+    print(f"{'workers':<11}{'seconds':>9}{'speedup':>9}{'identical':>11}{'handedness':>12}")
+    print(f"{'sequential':<11}{baseline:>9.3f}{1:>8.2f}x")
+    for r in results:
+        print(f"{r['workers']:<11}{r['seconds']:>9.3f}{baseline / r['seconds']:>8.2f}x"
+              f"{r['identical_frames']:>11.1%}{r['handedness']:>12.1%}"
+              + ("" if r["frames_match"] else "  frame count differs"))
+
+
+if __name__ == "__main__":
+    main()
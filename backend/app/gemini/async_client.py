@@ -0,0 +1,292 @@
+"""
+Async Gemini calls with deadlines, retries, hedging and a concurrency cap.
+
+The blocking SDK call used to run in a thread pool with no timeout and no
+retry, so a transient 429/503 from Gemini came back to the user as a score
+of 0. AsyncGeminiClient calls the SDK's async interface (client.aio) over
+one shared httpx connection pool and:
+
+- gives each attempt `attempt_timeout` seconds and the whole call `deadline`
+- retries 408/429/5xx responses, timeouts and connection errors, waiting a
+  jittered exponential backoff (or the server's Retry-After) in between
+- optionally sends a second, hedged request when the first one has not
+  answered after `hedge_after` seconds, and takes whichever answers first
+  (not while every slot is busy, so hedges never add to a backlog)
+- caps in-flight requests at `max_concurrency`; beyond that `max_queue`
+  calls may wait, and further calls are rejected with PoolSaturatedError
+
+A call that still fails with a retryable error at the deadline raises
+GeminiUnavailableError; other errors (bad request, auth) are raised as-is.
+
+generate_content_stream yields the answer in chunks as Gemini generates it,
+under the same limits; it is retried only until the first chunk arrives and
+is never hedged.
+"""
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import httpx
+from google import genai
+from google.genai import errors, types
+
+from ..services.worker_pool import PoolSaturatedError
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class GeminiUnavailableError(Exception):
+    """Gemini kept failing with retryable errors until the call's deadline."""
+
+    status_code = 503
+
+    def __init__(self, reason: str, retry_after: int = 5):
+        super().__init__(f"Gemini is temporarily unavailable ({reason}). Please try again shortly.")
+        self.retry_after = retry_after
+
+
+async def next_chunk(stream: AsyncIterator[Any]) -> Any:
+    """The stream's next chunk, or None at its end (anext(stream, None) needs Python 3.10)."""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS
+    return isinstance(error, (asyncio.TimeoutError, httpx.TransportError))
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from the response's Retry-After header, if it has one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncGeminiClient:
+    """
+    Usage:
+        gemini = AsyncGeminiClient(api_key)
+        response = await gemini.generate_content(model=MODEL, contents=prompt, config=config)
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        max_queue: int = 32,
+        attempt_timeout: float = 20.0,
+        deadline: float = 45.0,
+        max_attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 4.0,
+        hedge_after: Optional[float] = None,
+        random_fraction: Callable[[], float] = random.random,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after or None
+        self._random = random_fraction
+
+        # The connection pool and semaphore belong to the event loop that first used them
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._client: Optional[genai.Client] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self._calls = 0
+        self._in_flight = 0
+        self._stats = dict.fromkeys(
+            ("attempts", "retries", "hedged", "hedge_wins", "timeouts", "unavailable", "failed", "rejected"), 0
+        )
+
+    def _bind(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        limit = 2 * self.max_concurrency  # room for hedged requests
+        self._http = httpx.AsyncClient(
+            timeout=None,  # deadlines are enforced per attempt by this class
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+        )
+        self._client = genai.Client(
+            api_key=self.api_key,
+            http_options=types.HttpOptions(base_url=self.base_url, httpx_async_client=self._http),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop = loop
+
+    async def aclose(self) -> None:
+        """Close the connection pool (call from the loop that used it)."""
+        if self._http is not None and self._loop is asyncio.get_running_loop():
+            await self._http.aclose()
+        self._loop = self._http = self._client = self._semaphore = None
+
+    async def generate_content(self, *, model: str, contents: Any, config: Any = None) -> Any:
+        """
+        client.models.generate_content, with the deadline, retries, hedging and limits above.
+
+        Raises:
+            PoolSaturatedError: if max_concurrency + max_queue calls are already in progress
+            GeminiUnavailableError: if retryable errors persisted until the deadline
+            google.genai.errors.APIError: for errors that retrying can't fix
+        """
+        if self._in_flight >= self.max_concurrency + self.max_queue:
+            self._stats["rejected"] += 1
+            raise PoolSaturatedError("evaluation", 429, 2)
+        self._bind()
+        self._calls += 1
+        self._in_flight += 1
+        try:
+            return await self._with_retries(
+                lambda: self._client.aio.models.generate_content(model=model, contents=contents, config=config)
+            )
+        finally:
+            self._in_flight -= 1
+
+    async def _with_retries(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        give_up_at = time.monotonic() + self.deadline
+        for attempt in range(self.max_attempts):
+            remaining = give_up_at - time.monotonic()
+            try:
+                return await asyncio.wait_for(self._attempt(call), min(self.attempt_timeout, remaining))
+            except Exception as e:
+                if not is_retryable(e):
+                    self._stats["failed"] += 1
+                    raise
+                if isinstance(e, asyncio.TimeoutError):
+                    self._stats["timeouts"] += 1
+                error = e
+
+            if not await self._backoff(attempt, error, give_up_at):
+                break
+        raise self._unavailable(error)
+
+    async def _backoff(self, attempt: int, error: BaseException, give_up_at: float) -> bool:
+        """Wait before the next attempt; False if there is no time or attempt left for one."""
+        delay = self._random() * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        delay = max(delay, _retry_after(error) or 0.0)
+        if attempt + 1 == self.max_attempts or time.monotonic() + delay >= give_up_at:
+            return False
+        self._stats["retries"] += 1
+        await asyncio.sleep(delay)
+        return True
+
+    def _unavailable(self, error: BaseException) -> GeminiUnavailableError:
+        self._stats["unavailable"] += 1
+        reason = "timed out" if isinstance(error, asyncio.TimeoutError) else str(error)[:80] or type(error).__name__
+        return GeminiUnavailableError(reason, retry_after=int(_retry_after(error) or 5))
+
+    async def _limited(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._semaphore:
+            self._stats["attempts"] += 1
+            return await call()
+
+    async def _attempt(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """One attempt: a request, plus a hedged second one if the first is slow."""
+        first = asyncio.ensure_future(self._limited(call))
+        tasks = [first]
+        try:
+            if self.hedge_after is None:
+                return await first
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done and not self._semaphore.locked():
+                self._stats["hedged"] += 1
+                tasks.append(asyncio.ensure_future(self._limited(call)))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self._stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def generate_content_stream(self, *, model: str, contents: Any, config: Any = None) -> AsyncIterator[Any]:
+        """
+        client.models.generate_content_stream: yields response chunks as they
+        are generated. The stream holds one of the max_concurrency slots until
+        it ends. Opening it is retried like generate_content until the first
+        chunk arrives; after that, a chunk that takes longer than
+        attempt_timeout (or passes the deadline) ends the stream with
+        GeminiUnavailableError, since the caller already has part of the answer.
+
+        Raises:
+            the same errors as generate_content
+        """
+        if self._in_flight >= self.max_concurrency + self.max_queue:
+            self._stats["rejected"] += 1
+            raise PoolSaturatedError("evaluation", 429, 2)
+        self._bind()
+        self._calls += 1
+        self._in_flight += 1
+        stream = None
+        try:
+            async with self._semaphore:
+                give_up_at = time.monotonic() + self.deadline
+                stream, chunk = await self._open_stream(model, contents, config, give_up_at)
+                while chunk is not None:
+                    yield chunk
+                    remaining = max(0.0, give_up_at - time.monotonic())
+                    try:
+                        chunk = await asyncio.wait_for(next_chunk(stream), min(self.attempt_timeout, remaining))
+                    except Exception as e:
+                        if not is_retryable(e):
+                            self._stats["failed"] += 1
+                            raise
+                        raise self._unavailable(e)
+        finally:
+            self._in_flight -= 1
+            if stream is not None:
+                await stream.aclose()
+
+    async def _open_stream(self, model: str, contents: Any, config: Any, give_up_at: float):
+        """(the stream, its first chunk or None if it is empty), retrying like _with_retries."""
+        for attempt in range(self.max_attempts):
+            self._stats["attempts"] += 1
+            stream = await self._client.aio.models.generate_content_stream(model=model, contents=contents, config=config)
+            remaining = give_up_at - time.monotonic()
+            try:
+                return stream, await asyncio.wait_for(next_chunk(stream), min(self.attempt_timeout, remaining))
+            except Exception as e:
+                await stream.aclose()
+                if not is_retryable(e):
+                    self._stats["failed"] += 1
+                    raise
+                if isinstance(e, asyncio.TimeoutError):
+                    self._stats["timeouts"] += 1
+                error = e
+            if not await self._backoff(attempt, error, give_up_at):
+                break
+        raise self._unavailable(error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self._calls,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            **self._stats,
+        }
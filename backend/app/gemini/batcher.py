@@ -0,0 +1,122 @@
+"""
+Micro-batching of concurrent evaluations of the same word.
+
+In a classroom, dozens of attempts at the same word arrive within seconds,
+and each used to be its own Gemini call repeating the system prompt and the
+reference. With a collection window set, EvaluationBatcher holds the first
+attempt at a reference for up to `window` seconds; attempts against the same
+reference (and prompt encoding) that arrive meanwhile join it, and the group
+is graded by one `evaluate_batch` call (getresponse.get_gemini_batch_async).
+A group that reaches `max_size` is sent at once.
+
+Every caller awaits its own future, so each gets its own attempt's result,
+or its own error, back. A caller that goes away (e.g. the client disconnected)
+does not affect the rest of its group.
+"""
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..services.metrics import timed_stage
+
+# (demonstrator JSON, attempt JSONs, encoding, cache keys) -> one result or exception per attempt
+BatchEvaluator = Callable[..., Awaitable[List[Any]]]
+
+
+class _Group:
+    """Attempts waiting to be sent together."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.attempts: List[str] = []
+        self.cache_keys: List[Optional[str]] = []
+        self.futures: List["asyncio.Future"] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EvaluationBatcher:
+    """
+    Usage:
+        batcher = EvaluationBatcher(get_gemini_batch_async, window=0.25, max_size=8)
+        if batcher.enabled:
+            result = await batcher.evaluate(reference_json, attempt_json)
+
+    Args:
+        evaluate_batch: grades a list of attempts in one go (see BatchEvaluator)
+        window: seconds the first attempt of a group waits for others; 0 disables batching
+        max_size: most attempts in one group
+    """
+
+    def __init__(self, evaluate_batch: BatchEvaluator, window: float, max_size: int = 8):
+        self.evaluate_batch = evaluate_batch
+        self.window = max(0.0, window)
+        self.max_size = max(1, max_size)
+        self._open: Dict[Tuple[str, Any], _Group] = {}
+        self._tasks: Set["asyncio.Task"] = set()
+        self._stats = dict.fromkeys(("attempts", "batches", "largest"), 0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_size > 1
+
+    async def evaluate(self, demonstrator_json: str, user_attempt_json: str, encoding: Any = None,
+                       cache_key: Optional[str] = None) -> Any:
+        """
+        The result of evaluate_batch for this attempt, once its group has been sent.
+        Raises the exception evaluate_batch returned (or raised) for it.
+        """
+        loop = asyncio.get_running_loop()
+        key = (demonstrator_json, encoding)
+        group = self._open.get(key)
+        if group is None or group.loop is not loop:
+            group = self._open[key] = _Group(loop)
+            group.timer = loop.call_later(self.window, self._send, key, group)
+
+        future = loop.create_future()
+        group.attempts.append(user_attempt_json)
+        group.cache_keys.append(cache_key)
+        group.futures.append(future)
+        self._stats["attempts"] += 1
+        if len(group.attempts) >= self.max_size:
+            group.timer.cancel()
+            self._send(key, group)
+
+        # Includes the time spent waiting for the group to fill
+        with timed_stage("gemini_call"):
+            return await future
+
+    def _send(self, key: Tuple[str, Any], group: _Group) -> None:
+        if self._open.get(key) is group:
+            del self._open[key]
+        self._stats["batches"] += 1
+        self._stats["largest"] = max(self._stats["largest"], len(group.attempts))
+        # A fresh context: the batch's own stages must not land in one caller's timings
+        task = group.loop.create_task(self._run(key, group), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Tuple[str, Any], group: _Group) -> None:
+        demonstrator_json, encoding = key
+        try:
+            results = await self.evaluate_batch(
+                demonstrator_json, group.attempts, encoding=encoding, cache_keys=group.cache_keys
+            )
+        except Exception as e:
+            results = [e] * len(group.futures)
+
+        for future, result in zip(group.futures, results):
+            if future.done():
+                continue  # the caller was cancelled
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "window_ms": round(self.window * 1000, 1),
+            "max_size": self.max_size,
+            "waiting": sum(len(group.attempts) for group in self._open.values()),
+            **self._stats,
+        }
@@ -0,0 +1,169 @@
+"""
+Gemini context caching for the static parts of the evaluation prompt.
+
+The system instruction (task, rules, rubric, output format) never changes, and
+the demonstrator landmarks are identical for every attempt at the same word.
+Instead of resending them on every call, they are uploaded once as cached
+content and requests only carry the user's attempt.
+
+A request can reference a single cached content, so there are two kinds:
+  - the system cache: system instruction only
+  - word caches: system instruction + that word's demonstrator landmarks
+
+Caches are created lazily, their TTL is extended shortly before it runs out,
+and any failure (e.g. content below the model's minimum cacheable size) falls
+back to sending the content inline, so caching can never fail a request.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from google.genai import types
+
+SYSTEM_CACHE_KEY = "__system__"
+
+
+@dataclass
+class _CacheEntry:
+    name: str
+    content_hash: str
+    expires_at: float
+
+
+def demonstrator_contents(demonstrator_json: str) -> str:
+    """The part of the prompt that is cached per word."""
+    return f"""
+DATA TO EVALUATE:
+
+Demonstrator (correct execution):
+{demonstrator_json}
+"""
+
+
+class ContextCache:
+    """
+    Lazily created, auto-renewed cached-content handles.
+
+    Args:
+        client: a google.genai Client (or anything with the same `caches` API)
+        model: model the caches are created for; must match the generate call
+        system_instruction: the static system prompt
+        ttl_seconds: lifetime requested for each cache
+        refresh_margin: renew a cache when it has less than this many seconds left
+        retry_after: after a failed create, wait this long before trying again
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: str,
+        system_instruction: str,
+        ttl_seconds: int = 3600,
+        refresh_margin: int = 300,
+        retry_after: int = 300,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.client = client
+        self.model = model
+        self.system_instruction = system_instruction
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.clock = clock
+
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._counters = {"created": 0, "renewed": 0, "hits": 0, "failures": 0}
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _ttl(self) -> str:
+        return f"{self.ttl_seconds}s"
+
+    def system_handle(self) -> Optional[str]:
+        """Cached-content name holding the system instruction, or None."""
+        return self._handle(SYSTEM_CACHE_KEY, contents=None)
+
+    def word_handle(self, word: str, demonstrator_json: str) -> Optional[str]:
+        """Cached-content name holding the system instruction + the word's reference, or None."""
+        if not word:
+            return None
+        return self._handle(f"word:{word}", contents=demonstrator_contents(demonstrator_json))
+
+    def _handle(self, key: str, contents: Optional[str]) -> Optional[str]:
+        content_hash = hashlib.sha256(
+            (self.system_instruction + (contents or "")).encode()
+        ).hexdigest()
+
+        with self._lock_for(key):
+            now = self.clock()
+            entry = self._entries.get(key)
+
+            if entry is not None and entry.content_hash == content_hash:
+                if entry.expires_at - now > self.refresh_margin:
+                    self._counters["hits"] += 1
+                    return entry.name
+                if entry.expires_at > now and self._renew(entry, now):
+                    return entry.name
+
+            if self._failed_until.get(key, 0) > now:
+                return None
+
+            if entry is not None:
+                # Reference changed (or the cache expired): drop the stale cache
+                self._delete(entry)
+                del self._entries[key]
+
+            return self._create(key, contents, content_hash, now)
+
+    def _create(self, key: str, contents: Optional[str], content_hash: str, now: float) -> Optional[str]:
+        config = types.CreateCachedContentConfig(
+            display_name=f"asl-eval-{key}"[:128],
+            system_instruction=self.system_instruction,
+            contents=[contents] if contents else None,
+            ttl=self._ttl(),
+        )
+        try:
+            cached = self.client.caches.create(model=self.model, config=config)
+        except Exception:
+            self._counters["failures"] += 1
+            self._failed_until[key] = now + self.retry_after
+            return None
+
+        self._failed_until.pop(key, None)
+        self._entries[key] = _CacheEntry(cached.name, content_hash, now + self.ttl_seconds)
+        self._counters["created"] += 1
+        return cached.name
+
+    def _renew(self, entry: _CacheEntry, now: float) -> bool:
+        try:
+            self.client.caches.update(
+                name=entry.name,
+                config=types.UpdateCachedContentConfig(ttl=self._ttl()),
+            )
+        except Exception:
+            return False
+        entry.expires_at = now + self.ttl_seconds
+        self._counters["renewed"] += 1
+        return True
+
+    def _delete(self, entry: _CacheEntry) -> None:
+        try:
+            self.client.caches.delete(name=entry.name)
+        except Exception:
+            pass  # it expires on its own
+
+    def invalidate(self, name: str) -> None:
+        """Forget a handle the API rejected (e.g. deleted or expired server-side)."""
+        for key, entry in list(self._entries.items()):
+            if entry.name == name:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._counters, active=len(self._entries))
@@ -1,16 +1,34 @@
 """
 Gemini API integration for ASL sign language evaluation.
-No caching - sends full prompt on each request.
+The static system prompt and each word's reference are sent once as cached
+content (see context_cache.py); each request only carries the user attempt.
+Several attempts at the same word can share one request and be graded
+together (get_gemini_batch_async, batcher.py).
 """
+import asyncio
+import hashlib
 import json
+import logging
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Any, Dict
+from typing import Optional, Any, AsyncIterator, Callable, Dict, List, Sequence, Tuple, Union
 
 from dotenv import load_dotenv
 from google import genai
+from google.genai import errors as genai_errors, types
 
 from ..schemas.evaluation import EvaluationResponse
+from ..services.metrics import note_fallback, timed_stage
+from ..services.result_cache import cache_key as make_cache_key, evaluation_cache
+from ..services.worker_pool import EVALUATION_QUEUE_SIZE, EVALUATION_WORKERS, PoolSaturatedError
+from .async_client import AsyncGeminiClient, GeminiUnavailableError, next_chunk
+from .batcher import EvaluationBatcher
+from .context_cache import ContextCache, demonstrator_contents
+from .stream_parse import PartialEvaluation
+from .prompt_encoding import (
+    PromptEncoding, encode_landmarks, encode_reference, estimate_tokens, get_encoding, token_usage,
+)
 
 
 load_dotenv(Path(__file__).parents[2] / ".env", override=True)
@@ -18,6 +36,27 @@ API_KEY = os.getenv("GEMINI_API_KEY", "")
 
 client = genai.Client(api_key=API_KEY)
 
+MODEL = "gemini-2.5-flash"
+CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+# How landmarks are written into the prompt; see prompt_encoding.py for the presets
+PROMPT_ENCODING = get_encoding(os.getenv("PROMPT_ENCODING", "json"))
+
+# Limits of the server's async calls (see async_client.py)
+GEMINI_ATTEMPT_TIMEOUT = float(os.getenv("GEMINI_ATTEMPT_TIMEOUT", "20"))
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "45"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+GEMINI_HEDGE_AFTER = float(os.getenv("GEMINI_HEDGE_AFTER", "0"))
+# Attempts at the same word are grouped into one call for up to this long (0: off; see batcher.py)
+GEMINI_BATCH_WINDOW_MS = float(os.getenv("GEMINI_BATCH_WINDOW_MS", "0"))
+# Most attempts graded by one call, for batches from the window and from /api/evaluate-batch
+GEMINI_BATCH_MAX_SIZE = int(os.getenv("GEMINI_BATCH_MAX_SIZE", "8"))
+
+logger = logging.getLogger(__name__)
+
+# Summary of responses that carry no real score; these are never cached
+UNSCORED_SUMMARY = "We couldn’t score this attempt reliably. Please try again."
+
 CONTEXT_PATH = Path(__file__).parent / "context" / "prompt.json"
 with open(CONTEXT_PATH, "r") as f:
     GLOBAL_CONTEXT = json.load(f)
@@ -99,7 +138,7 @@ def _normalize_eval_payload(json_data: dict, *, word_hint: str, raw: str) -> dic
     # Summary
     summary = data.get("summary", "")
     if not isinstance(summary, str) or not summary.strip():
-        summary = "We couldn’t score this attempt reliably. Please try again."
+        summary = UNSCORED_SUMMARY
     data["summary"] = summary.strip()[:400]
 
     # Pros/cons normalize
@@ -117,7 +156,7 @@ def _fallback_response(*, word: str, video_path: str = "", reason: str, raw: str
         "word": word or "unknown",
         "video_path": video_path or "",
         "overall_score_0_to_4": 0,
-        "summary": "We couldn’t score this attempt reliably. Please try again.",
+        "summary": UNSCORED_SUMMARY,
         "pros": {"points": ["Recording received."]},
         "cons": {"points": [reason[:120]]},
         "raw_model_output": (raw or "")[:1500],
@@ -176,69 +215,576 @@ def parse_gemini_json_response(response_text: str, *, word_hint: str = "", video
         )
 
 
-def get_gemini_response(demonstrator_json: str, user_attempt_json: str) -> EvaluationResponse:
-    # Always define word_hint first so it's available everywhere
-    word_hint = ""
-    try:
-        attempt_obj = json.loads(user_attempt_json)
-        if isinstance(attempt_obj, dict):
-            word_hint = str(attempt_obj.get("word", "")).strip()
-    except Exception:
-        pass
+def _extract_json_array(text: str) -> Optional[list]:
+    t = _strip_code_fences(text)
+    start = t.find("[")
+    end = t.rfind("]")
+    if start == -1 or end == -1 or end <= start:
+        return None
+    import re
+    candidate = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', t[start : end + 1])
+    for attempt in (candidate, re.sub(r'[\r\n\t]+', ' ', candidate)):
+        try:
+            items = json.loads(attempt)
+        except Exception:
+            continue
+        return items if isinstance(items, list) else None
+    return None
+
+
+def parse_gemini_batch_response(response_text: str, count: int, *, word_hint: str = "") -> List[Optional[EvaluationResponse]]:
+    """
+    Split a batch answer into one EvaluationResponse per attempt, in attempt order.
+
+    Elements are matched to attempts by their "attempt" number, or by position
+    when it is missing. An attempt whose element is missing, malformed or
+    carries no score gets None, so the caller can evaluate just that one again.
+    """
+    results: List[Optional[EvaluationResponse]] = [None] * count
+    items = _extract_json_array(response_text or "")
+    if items is None:
+        return results
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        item = dict(item)
+        try:
+            index = int(item.pop("attempt", position + 1)) - 1
+        except (TypeError, ValueError):
+            index = position
+        if not 0 <= index < count or results[index] is not None:
+            continue
+        try:
+            result = EvaluationResponse(**_normalize_eval_payload(item, word_hint=word_hint, raw=json.dumps(item)))
+        except Exception:
+            continue
+        if result.summary != UNSCORED_SUMMARY:
+            results[index] = result
+    return results
+
 
-    system_instruction = f"""
-{GLOBAL_CONTEXT.get('task','')}
+def build_system_instruction(context: Dict[str, Any]) -> str:
+    return f"""
+{context.get('task','')}
 
 CONTEXT:
-- Domain: {GLOBAL_CONTEXT['context']['domain']}
-- Description: {GLOBAL_CONTEXT['context']['description']}
-- Data Type: {GLOBAL_CONTEXT['context']['data_type']}
+- Domain: {context['context']['domain']}
+- Description: {context['context']['description']}
+- Data Type: {context['context']['data_type']}
 
 INPUT CONTRACT:
-- Demonstrator Key: {GLOBAL_CONTEXT['input_contract']['demonstrator_key']}
-- User Attempt Key: {GLOBAL_CONTEXT['input_contract']['user_attempt_key']}
-- Alignment: {GLOBAL_CONTEXT['input_contract']['alignment']}
+- Demonstrator Key: {context['input_contract']['demonstrator_key']}
+- User Attempt Key: {context['input_contract']['user_attempt_key']}
+- Alignment: {context['input_contract']['alignment']}
 
 JUDGING RULES:
-- Primary Principle: {GLOBAL_CONTEXT['judging_rules']['primary_principle']}
-- Limitations: {', '.join(GLOBAL_CONTEXT['judging_rules']['limitations'])}
+- Primary Principle: {context['judging_rules']['primary_principle']}
+- Limitations: {', '.join(context['judging_rules']['limitations'])}
 
 JUDGING RUBRIC:
-{json.dumps(GLOBAL_CONTEXT['judging_rubric'], indent=2)}
+{json.dumps(context['judging_rubric'], indent=2)}
 
 OUTPUT REQUIREMENTS:
-{json.dumps(GLOBAL_CONTEXT['output_format'], indent=2)}
+{json.dumps(context['output_format'], indent=2)}
 """
 
-    prompt = f"""
-{system_instruction}
 
-DATA TO EVALUATE:
+# The system instruction is static, so build it once
+SYSTEM_INSTRUCTION = build_system_instruction(GLOBAL_CONTEXT)
 
-Demonstrator (correct execution):
-{demonstrator_json}
+# One async client (and connection pool) for every evaluation the server makes
+gemini_client = AsyncGeminiClient(
+    API_KEY,
+    max_concurrency=EVALUATION_WORKERS,
+    max_queue=EVALUATION_QUEUE_SIZE,
+    attempt_timeout=GEMINI_ATTEMPT_TIMEOUT,
+    deadline=GEMINI_DEADLINE,
+    max_attempts=GEMINI_MAX_ATTEMPTS,
+    hedge_after=GEMINI_HEDGE_AFTER,
+)
 
+context_cache = ContextCache(
+    client,
+    model=MODEL,
+    system_instruction=SYSTEM_INSTRUCTION,
+    ttl_seconds=CONTEXT_CACHE_TTL,
+)
+
+
+def prompt_version(encoding: PromptEncoding) -> str:
+    """Identifies everything about the prompt that can change Gemini's answer."""
+    digest = hashlib.sha256(SYSTEM_INSTRUCTION.encode()).hexdigest()[:16]
+    return f"{MODEL}:{digest}:{encoding}"
+
+
+def _attempt_contents(user_attempt_json: str) -> str:
+    return f"""
 User Attempt (to be evaluated):
 {user_attempt_json}
 
 Return ONLY a single JSON object. No markdown. No extra text.
 """
 
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
+
+def _batch_attempt_contents(user_attempt_jsons: Sequence[str]) -> str:
+    attempts = "\n".join(f"Attempt {i}:\n{attempt}\n" for i, attempt in enumerate(user_attempt_jsons, 1))
+    return f"""
+User Attempts (evaluate each one on its own against the demonstrator):
+{attempts}
+Return ONLY a JSON array with exactly {len(user_attempt_jsons)} objects, one per attempt in the order given.
+Each object has "attempt" set to the attempt's number plus the fields of the output requirements.
+No markdown. No extra text.
+"""
+
+
+def _build_request(demonstrator_json: str, attempt_contents: str, word_hint: str):
+    """
+    Returns (contents, config, cache_name) for the attempt part of the prompt
+    (_attempt_contents or _batch_attempt_contents). Uses the most specific
+    cached content available and sends everything else inline.
+    """
+    if CONTEXT_CACHE_ENABLED:
+        handle = context_cache.word_handle(word_hint, demonstrator_json)
+        if handle:
+            return attempt_contents, types.GenerateContentConfig(cached_content=handle), handle
+
+        handle = context_cache.system_handle()
+        if handle:
+            contents = demonstrator_contents(demonstrator_json) + attempt_contents
+            return contents, types.GenerateContentConfig(cached_content=handle), handle
+
+    prompt = SYSTEM_INSTRUCTION + demonstrator_contents(demonstrator_json) + attempt_contents
+    return prompt, None, None
+
+
+@dataclass
+class _Evaluation:
+    """An evaluation request (one attempt or a batch of them), encoded and ready to send."""
+    word_hint: str
+    encoding: PromptEncoding
+    stored_key: Optional[str]
+    demonstrator_json: str
+    attempt_contents: str
+    contents: Any = None
+    config: Any = None
+    cache_name: Optional[str] = None
+
+    def build(self) -> None:
+        self.contents, self.config, self.cache_name = _build_request(
+            self.demonstrator_json, self.attempt_contents, self.word_hint
         )
 
+    def inline_contents(self) -> str:
+        """The whole prompt, for when a cached-content handle is rejected."""
+        return SYSTEM_INSTRUCTION + demonstrator_contents(self.demonstrator_json) + self.attempt_contents
+
+
+def _word_hint(user_attempt_json: str) -> str:
+    try:
+        attempt_obj = json.loads(user_attempt_json)
+        if isinstance(attempt_obj, dict):
+            return str(attempt_obj.get("word", "")).strip()
+    except Exception:
+        pass
+    return ""
+
+
+def _lookup(
+    demonstrator_json: str, encoding: PromptEncoding, cache_key: Optional[str],
+) -> Tuple[Optional[str], Optional[EvaluationResponse]]:
+    """(the key a scored response is stored under, the stored response if there is one)."""
+    if cache_key is None or evaluation_cache is None:
+        return None, None
+    stored_key = make_cache_key(cache_key, prompt_version(encoding), demonstrator_json)
+    cached = evaluation_cache.get(stored_key)
+    return stored_key, EvaluationResponse.model_validate_json(cached) if cached is not None else None
+
+
+def _encoded(encode: Callable[[str, PromptEncoding], str], landmarks_json: str, encoding: PromptEncoding) -> str:
+    try:
+        return encode(landmarks_json, encoding)
+    except Exception:
+        # malformed landmark JSON: send it as-is and let Gemini judge it
+        return landmarks_json
+
+
+def _encode(demonstrator_json: str, user_attempt_json: str, encoding: PromptEncoding) -> Tuple[str, str]:
+    return (_encoded(encode_reference, demonstrator_json, encoding),
+            _encoded(encode_landmarks, user_attempt_json, encoding))
+
+
+def _prepare(
+    demonstrator_json: str,
+    user_attempt_json: str,
+    encoding: Optional[PromptEncoding],
+    cache_key: Optional[str],
+) -> Tuple[_Evaluation, Optional[EvaluationResponse]]:
+    """(the request to send, a cached response to it if there is one)."""
+    word_hint = _word_hint(user_attempt_json)
+    encoding = encoding or PROMPT_ENCODING
+    stored_key, cached = _lookup(demonstrator_json, encoding, cache_key)
+    if cached is not None:
+        request = _Evaluation(word_hint, encoding, stored_key, demonstrator_json, "")
+        return request, cached
+
+    demonstrator_json, user_attempt_json = _encode(demonstrator_json, user_attempt_json, encoding)
+    request = _Evaluation(word_hint, encoding, stored_key, demonstrator_json, _attempt_contents(user_attempt_json))
+    request.build()
+    return request, None
+
+
+def _record_usage(request: _Evaluation, response: Any, text: Optional[str] = None) -> str:
+    """Record the call's token usage and return the response text (`text` if given)."""
+    usage = token_usage.record(
+        request.encoding.name, estimate_tokens(request.contents), getattr(response, "usage_metadata", None)
+    )
+    logger.info("gemini %s word=%s encoding=%s tokens=%s", MODEL, request.word_hint, request.encoding.name, usage)
+
+    if not text:
         text = getattr(response, "text", None)
-        if not text:
-            text = str(response)
+    if not text:
+        text = str(response)
+    return text or ""
+
+
+def _finish(request: _Evaluation, response: Any, text: Optional[str] = None) -> EvaluationResponse:
+    """Record token usage, parse the response and cache it if it carries a score."""
+    text = _record_usage(request, response, text)
+    with timed_stage("parse"):
+        result = parse_gemini_json_response(text, word_hint=request.word_hint)
+    if result.summary == UNSCORED_SUMMARY:
+        note_fallback()
+    elif request.stored_key is not None:
+        evaluation_cache.put(request.stored_key, result.model_dump_json())
+    return result
+
+
+def _failed(request: _Evaluation, error: Exception,
+            fallback: Optional[Callable[[], EvaluationResponse]]) -> EvaluationResponse:
+    note_fallback()
+    if fallback is not None:
+        logger.warning("gemini call failed for word=%s, using fallback: %s", request.word_hint, error)
+        return fallback()
+    return _fallback_response(
+        word=request.word_hint,
+        reason=f"Gemini API call failed: {error}",
+        raw="",
+    )
+
+
+def _is_cache_error(error: Exception) -> bool:
+    """Whether Gemini rejected a request's cached content (expired, deleted or invalid)."""
+    return (
+        isinstance(error, genai_errors.ClientError)
+        and error.code in (400, 403, 404)
+        and "cache" in str(error).lower()
+    )
+
+
+def get_gemini_response(
+    demonstrator_json: str,
+    user_attempt_json: str,
+    encoding: Optional[PromptEncoding] = None,
+    fallback: Optional[Callable[[], EvaluationResponse]] = None,
+    cache_key: Optional[str] = None,
+) -> EvaluationResponse:
+    """
+    Evaluate an attempt against the demonstrator with Gemini.
+
+    If the API call fails, `fallback` is called for the result when given;
+    otherwise a score-0 "couldn't score" response is returned.
 
-        return parse_gemini_json_response(text or "", word_hint=word_hint)
+    `cache_key` identifies the upload (see main._upload_key). When given,
+    scored responses are cached under it plus the prompt version and the
+    reference, and a cached response is returned without calling Gemini.
+
+    This is the blocking form, for scripts; the server uses get_gemini_response_async.
+    """
+    request, cached = _prepare(demonstrator_json, user_attempt_json, encoding, cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        with timed_stage("gemini_call"):
+            try:
+                response = client.models.generate_content(
+                    model=MODEL,
+                    contents=request.contents,
+                    config=request.config,
+                )
+            except Exception as e:
+                if request.cache_name is None or not _is_cache_error(e):
+                    raise
+                # The cache was deleted or expired server-side: forget it, go inline
+                context_cache.invalidate(request.cache_name)
+                response = client.models.generate_content(model=MODEL, contents=request.inline_contents())
+        return _finish(request, response)
 
     except Exception as e:
-        return _fallback_response(
-            word=word_hint,
-            reason=f"Gemini API call failed: {e}",
-            raw="",
-        )
\ No newline at end of file
+        return _failed(request, e, fallback)
+
+
+async def _generate(request: _Evaluation) -> Any:
+    """Send a prepared request through gemini_client."""
+    try:
+        return await gemini_client.generate_content(model=MODEL, contents=request.contents, config=request.config)
+    except genai_errors.APIError as e:
+        if request.cache_name is None or not _is_cache_error(e):
+            raise
+        # The cache was deleted or expired server-side: forget it, go inline
+        context_cache.invalidate(request.cache_name)
+        return await gemini_client.generate_content(model=MODEL, contents=request.inline_contents())
+
+
+async def get_gemini_response_async(
+    demonstrator_json: str,
+    user_attempt_json: str,
+    encoding: Optional[PromptEncoding] = None,
+    fallback: Optional[Callable[[], EvaluationResponse]] = None,
+    cache_key: Optional[str] = None,
+    batch: bool = False,
+) -> EvaluationResponse:
+    """
+    get_gemini_response for the event loop, through gemini_client (see
+    async_client.py): calls have a deadline, transient errors are retried
+    and in-flight calls are capped.
+
+    When Gemini stays unavailable (429/5xx/timeouts until the deadline) or
+    too many calls are waiting, `fallback` answers if given; otherwise the
+    error is raised so the user is asked to retry rather than scored 0.
+    Other failures are handled as in get_gemini_response.
+
+    With `batch`, the attempt may wait up to GEMINI_BATCH_WINDOW_MS to be
+    graded in one call with other attempts at the same word (see batcher.py).
+
+    Raises:
+        GeminiUnavailableError: Gemini kept failing with retryable errors
+        PoolSaturatedError: max concurrent + queued Gemini calls reached
+    """
+    try:
+        if batch and evaluation_batcher.enabled:
+            result = await evaluation_batcher.evaluate(demonstrator_json, user_attempt_json, encoding, cache_key)
+            if result.summary == UNSCORED_SUMMARY:
+                note_fallback()
+            return result
+        return await _evaluate_one(demonstrator_json, user_attempt_json, encoding, cache_key,
+                                   reraise=fallback is not None)
+
+    except Exception as e:
+        if fallback is None:
+            raise
+        note_fallback()
+        logger.warning("gemini call failed for word=%s, using fallback: %s", _word_hint(user_attempt_json), e)
+        # The local scorer is CPU work: keep it off the event loop too
+        return await asyncio.to_thread(fallback)
+
+
+async def _evaluate_one(
+    demonstrator_json: str, user_attempt_json: str, encoding: Optional[PromptEncoding], cache_key: Optional[str],
+    reraise: bool = False,
+) -> EvaluationResponse:
+    """
+    One attempt, one call. Other than GeminiUnavailableError and
+    PoolSaturatedError, a failed call is answered "couldn't score" unless
+    `reraise` (the caller has a fallback) is set.
+    """
+    # Encoding and creating cached content (a blocking API call) stay off the event loop
+    request, cached = await asyncio.to_thread(_prepare, demonstrator_json, user_attempt_json, encoding, cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        with timed_stage("gemini_call"):
+            response = await _generate(request)
+        return _finish(request, response)
+    except Exception as e:
+        if reraise or isinstance(e, (GeminiUnavailableError, PoolSaturatedError)):
+            raise
+        return _failed(request, e, None)
+
+
+async def _generate_stream(request: _Evaluation) -> AsyncIterator[Any]:
+    """Stream a prepared request through gemini_client."""
+    stream = gemini_client.generate_content_stream(model=MODEL, contents=request.contents, config=request.config)
+    try:
+        try:
+            first = await next_chunk(stream)
+        except genai_errors.APIError as e:
+            if request.cache_name is None or not _is_cache_error(e):
+                raise
+            # The cache was deleted or expired server-side: forget it, go inline
+            context_cache.invalidate(request.cache_name)
+            await stream.aclose()
+            stream = gemini_client.generate_content_stream(model=MODEL, contents=request.inline_contents())
+            first = await next_chunk(stream)
+        if first is None:
+            return
+        yield first
+        async for chunk in stream:
+            yield chunk
+    finally:
+        await stream.aclose()
+
+
+def _preview(field: str, value: Any) -> Tuple[str, Dict[str, Any]]:
+    """A field read from the partial answer, normalized as in the final response."""
+    if field == "overall_score_0_to_4":
+        try:
+            score = min(4, max(0, int(value)))
+        except (TypeError, ValueError):
+            score = 0
+        return "score", {field: score}
+    if field == "summary":
+        return "summary", {field: str(value).strip()[:400]}
+    return field, _ensure_points(value)
+
+
+async def stream_gemini_response(
+    demonstrator_json: str,
+    user_attempt_json: str,
+    encoding: Optional[PromptEncoding] = None,
+    cache_key: Optional[str] = None,
+    fallback: Optional[Callable[[], EvaluationResponse]] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Evaluate an attempt like get_gemini_response_async, streaming Gemini's answer.
+
+    Yields ("score", {...}), ("summary", {...}), ("pros", {"points": [...]})
+    and ("cons", {...}) as each field becomes readable in the partial answer
+    (see stream_parse.py), then ("result", EvaluationResponse): the whole
+    answer, parsed and validated as get_gemini_response would. The previews
+    can differ from the result, e.g. when the answer turns out not to be
+    valid JSON. A cached response is yielded as the result straight away.
+    When the call fails, `fallback` gives the result if given, as for
+    get_gemini_response.
+
+    Raises:
+        GeminiUnavailableError / PoolSaturatedError: as get_gemini_response_async
+            (possibly after some previews were yielded)
+    """
+    request, cached = await asyncio.to_thread(_prepare, demonstrator_json, user_attempt_json, encoding, cache_key)
+    if cached is not None:
+        yield "result", cached
+        return
+
+    partial = PartialEvaluation()
+    last = None
+    try:
+        with timed_stage("gemini_call"):
+            async for chunk in _generate_stream(request):
+                last = chunk
+                for field, value in partial.feed(getattr(chunk, "text", None) or ""):
+                    yield _preview(field, value)
+    except (GeminiUnavailableError, PoolSaturatedError):
+        raise
+    except Exception as e:
+        # The fallback (the local scorer) is CPU work: keep it off the event loop
+        yield "result", await asyncio.to_thread(_failed, request, e, fallback)
+        return
+    # The last chunk carries the usage metadata for the whole call
+    yield "result", _finish(request, last, partial.text)
+
+
+def _prepare_batch(
+    demonstrator_json: str,
+    user_attempt_jsons: List[str],
+    encoding: Optional[PromptEncoding],
+    cache_keys: List[Optional[str]],
+) -> Tuple[Optional[_Evaluation], List[int], List[Optional[str]], List[Optional[EvaluationResponse]]]:
+    """
+    (one request for every attempt without a cached response, their indices,
+    every attempt's stored key, every attempt's cached response or None).
+    """
+    encoding = encoding or PROMPT_ENCODING
+    stored_keys, results = [], []
+    for cache_key in cache_keys:
+        stored_key, cached = _lookup(demonstrator_json, encoding, cache_key)
+        stored_keys.append(stored_key)
+        results.append(cached)
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if len(pending) < 2:
+        return None, pending, stored_keys, results
+
+    encoded_reference = _encoded(encode_reference, demonstrator_json, encoding)
+    attempts = [_encoded(encode_landmarks, user_attempt_jsons[i], encoding) for i in pending]
+    word_hint = _word_hint(user_attempt_jsons[pending[0]])
+    request = _Evaluation(word_hint, encoding, None, encoded_reference, _batch_attempt_contents(attempts))
+    request.build()
+    return request, pending, stored_keys, results
+
+
+async def _evaluate_batch(
+    demonstrator_json: str,
+    user_attempt_jsons: List[str],
+    encoding: Optional[PromptEncoding],
+    cache_keys: List[Optional[str]],
+) -> List[Union[EvaluationResponse, Exception]]:
+    request, pending, stored_keys, results = await asyncio.to_thread(
+        _prepare_batch, demonstrator_json, user_attempt_jsons, encoding, cache_keys
+    )
+    if request is not None:
+        try:
+            with timed_stage("gemini_call"):
+                response = await _generate(request)
+            text = _record_usage(request, response)
+            with timed_stage("parse"):
+                parsed = parse_gemini_batch_response(text, len(pending), word_hint=request.word_hint)
+            for i, result in zip(pending, parsed):
+                results[i] = result
+                if result is not None and stored_keys[i] is not None:
+                    evaluation_cache.put(stored_keys[i], result.model_dump_json())
+        except (GeminiUnavailableError, PoolSaturatedError) as e:
+            # Asking again one by one would only add load to a Gemini that is already failing
+            for i in pending:
+                results[i] = e
+        except Exception as e:
+            logger.warning("gemini batch call failed for word=%s, evaluating one by one: %s", request.word_hint, e)
+
+    # Attempts the batch could not answer (or a lone attempt) get a call of their own
+    missing = [i for i, result in enumerate(results) if result is None]
+    singles = await asyncio.gather(*(
+        _evaluate_one(demonstrator_json, user_attempt_jsons[i], encoding, cache_keys[i]) for i in missing
+    ), return_exceptions=True)
+    for i, result in zip(missing, singles):
+        results[i] = result
+    return results
+
+
+async def get_gemini_batch_async(
+    demonstrator_json: str,
+    user_attempt_jsons: Sequence[str],
+    encoding: Optional[PromptEncoding] = None,
+    cache_keys: Optional[Sequence[Optional[str]]] = None,
+) -> List[Union[EvaluationResponse, Exception]]:
+    """
+    Evaluate several attempts at the same word against one demonstrator,
+    GEMINI_BATCH_MAX_SIZE attempts per Gemini call.
+
+    The prompt carries the system instruction and reference once, then the
+    numbered attempts, and asks for a JSON array with one evaluation per
+    attempt. Cached responses are used as in get_gemini_response (one
+    `cache_keys` entry per attempt). An attempt whose element of the answer
+    is missing or unusable is evaluated again on its own, so one bad element
+    never costs the others their result.
+
+    Returns a list in the order of `user_attempt_jsons`, each an
+    EvaluationResponse or the GeminiUnavailableError / PoolSaturatedError
+    that stopped that attempt from being graded.
+    """
+    attempts = list(user_attempt_jsons)
+    keys = list(cache_keys) if cache_keys is not None else [None] * len(attempts)
+    size = max(1, GEMINI_BATCH_MAX_SIZE)
+    chunks = await asyncio.gather(*(
+        _evaluate_batch(demonstrator_json, attempts[i:i + size], encoding, keys[i:i + size])
+        for i in range(0, len(attempts), size)
+    ))
+    return [result for chunk in chunks for result in chunk]
+
+
+evaluation_batcher = EvaluationBatcher(
+    get_gemini_batch_async,
+    window=GEMINI_BATCH_WINDOW_MS / 1000,
+    max_size=GEMINI_BATCH_MAX_SIZE,
+)
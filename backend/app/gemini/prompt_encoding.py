@@ -0,0 +1,203 @@
+"""
+Token-lean encodings of landmark data for the Gemini prompt.
+
+The extractor's JSON repeats "x"/"y"/"z" keys for every point and includes
+frames with no hands and `face_reference: null` entries, which costs tens of
+thousands of tokens per request. A PromptEncoding sits between
+convert_video_to_json and the prompt and can:
+
+  - lay landmarks out as one compact text row per hand per frame ("table")
+  - quantize coordinates to integers (e.g. value * 1000)
+  - delta-encode each hand against its previous row
+  - drop frames without hands
+  - keep only every Nth frame
+  - drop the z (depth) coordinate
+
+The demonstrator and the attempt are always encoded the same way. Token usage
+per encoding is recorded from Gemini's usage metadata so encodings can be
+compared on latency and cost against scoring quality.
+"""
+import json
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+
+@dataclass(frozen=True)
+class PromptEncoding:
+    name: str = "json"
+    format: str = "json"             # "json" or "table"
+    quantize: Optional[int] = None   # scale factor for integer coordinates, None = 4 decimals
+    delta: bool = False              # table only: rows hold the change since the same hand's last row
+    drop_empty_frames: bool = False  # skip frames with no hands and no face sample
+    frame_stride: int = 1            # keep frames whose number is a multiple of this
+    include_z: bool = True
+
+    @property
+    def is_passthrough(self) -> bool:
+        return (self.format == "json" and not self.drop_empty_frames
+                and self.frame_stride <= 1 and self.include_z and self.quantize is None)
+
+
+PRESETS = {
+    "json": PromptEncoding(),
+    "json_min": PromptEncoding(name="json_min", drop_empty_frames=True),
+    "table": PromptEncoding(name="table", format="table", quantize=1000, drop_empty_frames=True),
+    "table_delta": PromptEncoding(name="table_delta", format="table", quantize=1000, delta=True,
+                                  drop_empty_frames=True),
+    "table_lean": PromptEncoding(name="table_lean", format="table", quantize=1000, delta=True,
+                                 drop_empty_frames=True, frame_stride=2, include_z=False),
+}
+
+
+def get_encoding(name: str) -> PromptEncoding:
+    try:
+        return PRESETS[name]
+    except KeyError:
+        raise ValueError(f"Unknown prompt encoding '{name}'. Options: {', '.join(PRESETS)}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) for comparing encodings offline."""
+    return (len(text) + 3) // 4
+
+
+def _keep_frame(frame: Dict[str, Any], enc: PromptEncoding) -> bool:
+    if frame.get("frame_number", 0) % max(1, enc.frame_stride) != 0:
+        return False
+    if enc.drop_empty_frames and not frame.get("hands") and not frame.get("face_reference"):
+        return False
+    return True
+
+
+def _coords(point: Dict[str, float], enc: PromptEncoding) -> List[Union[int, float]]:
+    keys = ("x", "y", "z") if enc.include_z else ("x", "y")
+    if enc.quantize:
+        return [int(round(point[k] * enc.quantize)) for k in keys]
+    return [round(point[k], 4) for k in keys]
+
+
+def _encode_json(data: Dict[str, Any], enc: PromptEncoding) -> str:
+    frames = []
+    for frame in data.get("frames", []):
+        if not _keep_frame(frame, enc):
+            continue
+        out = {"frame_number": frame["frame_number"]}
+        out["hands"] = [
+            {"handedness": h["handedness"], "landmarks": [_coords(p, enc) for p in h["landmarks"]]}
+            for h in frame.get("hands", [])
+        ]
+        if frame.get("face_reference"):
+            out["face_reference"] = {k: _coords(p, enc) for k, p in frame["face_reference"].items()}
+        frames.append(out)
+
+    meta = {k: v for k, v in data.items() if k not in ("frames", "video_file")}
+    meta["point_format"] = ["x", "y", "z"] if enc.include_z else ["x", "y"]
+    if enc.quantize:
+        meta["coordinate_scale"] = enc.quantize
+    meta["frames"] = frames
+    return json.dumps(meta, separators=(",", ":"))
+
+
+def _encode_table(data: Dict[str, Any], enc: PromptEncoding) -> str:
+    axes = "x y z" if enc.include_z else "x y"
+    scale = f"integers equal to value * {enc.quantize}" if enc.quantize else "decimals"
+    lines = [
+        f"word: {data.get('word', '')} | fps: {round(float(data.get('fps') or 0), 2)} | "
+        f"total_frames: {data.get('total_frames', len(data.get('frames', [])))}",
+        f"hand rows: f<frame> <L|R><=|~> then 21 MediaPipe hand points in order, each as '{axes}'",
+        f"coordinates: {scale}; x, y normalized to the image (mirrored selfie view), z relative depth",
+    ]
+    if enc.delta:
+        lines.append("'=' rows are absolute; '~' rows are the change since that hand's previous row")
+    if enc.drop_empty_frames:
+        lines.append("frames with no hands are omitted")
+    if enc.frame_stride > 1:
+        lines.append(f"only every {enc.frame_stride}th frame is included")
+    face_names = data.get("face_key_points_info", [])
+    if face_names:
+        lines.append(f"face rows: f<frame> face then points {', '.join(face_names)}, each as '{axes}'")
+
+    previous: Dict[tuple, List[Union[int, float]]] = {}
+    for frame in data.get("frames", []):
+        if not _keep_frame(frame, enc):
+            continue
+        f = frame["frame_number"]
+        seen: Dict[str, int] = {}
+        present = set()
+        for hand in frame.get("hands", []):
+            label = hand["handedness"]
+            key = (label, seen.get(label, 0))
+            seen[label] = key[1] + 1
+            present.add(key)
+
+            values = [v for p in hand["landmarks"] for v in _coords(p, enc)]
+            if enc.delta and key in previous:
+                row = [round(a - b, 4) for a, b in zip(values, previous[key])]
+                marker = "~"
+            else:
+                row = values
+                marker = "="
+            previous[key] = values
+            lines.append(f"f{f} {label[0]}{marker} " + " ".join(str(v) for v in row))
+
+        # A hand that disappears restarts from an absolute row when it comes back
+        for key in list(previous):
+            if key not in present:
+                del previous[key]
+
+        face = frame.get("face_reference")
+        if face:
+            values = [v for name in face_names for v in _coords(face[name], enc)]
+            lines.append(f"f{f} face " + " ".join(str(v) for v in values))
+
+    return "\n".join(lines)
+
+
+def encode_landmarks(landmark_json: str, encoding: PromptEncoding) -> str:
+    """Encode a landmark JSON string for the prompt."""
+    if encoding.is_passthrough:
+        return landmark_json
+    data = json.loads(landmark_json)
+    if encoding.format == "table":
+        return _encode_table(data, encoding)
+    return _encode_json(data, encoding)
+
+
+# References are identical for every attempt at a word (and the reference store
+# hands out the same string object), so their encodings are memoized.
+encode_reference = lru_cache(maxsize=64)(encode_landmarks)
+
+
+class TokenUsage:
+    """Per-encoding token counts reported by Gemini."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_encoding: Dict[str, Dict[str, int]] = {}
+
+    def record(self, encoding_name: str, estimated_tokens: int, usage_metadata: Any) -> Dict[str, int]:
+        usage = {
+            "requests": 1,
+            "estimated_tokens": estimated_tokens,
+            "prompt_tokens": getattr(usage_metadata, "prompt_token_count", None) or 0,
+            "cached_tokens": getattr(usage_metadata, "cached_content_token_count", None) or 0,
+            "output_tokens": getattr(usage_metadata, "candidates_token_count", None) or 0,
+        }
+        with self._lock:
+            totals = self._by_encoding.setdefault(encoding_name, dict.fromkeys(usage, 0))
+            for k, v in usage.items():
+                totals[k] += v
+        return usage
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for name, totals in self._by_encoding.items():
+                n = totals["requests"] or 1
+                out[name] = dict(totals, **{f"avg_{k}": round(v / n, 1) for k, v in totals.items() if k != "requests"})
+            return out
+
+
+token_usage = TokenUsage()
@@ -0,0 +1,59 @@
+"""
+Reading evaluation fields out of Gemini's answer while it is still being generated.
+
+Gemini writes the evaluation as one JSON object, so the score usually comes
+first and the summary, pros and cons follow. PartialEvaluation is fed the
+streamed text as it arrives and reports each field as soon as its value is
+complete, so the user sees the score long before the last token. The final
+answer is still parsed and validated as a whole (parse_gemini_json_response);
+these early values are only a preview of it.
+"""
+import json
+import re
+from typing import Any, List, Tuple
+
+# Fields in the order the output format lists them
+FIELDS = ("overall_score_0_to_4", "summary", "pros", "cons")
+
+_decoder = json.JSONDecoder()
+
+
+class PartialEvaluation:
+    """
+    Usage:
+        partial = PartialEvaluation()
+        for chunk in stream:
+            for field, value in partial.feed(chunk.text):
+                ...  # ("overall_score_0_to_4", 3), ("summary", "..."), ("pros", {...}), ...
+    """
+
+    def __init__(self, fields: Tuple[str, ...] = FIELDS):
+        self.text = ""
+        self._pending = list(fields)
+        self._keys = {field: re.compile(rf'"{re.escape(field)}"\s*:\s*') for field in fields}
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Add the next piece of output; returns the fields whose values just became complete."""
+        self.text += text or ""
+        found = []
+        for field in list(self._pending):
+            value = self._value(field)
+            if value is not _INCOMPLETE:
+                self._pending.remove(field)
+                found.append((field, value))
+        return found
+
+    def _value(self, field: str) -> Any:
+        match = self._keys[field].search(self.text)
+        if match is None:
+            return _INCOMPLETE
+        try:
+            value, end = _decoder.raw_decode(self.text, match.end())
+        except ValueError:
+            return _INCOMPLETE
+        if end == len(self.text) and not isinstance(value, (str, list, dict)):
+            return _INCOMPLETE  # a number may still have digits to come
+        return value
+
+
+_INCOMPLETE = object()
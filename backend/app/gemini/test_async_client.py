@@ -0,0 +1,239 @@
+"""
+Tests for the async Gemini client, against a local fake of the Gemini REST API.
+Run with: python -m pytest backend/app/gemini/test_async_client.py
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from app.gemini import getresponse
+from app.gemini.async_client import AsyncGeminiClient, GeminiUnavailableError
+from app.schemas.evaluation import EvaluationResponse
+from app.services.worker_pool import PoolSaturatedError
+from google.genai import errors
+
+ANSWER = '{"overall_score_0_to_4": 3, "summary": "Good", "pros": [], "cons": []}'
+
+
+class FakeGemini(ThreadingHTTPServer):
+    """
+    Answers generateContent requests. `script` holds (status, delay) for the
+    next requests in turn; once it is empty every request gets (200, delay).
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeGeminiHandler)
+        self.script = []
+        self.delay = 0.0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.client_ports = set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            status, delay = server.script.pop(0) if server.script else (200, server.delay)
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.client_ports.add(self.client_address[1])
+        try:
+            time.sleep(delay)
+            streaming = "streamGenerateContent" in self.path
+            if status == 200 and streaming:
+                # Server-Sent Events, one per piece of the answer
+                pieces = [ANSWER[i:i + 10] for i in range(0, len(ANSWER), 10)]
+                payload = b"".join(
+                    b"data: " + json.dumps({"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]})
+                    .encode() + b"\r\n\r\n" for piece in pieces
+                )
+            elif status == 200:
+                body = {"candidates": [{"content": {"role": "model", "parts": [{"text": ANSWER}]}}]}
+                payload = json.dumps(body).encode()
+            else:
+                body = {"error": {"code": status, "message": "fake error", "status": "UNAVAILABLE"}}
+                payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "text/event-stream" if status == 200 and streaming else "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client cancelled the request
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_gemini():
+    server = FakeGemini()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, **kwargs):
+    options = dict(attempt_timeout=2.0, deadline=5.0, backoff_base=0.01, backoff_max=0.05)
+    options.update(kwargs)
+    return AsyncGeminiClient("test-key", base_url=server.url, **options)
+
+
+def call(client, n=1):
+    """Make n concurrent calls; raises the first call's error, if any."""
+    async def run():
+        try:
+            return await asyncio.gather(*(
+                client.generate_content(model="gemini-test", contents="prompt") for _ in range(n)
+            ), return_exceptions=True)
+        finally:
+            await client.aclose()
+    results = asyncio.run(run())
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results
+
+
+def test_calls_reuse_one_connection(fake_gemini):
+    client = make_client(fake_gemini)
+
+    async def run():
+        try:
+            for _ in range(3):
+                response = await client.generate_content(model="gemini-test", contents="prompt")
+                assert response.text == ANSWER
+        finally:
+            await client.aclose()
+    asyncio.run(run())
+    assert fake_gemini.requests == 3
+    assert len(fake_gemini.client_ports) == 1
+
+
+def test_transient_errors_are_retried(fake_gemini):
+    fake_gemini.script = [(503, 0), (429, 0)]
+    client = make_client(fake_gemini)
+    [response] = call(client)
+    assert response.text == ANSWER
+    assert fake_gemini.requests == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_other_errors_are_not_retried(fake_gemini):
+    fake_gemini.script = [(400, 0)]
+    client = make_client(fake_gemini)
+    with pytest.raises(errors.ClientError):
+        call(client)
+    assert fake_gemini.requests == 1
+
+
+def test_persistent_failure_raises_unavailable(fake_gemini):
+    fake_gemini.script = [(503, 0)] * 3
+    client = make_client(fake_gemini, max_attempts=3)
+    with pytest.raises(GeminiUnavailableError):
+        call(client)
+    assert fake_gemini.requests == 3
+
+
+def test_slow_attempts_time_out_and_retry(fake_gemini):
+    fake_gemini.script = [(200, 1.0)]
+    client = make_client(fake_gemini, attempt_timeout=0.2)
+    [response] = call(client)
+    assert response.text == ANSWER
+    assert client.stats()["timeouts"] == 1
+
+
+def test_hedged_request_answers_for_a_slow_one(fake_gemini):
+    fake_gemini.script = [(200, 1.5)]
+    client = make_client(fake_gemini, hedge_after=0.1)
+    start = time.monotonic()
+    [response] = call(client)
+    assert response.text == ANSWER
+    assert time.monotonic() - start < 1.0
+    assert client.stats()["hedge_wins"] == 1
+
+
+def test_in_flight_requests_are_capped(fake_gemini):
+    fake_gemini.delay = 0.2
+    client = make_client(fake_gemini, max_concurrency=2)
+    responses = call(client, n=5)
+    assert len(responses) == 5
+    assert fake_gemini.max_active == 2
+
+
+def test_calls_beyond_the_queue_are_rejected(fake_gemini):
+    fake_gemini.delay = 0.2
+    client = make_client(fake_gemini, max_concurrency=1, max_queue=1)
+    with pytest.raises(PoolSaturatedError):
+        call(client, n=3)
+
+
+def test_stream_is_retried_until_its_first_chunk(fake_gemini):
+    fake_gemini.script = [(503, 0)]
+    client = make_client(fake_gemini)
+
+    async def run():
+        try:
+            return [chunk.text async for chunk in client.generate_content_stream(model="gemini-test", contents="prompt")]
+        finally:
+            await client.aclose()
+    pieces = asyncio.run(run())
+    assert len(pieces) > 1 and "".join(pieces) == ANSWER
+    assert fake_gemini.requests == 2
+    assert client.stats()["in_flight"] == 0
+
+
+@pytest.fixture
+def async_evaluation(fake_gemini, monkeypatch):
+    monkeypatch.setattr(getresponse, "CONTEXT_CACHE_ENABLED", False)
+    monkeypatch.setattr(getresponse, "gemini_client", make_client(fake_gemini, max_attempts=2))
+
+    def evaluate(**kwargs):
+        async def run():
+            try:
+                return await getresponse.get_gemini_response_async(
+                    '{"word": "hello", "frames": []}', '{"word": "hello", "frames": []}', **kwargs
+                )
+            finally:
+                await getresponse.gemini_client.aclose()
+        return asyncio.run(run())
+    return evaluate
+
+
+def test_unavailable_gemini_is_not_scored_zero(fake_gemini, async_evaluation):
+    fake_gemini.script = [(503, 0)] * 2
+    with pytest.raises(GeminiUnavailableError):
+        async_evaluation()
+
+
+def test_unavailable_gemini_uses_the_fallback(fake_gemini, async_evaluation):
+    fake_gemini.script = [(503, 0)] * 2
+    local = EvaluationResponse(overall_score_0_to_4=2, summary="Local score",
+                               pros={"points": []}, cons={"points": []})
+    assert async_evaluation(fallback=lambda: local).summary == "Local score"
+    assert async_evaluation().overall_score_0_to_4 == 3  # the next call gets through
@@ -0,0 +1,162 @@
+"""
+Tests for batch evaluation and the micro-batcher, with a fake Gemini client.
+Run with: python -m pytest backend/app/gemini/test_batch.py
+"""
+import asyncio
+import json
+import os
+import re
+import time
+
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from app.gemini import getresponse
+from app.gemini.async_client import GeminiUnavailableError
+from app.gemini.batcher import EvaluationBatcher
+
+REFERENCE = '{"word": "hello", "frames": []}'
+
+
+def attempt(n):
+    return json.dumps({"word": "hello", "id": n, "frames": []})
+
+
+def answer(n):
+    return {"overall_score_0_to_4": n % 5, "summary": f"attempt {n}", "pros": [], "cons": []}
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeClient:
+    """
+    Answers every attempt in the prompt by its "id". Batch elements for ids
+    in `bad` come back without a summary; `error` is raised for every call.
+    """
+
+    def __init__(self, bad=(), error=None):
+        self.bad = set(bad)
+        self.error = error
+        self.calls = []
+
+    async def generate_content(self, *, model, contents, config=None):
+        self.calls.append(contents)
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        ids = [int(n) for n in re.findall(r'"id": (\d+)', contents)]
+        if "User Attempts" not in contents:
+            return Response(json.dumps(answer(ids[0])))
+        # Out of order, to check elements are matched by their number
+        items = [{"attempt": position, **answer(n)} for position, n in enumerate(ids, 1)][::-1]
+        for item in items:
+            if ids[item["attempt"] - 1] in self.bad:
+                del item["summary"]
+        return Response("```json\n" + json.dumps(items) + "\n```")
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    monkeypatch.setattr(getresponse, "CONTEXT_CACHE_ENABLED", False)
+    monkeypatch.setattr(getresponse, "evaluation_cache", None)
+
+    def install(**kwargs):
+        client = FakeClient(**kwargs)
+        monkeypatch.setattr(getresponse, "gemini_client", client)
+        return client
+    return install
+
+
+def evaluate_batch(attempts):
+    return asyncio.run(getresponse.get_gemini_batch_async(REFERENCE, attempts))
+
+
+def test_batch_answer_is_matched_to_attempts():
+    text = json.dumps([
+        {"attempt": 3, **answer(3)},
+        {"attempt": 1, **answer(1)},
+        {"attempt": 2, "overall_score_0_to_4": 4},
+    ])
+    results = getresponse.parse_gemini_batch_response(text, 4, word_hint="hello")
+    assert [r and r.summary for r in results] == ["attempt 1", None, "attempt 3", None]
+
+
+def test_one_call_grades_the_batch(fake_client):
+    client = fake_client()
+    results = evaluate_batch([attempt(n) for n in (1, 2, 3)])
+    assert [r.summary for r in results] == ["attempt 1", "attempt 2", "attempt 3"]
+    assert len(client.calls) == 1
+    assert client.calls[0].count(REFERENCE) == 1
+
+
+def test_bad_element_is_evaluated_on_its_own(fake_client):
+    client = fake_client(bad={2})
+    results = evaluate_batch([attempt(n) for n in (1, 2, 3)])
+    assert [r.summary for r in results] == ["attempt 1", "attempt 2", "attempt 3"]
+    assert len(client.calls) == 2
+    assert "User Attempt (to be evaluated)" in client.calls[1]
+
+
+def test_reference_is_encoded_once_for_the_batch(fake_client, monkeypatch):
+    client = fake_client()
+    encoded = []
+
+    def encode_reference(landmarks_json, encoding):
+        encoded.append(landmarks_json)
+        return "ENCODED REFERENCE"
+
+    def encode_landmarks(landmarks_json, encoding):
+        json.loads(landmarks_json)
+        return landmarks_json
+
+    monkeypatch.setattr(getresponse, "encode_reference", encode_reference)
+    monkeypatch.setattr(getresponse, "encode_landmarks", encode_landmarks)
+    malformed = '{"word": "hello", "id": 3, "frames": ['
+    evaluate_batch([attempt(1), attempt(2), malformed])
+
+    assert encoded == [REFERENCE]
+    # A malformed attempt is sent as-is, but doesn't take the reference's encoding with it
+    assert "ENCODED REFERENCE" in client.calls[0] and REFERENCE not in client.calls[0]
+    assert malformed in client.calls[0]
+
+
+def test_unavailable_gemini_fails_each_attempt_once(fake_client):
+    client = fake_client(error=GeminiUnavailableError("timed out"))
+    results = evaluate_batch([attempt(n) for n in (1, 2)])
+    assert all(isinstance(r, GeminiUnavailableError) for r in results)
+    assert len(client.calls) == 1
+
+
+def test_batcher_routes_results_to_their_callers(fake_client):
+    client = fake_client()
+    batcher = EvaluationBatcher(getresponse.get_gemini_batch_async, window=0.05)
+    other_reference = '{"word": "thanks", "frames": []}'
+
+    async def run():
+        return await asyncio.gather(
+            batcher.evaluate(REFERENCE, attempt(1)),
+            batcher.evaluate(other_reference, attempt(2)),
+            batcher.evaluate(REFERENCE, attempt(3)),
+            batcher.evaluate(REFERENCE, attempt(4)),
+        )
+    results = asyncio.run(run())
+    assert [r.summary for r in results] == ["attempt 1", "attempt 2", "attempt 3", "attempt 4"]
+    assert len(client.calls) == 2  # one per reference
+    assert batcher.stats()["largest"] == 3
+
+
+def test_full_group_does_not_wait_for_the_window(fake_client):
+    fake_client()
+    batcher = EvaluationBatcher(getresponse.get_gemini_batch_async, window=10, max_size=2)
+
+    async def run():
+        return await asyncio.gather(batcher.evaluate(REFERENCE, attempt(1)), batcher.evaluate(REFERENCE, attempt(2)))
+    start = time.monotonic()
+    results = asyncio.run(run())
+    assert [r.summary for r in results] == ["attempt 1", "attempt 2"]
+    assert time.monotonic() - start < 1.0
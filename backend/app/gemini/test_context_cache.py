@@ -0,0 +1,239 @@
+"""
+Tests for Gemini context caching, using a local fake of the genai client.
+Run with: python -m pytest backend/app/gemini/test_context_cache.py
+"""
+import os
+from types import SimpleNamespace
+
+import pytest
+from google.genai import errors as genai_errors
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from app.gemini import getresponse
+from app.gemini.context_cache import ContextCache
+from app.services.result_cache import ResultCache
+
+
+class FakeCaches:
+    def __init__(self, fail_create=False):
+        self.fail_create = fail_create
+        self.created = []
+        self.updated = []
+        self.deleted = []
+
+    def create(self, *, model, config):
+        if self.fail_create:
+            raise RuntimeError("Cached content is too small")
+        name = f"cachedContents/{len(self.created)}"
+        self.created.append((name, model, config))
+        return SimpleNamespace(name=name)
+
+    def update(self, *, name, config):
+        self.updated.append((name, config))
+        return SimpleNamespace(name=name)
+
+    def delete(self, *, name):
+        self.deleted.append(name)
+
+
+def api_error(code: int, message: str) -> genai_errors.APIError:
+    error_class = genai_errors.ClientError if code < 500 else genai_errors.ServerError
+    return error_class(code, {"error": {"code": code, "message": message}})
+
+
+class FakeModels:
+    def __init__(self, fail_cached=None):
+        self.fail_cached = fail_cached  # error raised for requests that use the cache
+        self.calls = []
+
+    def generate_content(self, *, model, contents, config=None):
+        self.calls.append({"model": model, "contents": contents, "config": config})
+        if self.fail_cached is not None and config is not None:
+            raise self.fail_cached
+        return SimpleNamespace(text='{"overall_score_0_to_4": 3, "summary": "Good", "pros": [], "cons": []}')
+
+
+class FakeClient:
+    def __init__(self, **kwargs):
+        self.caches = FakeCaches(fail_create=kwargs.get("fail_create", False))
+        self.models = FakeModels(fail_cached=kwargs.get("fail_cached"))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(client, clock=None, **kwargs):
+    return ContextCache(client, "test-model", "SYSTEM", ttl_seconds=600, refresh_margin=60,
+                        clock=clock or FakeClock(), **kwargs)
+
+
+def test_word_cache_is_created_once_and_reused():
+    client = FakeClient()
+    cache = make_cache(client)
+
+    first = cache.word_handle("hello", '{"word": "hello"}')
+    second = cache.word_handle("hello", '{"word": "hello"}')
+
+    assert first == second
+    assert len(client.caches.created) == 1
+    _, model, config = client.caches.created[0]
+    assert model == "test-model"
+    assert config.system_instruction == "SYSTEM"
+    assert '{"word": "hello"}' in config.contents[0]
+
+
+def test_cache_is_renewed_before_ttl_expires():
+    client = FakeClient()
+    clock = FakeClock()
+    cache = make_cache(client, clock)
+
+    handle = cache.system_handle()
+    clock.now += 560  # 40s left, inside the 60s refresh margin
+
+    assert cache.system_handle() == handle
+    assert [name for name, _ in client.caches.updated] == [handle]
+    assert len(client.caches.created) == 1
+
+
+def test_expired_cache_is_recreated():
+    client = FakeClient()
+    clock = FakeClock()
+    cache = make_cache(client, clock)
+
+    old = cache.system_handle()
+    clock.now += 601
+
+    assert cache.system_handle() != old
+    assert len(client.caches.created) == 2
+
+
+def test_changed_reference_replaces_word_cache():
+    client = FakeClient()
+    cache = make_cache(client)
+
+    old = cache.word_handle("hello", '{"v": 1}')
+    new = cache.word_handle("hello", '{"v": 2}')
+
+    assert new != old
+    assert client.caches.deleted == [old]
+
+
+def test_failed_create_backs_off():
+    client = FakeClient(fail_create=True)
+    clock = FakeClock()
+    cache = make_cache(client, clock, retry_after=30)
+
+    assert cache.system_handle() is None
+    assert cache.system_handle() is None
+    assert cache.stats()["failures"] == 1
+
+    clock.now += 31
+    assert cache.system_handle() is None
+    assert cache.stats()["failures"] == 2
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    def install(**kwargs):
+        client = FakeClient(**kwargs)
+        monkeypatch.setattr(getresponse, "client", client)
+        monkeypatch.setattr(getresponse, "CONTEXT_CACHE_ENABLED", True)
+        monkeypatch.setattr(getresponse, "context_cache", ContextCache(
+            client, getresponse.MODEL, getresponse.SYSTEM_INSTRUCTION))
+        return client
+    return install
+
+
+def test_request_sends_only_the_attempt_when_word_is_cached(fake_gemini):
+    client = fake_gemini()
+    reference = '{"word": "hello", "frames": ["REFERENCE"]}'
+    attempt = '{"word": "hello", "frames": ["ATTEMPT"]}'
+
+    for _ in range(2):
+        result = getresponse.get_gemini_response(reference, attempt)
+        assert result.overall_score_0_to_4 == 3
+
+    assert len(client.caches.created) == 1
+    for call in client.models.calls:
+        assert call["config"].cached_content == client.caches.created[0][0]
+        assert "ATTEMPT" in call["contents"]
+        assert "REFERENCE" not in call["contents"]
+        assert "JUDGING RUBRIC" not in call["contents"]
+
+
+def test_falls_back_to_inline_prompt_when_caching_fails(fake_gemini):
+    client = fake_gemini(fail_create=True)
+
+    result = getresponse.get_gemini_response('{"frames": ["REFERENCE"]}', '{"word": "hello"}')
+
+    assert result.overall_score_0_to_4 == 3
+    call = client.models.calls[0]
+    assert call["config"] is None
+    assert "JUDGING RUBRIC" in call["contents"] and "REFERENCE" in call["contents"]
+
+
+def test_rejected_cache_handle_is_retried_inline(fake_gemini):
+    client = fake_gemini(fail_cached=api_error(403, "CachedContent not found (or permission denied)"))
+
+    result = getresponse.get_gemini_response('{"frames": []}', '{"word": "hello"}')
+
+    assert result.overall_score_0_to_4 == 3
+    assert [c["config"] is None for c in client.models.calls] == [False, True]
+    assert getresponse.context_cache.stats()["active"] == 0
+
+
+@pytest.mark.parametrize("error", [api_error(503, "The model is overloaded"), RuntimeError("connection reset")])
+def test_other_errors_keep_the_cache_and_are_not_resent_inline(fake_gemini, error):
+    client = fake_gemini(fail_cached=error)
+
+    result = getresponse.get_gemini_response('{"frames": []}', '{"word": "hello"}')
+
+    assert result.overall_score_0_to_4 == 0  # the usual "couldn't score" response
+    assert len(client.models.calls) == 1
+    assert getresponse.context_cache.stats()["active"] == 1
+
+
+def test_fallback_is_used_when_gemini_fails(fake_gemini, monkeypatch):
+    client = fake_gemini()
+    monkeypatch.setattr(getresponse, "CONTEXT_CACHE_ENABLED", False)
+
+    def fail(**kwargs):
+        raise RuntimeError("503 model overloaded")
+
+    monkeypatch.setattr(client.models, "generate_content", fail)
+    local = getresponse.EvaluationResponse(
+        overall_score_0_to_4=2, summary="Local", pros={"points": []}, cons={"points": []})
+
+    assert getresponse.get_gemini_response("{}", '{"word": "hello"}', fallback=lambda: local) is local
+    assert getresponse.get_gemini_response("{}", '{"word": "hello"}').overall_score_0_to_4 == 0
+
+
+def test_scored_responses_are_cached_by_upload(fake_gemini, monkeypatch, tmp_path):
+    client = fake_gemini()
+    monkeypatch.setattr(getresponse, "evaluation_cache", ResultCache("evaluations", directory=tmp_path))
+
+    for _ in range(2):
+        result = getresponse.get_gemini_response("{}", '{"word": "hello"}', cache_key="upload-1")
+        assert result.overall_score_0_to_4 == 3
+    assert len(client.models.calls) == 1
+
+    getresponse.get_gemini_response("{}", '{"word": "hello"}', cache_key="upload-2")
+    getresponse.get_gemini_response('{"changed": 1}', '{"word": "hello"}', cache_key="upload-1")
+    assert len(client.models.calls) == 3
+
+
+def test_unscored_responses_are_not_cached(fake_gemini, monkeypatch, tmp_path):
+    client = fake_gemini()
+    monkeypatch.setattr(getresponse, "evaluation_cache", ResultCache("evaluations", directory=tmp_path))
+    monkeypatch.setattr(client.models, "generate_content", lambda **kwargs: SimpleNamespace(text="no json"))
+
+    for _ in range(2):
+        getresponse.get_gemini_response("{}", '{"word": "hello"}', cache_key="upload-1")
+
+    assert getresponse.evaluation_cache.stats()["puts"] == 0
@@ -0,0 +1,70 @@
+"""
+Tests for the token-lean prompt encodings.
+Run with: python -m pytest backend/app/gemini/test_prompt_encoding.py
+"""
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from app.gemini.prompt_encoding import PRESETS, PromptEncoding, TokenUsage, encode_landmarks, get_encoding
+
+
+def point(x, y, z=0.0):
+    return {"x": x, "y": y, "z": z}
+
+
+LANDMARKS = json.dumps({
+    "word": "hello",
+    "fps": 30.0,
+    "total_frames": 3,
+    "face_key_points_info": ["nose_tip"],
+    "frames": [
+        {"frame_number": 0, "hands": [{"handedness": "Right", "landmarks": [point(0.5, 0.25)] * 21}],
+         "face_reference": {"nose_tip": point(0.5, 0.5)}},
+        {"frame_number": 1, "hands": [], "face_reference": None},
+        {"frame_number": 2, "hands": [{"handedness": "Right", "landmarks": [point(0.51, 0.25)] * 21}],
+         "face_reference": None},
+    ],
+})
+
+
+def test_json_preset_is_passthrough():
+    assert encode_landmarks(LANDMARKS, get_encoding("json")) is LANDMARKS
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        get_encoding("yaml")
+
+
+def test_table_delta_rows():
+    lines = encode_landmarks(LANDMARKS, PRESETS["table_delta"]).splitlines()
+    rows = [line for line in lines if re.match(r"f\d+ ", line)]
+
+    assert rows[0] == "f0 R= " + " ".join(["500 250 0"] * 21)
+    assert rows[1] == "f0 face 500 500 0"
+    # frame 1 has no hands and is dropped; frame 2 is a delta against frame 0
+    assert rows[2] == "f2 R~ " + " ".join(["10 0 0"] * 21)
+
+
+def test_json_min_drops_empty_frames_and_z():
+    encoding = PromptEncoding(name="custom", drop_empty_frames=True, include_z=False)
+    data = json.loads(encode_landmarks(LANDMARKS, encoding))
+
+    assert [f["frame_number"] for f in data["frames"]] == [0, 2]
+    assert data["frames"][0]["hands"][0]["landmarks"][0] == [0.5, 0.25]
+    assert data["point_format"] == ["x", "y"]
+
+
+def test_token_usage_totals():
+    usage = TokenUsage()
+    meta = SimpleNamespace(prompt_token_count=100, cached_content_token_count=60, candidates_token_count=20)
+    usage.record("table", 90, meta)
+    usage.record("table", 110, None)
+
+    stats = usage.stats()["table"]
+    assert stats["requests"] == 2
+    assert stats["prompt_tokens"] == 100
+    assert stats["avg_estimated_tokens"] == 100.0
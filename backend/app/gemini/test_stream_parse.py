@@ -0,0 +1,63 @@
+"""
+Tests for reading evaluation fields from a partial Gemini answer, and for streamed evaluations.
+Run with: python -m pytest backend/app/gemini/test_stream_parse.py
+"""
+import asyncio
+import json
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from app.gemini import getresponse
+from app.gemini.stream_parse import PartialEvaluation
+
+ANSWER = json.dumps({
+    "overall_score_0_to_4": 3,
+    "summary": "Recognizable \"hello\".",
+    "pros": {"points": ["Clear handshape"]},
+    "cons": ["Slightly fast"],
+})
+
+
+def test_fields_are_reported_once_complete():
+    partial = PartialEvaluation()
+    seen = []
+    for i, char in enumerate(ANSWER):
+        for field, value in partial.feed(char):
+            seen.append((field, value, i))
+
+    assert [field for field, _, _ in seen] == ["overall_score_0_to_4", "summary", "pros", "cons"]
+    score_at = seen[0][2]
+    assert ANSWER[score_at - 1] == "3" and ANSWER[score_at] == ","  # not before the number could be complete
+    assert seen[1][1] == 'Recognizable "hello".'
+    assert seen[2][1] == {"points": ["Clear handshape"]}
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class StreamingClient:
+    async def generate_content_stream(self, *, model, contents, config=None):
+        for i in range(0, len(ANSWER), 5):
+            await asyncio.sleep(0)
+            yield Chunk(ANSWER[i:i + 5])
+
+
+def test_streamed_evaluation_previews_then_validates(monkeypatch):
+    monkeypatch.setattr(getresponse, "CONTEXT_CACHE_ENABLED", False)
+    monkeypatch.setattr(getresponse, "gemini_client", StreamingClient())
+
+    async def run():
+        return [event async for event in getresponse.stream_gemini_response(
+            '{"word": "hello", "frames": []}', '{"word": "hello", "frames": []}'
+        )]
+    events = asyncio.run(run())
+
+    assert [name for name, _ in events] == ["score", "summary", "pros", "cons", "result"]
+    assert events[0][1] == {"overall_score_0_to_4": 3}
+    assert events[3][1] == {"points": ["Slightly fast"]}
+    result = events[-1][1]
+    assert result.overall_score_0_to_4 == 3 and result.cons.points == ["Slightly fast"]
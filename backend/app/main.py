@@ -1,18 +1,115 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+import asyncio
+import json
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from .schemas.evaluation import EvaluationResponse
-from .services.video_convert import convert_video_to_json
-from .services.landmark_load import load_reference_landmarks
-from .gemini.getresponse import get_gemini_response
+from .services.video_convert import convert_upload_to_json, expected_frames, extractor_fingerprint, read_summary
+from .services.upload_spool import UploadSpool, new_progress_file, read_progress
+from .services.upload_stream import (
+    FileUpload, StreamedUpload, UploadError, UploadTooLargeError, WebSocketUpload, read_body,
+)
+from .services.job_queue import (
+    JOB_MAX_ATTEMPTS, JOB_QUEUE_MAX, JOB_RETENTION, JOB_VISIBILITY_TIMEOUT, JOB_WORKERS, JOBS_DIR, Job, JobQueue,
+    JobRunner,
+)
+from .services.result_cache import cache_key, evaluation_cache, landmark_cache
+from .services.landmark_format import json_to_sequence
+from .services.landmark_input import MAX_LANDMARK_SIZE, decompress, parse_client_landmarks
+from .services.landmark_load import load_reference_landmarks, load_reference_sequence
+from .services.local_scorer import evaluate_locally
+from .services.metrics import (
+    PROMETHEUS_CONTENT_TYPE, StageTimings, collect_timings, current_timings, note_container,
+    note_fallback, observe_request, render_prometheus, request_timings, timed_stage,
+)
+from .services.reference_store import reference_store
+from .gemini.async_client import GeminiUnavailableError
+from .gemini.getresponse import (
+    evaluation_batcher, gemini_client, get_gemini_batch_async, get_gemini_response_async, stream_gemini_response,
+)
+from .gemini.prompt_encoding import token_usage
+from .services.worker_pool import PoolSaturatedError, WorkerCrashedError, extraction_pool
+from .services.detector_pool import record_worker_stats, run_with_detector_stats, worker_stats
+
+
+# "gemini": always ask Gemini; "local": score on-device only;
+# "auto": ask Gemini, use the local score when Gemini fails or is saturated
+EVALUATION_MODES = ("gemini", "local", "auto")
+EVALUATION_MODE = os.getenv("EVALUATION_MODE", "gemini")
 
-app = FastAPI(title="ASL Rating API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load reference landmarks, spawn extraction workers and load their MediaPipe models
+    # before serving traffic
+    reference_store.preload()
+    await extraction_pool.warm()
+    job_runner.start()
+    yield
+    await job_runner.stop()
+    extraction_pool.shutdown()
+    await gemini_client.aclose()
+
+
+app = FastAPI(title="ASL Rating API", lifespan=lifespan)
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request: Request, exc: PoolSaturatedError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(GeminiUnavailableError)
+async def gemini_unavailable_handler(request: Request, exc: GeminiUnavailableError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception):
     return JSONResponse(status_code=500, content={"detail": str(exc)})
 
+# Endpoints whose requests are timed per stage (see metrics.py)
+TIMED_PATHS = {"/rating", "/api/evaluate-sign", "/api/evaluate-landmarks", "/api/evaluate-batch"}
+
+
+def _metric_word(word: Optional[str]) -> str:
+    """The word label: only words with a reference, so arbitrary input can't add series."""
+    return word if word in reference_store.words() else "other"
+
+
+@app.middleware("http")
+async def stage_timing_middleware(request: Request, call_next):
+    """Time the stages of rating requests; report them in Server-Timing and on /metrics."""
+    if request.url.path not in TIMED_PATHS:
+        return await call_next(request)
+    word = _metric_word(request.query_params.get("word"))
+    with request_timings() as timings:
+        try:
+            response = await call_next(request)
+        except Exception:
+            observe_request(timings, word, "error")
+            raise
+    outcome = "error" if response.status_code >= 400 else "fallback" if timings.fallback else "ok"
+    observe_request(timings, word, outcome)
+    response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -23,53 +120,219 @@ app.add_middleware(
 )
 
 
-@app.post("/rating", response_model=EvaluationResponse)
-async def get_rating(word: str, video: UploadFile = File(...)):
+# Uploads larger than this are rejected as soon as they cross it
+MAX_FILE_SIZE = 50 * 1024 * 1024
+
+# The endpoints read the multipart body themselves (see upload_stream.py); this
+# documents it in the OpenAPI schema the way a `video: UploadFile` parameter would
+VIDEO_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["video"],
+            "properties": {"video": {"type": "string", "format": "binary"}},
+        }}},
+    }
+}
+
+# Video types /api/evaluate-sign and /jobs accept -> spool suffix
+VIDEO_SUFFIXES = {
+    "video/mp4": ".mp4",
+    "video/webm": ".webm",
+    "video/x-matroska": ".mkv",
+}
+
+
+def _ignore_result(future: "asyncio.Future") -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+async def _receive_attempt(request: Request, word: str, suffixes: Dict[str, str],
+                          allowed_types: str) -> Tuple[str, str]:
     """
-    Get ASL sign evaluation for a user's video attempt.
+    Stream the uploaded video into an extraction worker while it arrives.
 
     Returns:
-        EvaluationResponse: AI evaluation with score (0-4), summary, pros, and cons
+        (attempt landmark JSON, upload cache key)
 
     Raises:
-        HTTPException 400: Invalid file type, size, or video processing error
-        HTTPException 404: Reference landmarks not found for the word
-        HTTPException 500: Internal server error
+        UploadError / UploadTooLargeError: bad or oversized upload
+        HTTPException 400: the file's type isn't one of `suffixes` (`allowed_types` says which are)
+        ValueError: the video could not be processed
     """
-    # Validate file type
-    ALLOWED_VIDEO_TYPES = ["video/mp4"]
-    if video.content_type not in ALLOWED_VIDEO_TYPES:
+    upload = StreamedUpload(request, "video", MAX_FILE_SIZE)
+    await upload.open()
+
+    mime = upload.content_type.split(";")[0].strip().lower()
+    if mime not in suffixes:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid video type: {video.content_type}. Only MP4 files are allowed."
+            detail=f"Invalid video type: {upload.content_type}. {allowed_types}"
         )
+    return await _extract_streamed(word, upload, suffixes[mime])
+
+
+@dataclass
+class _ExtractionProgress:
+    """How far an extraction has got, for /api/evaluate-sign/stream."""
+    path: str  # the worker writes the number of frames decoded so far here
+    total: Optional[int] = None  # frames expected, once the whole upload is in (None if unknown)
+    uploaded: asyncio.Event = field(default_factory=asyncio.Event)
 
-    # Read video content
-    video_content = await video.read()
+    def frames(self) -> int:
+        return read_progress(self.path)
 
-    # Validate file size (max 50MB)
-    MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB in bytes
-    if len(video_content) > MAX_FILE_SIZE:
+    def close(self) -> None:
+        for path in (self.path, f"{self.path}.tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+async def _extract_streamed(word: str, upload, suffix: str, frame_rate: Optional[float] = None,
+                            live: bool = False, progress: Optional[_ExtractionProgress] = None) -> Tuple[str, str]:
+    """
+    Extract landmarks from an upload (StreamedUpload or WebSocketUpload) while it arrives.
+
+    Extraction starts with the first chunk; the worker decodes from a spool
+    file that grows as chunks are received. Once the whole upload is in, a
+    cached result for the same bytes and word wins and the running
+    extraction is abandoned. With `progress`, the worker reports the frames
+    it has decoded, and `progress.uploaded` is set once the upload is in.
+
+    Returns:
+        (attempt landmark JSON, upload cache key)
+    """
+    timings = current_timings()
+    note_container(suffix.lstrip("."))
+    with UploadSpool(suffix) as spool:
+        extraction = None
+        with timed_stage("upload_read"):
+            async for chunk in upload:
+                spool.write(chunk)
+                if extraction is None:
+                    extraction = asyncio.ensure_future(extraction_pool.run(
+                        run_with_detector_stats, collect_timings, convert_upload_to_json, word, spool.path,
+                        suffix=suffix, frame_rate=frame_rate, live=live,
+                        progress_path=progress.path if progress is not None else None,
+                    ))
+                    extraction.add_done_callback(_ignore_result)
+                elif extraction.done():
+                    break  # the worker already failed (pool full, undecodable input): stop reading
+
+        if extraction is None:
+            raise UploadError("Video file is empty")
+        if extraction.done():
+            spool.abort()
+            await extraction  # raises the worker's error
+        spool.finish()
+        if progress is not None:
+            progress.total = await asyncio.to_thread(expected_frames, spool.path)
+            progress.uploaded.set()
+
+        key_parts = (upload.sha256, word, extractor_fingerprint()) + ((f"live:{frame_rate}",) if live else ())
+        upload_key = cache_key(*key_parts)
+        cached = landmark_cache.get(upload_key) if landmark_cache is not None else None
+        if cached is not None:
+            spool.abort()
+            return cached, upload_key
+
+        (attempt_landmarks, worker_timings), stats = await extraction
+
+    record_worker_stats(stats)
+    if timings is not None:
+        timings.merge(worker_timings)
+    if landmark_cache is not None:
+        landmark_cache.put(upload_key, attempt_landmarks)
+    return attempt_landmarks, upload_key
+
+
+def _active_range(attempt_landmarks: str) -> Optional[dict]:
+    """The source frames an attempt's landmarks cover, if idle time was trimmed off."""
+    return read_summary(attempt_landmarks).get("active_range")
+
+
+def _score_locally(word: str, attempt_landmarks: str) -> EvaluationResponse:
+    with timed_stage("local_score"):
+        attempt = json_to_sequence(json.loads(attempt_landmarks), dtype=np.float32)
+        return evaluate_locally(attempt, load_reference_sequence(word))
+
+
+def _load_reference(word: str) -> str:
+    with timed_stage("reference_load"):
+        return load_reference_landmarks(word)
+
+
+async def _evaluate(word: str, reference_landmarks: str, attempt_landmarks: str, mode: str,
+                    upload_key: Optional[str] = None) -> EvaluationResponse:
+    """Score an attempt with Gemini, the local scorer, or Gemini backed by the local scorer."""
+    if mode == "local":
+        return await asyncio.to_thread(_score_locally, word, attempt_landmarks)
+
+    fallback = partial(_score_locally, word, attempt_landmarks) if mode == "auto" else None
+    return await get_gemini_response_async(
+        demonstrator_json=reference_landmarks,
+        user_attempt_json=attempt_landmarks,
+        fallback=fallback,
+        cache_key=upload_key,
+        batch=True,
+    )
+
+
+def _evaluation_mode(mode: Optional[str]) -> str:
+    mode = mode or EVALUATION_MODE
+    if mode not in EVALUATION_MODES:
         raise HTTPException(
             status_code=400,
-            detail=f"Video file too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
+            detail=f"Invalid mode: {mode}. Allowed: {', '.join(EVALUATION_MODES)}."
         )
+    return mode
+
+
+@app.post("/rating", response_model=EvaluationResponse, openapi_extra=VIDEO_UPLOAD_BODY)
+async def get_rating(word: str, request: Request, response: Response, mode: Optional[str] = None):
+    """
+    Get ASL sign evaluation for a user's video attempt (multipart field `video`).
+
+    `mode` picks the scorer: "gemini", "local" (landmark comparison, answers in
+    milliseconds) or "auto" (Gemini, falling back to local). Defaults to EVALUATION_MODE.
+    The X-Active-Range header ("start-end/frames") says which frames of the
+    video were evaluated after idle time was trimmed.
+
+    Returns:
+        EvaluationResponse: AI evaluation with score (0-4), summary, pros, and cons
+
+    Raises:
+        HTTPException 400: Invalid file type, size, or video processing error
+        HTTPException 404: Reference landmarks not found for the word
+        HTTPException 500: Internal server error
+    """
+    mode = _evaluation_mode(mode)
 
-    # Validate file is not empty
-    if len(video_content) == 0:
+    try:
+        # Stream the upload into landmark extraction (CPU-bound, runs in the process pool)
+        attempt_landmarks, upload_key = await _receive_attempt(
+            request, word, {"video/mp4": ".mp4"}, "Only MP4 files are allowed."
+        )
+    except PoolSaturatedError:
+        raise
+    except UploadTooLargeError:
         raise HTTPException(
             status_code=400,
-            detail="Video file is empty"
+            detail=f"Video file too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
         )
-
-    try:
-        # Extract landmarks from user's video
-        attempt_landmarks = convert_video_to_json(word, video_content)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError as e:
         raise HTTPException(
             status_code=400,
             detail=f"Video processing error: {str(e)}"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -78,81 +341,714 @@ async def get_rating(word: str, video: UploadFile = File(...)):
 
     try:
         # Load reference landmarks
-        reference_landmarks = load_reference_landmarks(word)
+        reference_landmarks = _load_reference(word)
     except FileNotFoundError:
         raise HTTPException(
             status_code=404,
-            detail=f"No reference found for word '{word}'. Available words: hello, goodbye, please, sorry, thankyou, greeting, parents"
+            detail=f"No reference found for word '{word}'. Available words: {', '.join(reference_store.words())}"
         )
 
     try:
-        # Get evaluation from Gemini API
-        evaluation = get_gemini_response(
-            demonstrator_json=reference_landmarks,
-            user_attempt_json=attempt_landmarks
-        )
+        evaluation = await _evaluate(word, reference_landmarks, attempt_landmarks, mode, upload_key)
+    except (PoolSaturatedError, GeminiUnavailableError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"AI evaluation failed: {str(e)}"
         )
 
+    active_range = _active_range(attempt_landmarks)
+    if active_range is not None:
+        response.headers["X-Active-Range"] = (
+            f"{active_range['start_frame']}-{active_range['end_frame']}/{active_range['source_frames']}"
+        )
     return evaluation
 
 
 
-@app.post("/api/evaluate-sign")
-async def evaluate_sign(word: str, video: UploadFile = File(...)):
+@app.post("/api/evaluate-sign", openapi_extra=VIDEO_UPLOAD_BODY)
+async def evaluate_sign(word: str, request: Request, mode: Optional[str] = None):
     """
     Evaluate a user's sign recording against the reference.
-    Accepts video/webm (browser recordings) in addition to video/mp4.
-    Returns the evaluation wrapped as { word, evaluation: { ... } }.
+    Accepts video/webm (browser recordings) in addition to video/mp4, as multipart field `video`.
+    `mode` picks the scorer, as for /rating.
+    Returns the evaluation wrapped as { word, evaluation: { ... }, active_range: { ... } },
+    where active_range says which frames were evaluated after idle time was trimmed
+    (start_frame, end_frame exclusive, source_frames, motion_found), or is null.
     """
-    CONTENT_TYPE_TO_SUFFIX = {
-        "video/mp4": ".mp4",
-        "video/webm": ".webm",
-        "video/x-matroska": ".mkv",
+    mode = _evaluation_mode(mode)
+
+    try:
+        attempt_landmarks, upload_key = await _receive_attempt(
+            request, word, VIDEO_SUFFIXES, "Allowed: mp4, webm."
+        )
+    except PoolSaturatedError:
+        raise
+    except UploadTooLargeError:
+        raise HTTPException(status_code=400, detail="Video file too large. Maximum size: 50MB")
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Video processing error: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
+
+    try:
+        reference_landmarks = _load_reference(word)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No reference found for word '{word}'.")
+
+    try:
+        evaluation = await _evaluate(word, reference_landmarks, attempt_landmarks, mode, upload_key)
+    except (PoolSaturatedError, GeminiUnavailableError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI evaluation failed: {str(e)}")
+
+    return {"word": word, "evaluation": evaluation, "active_range": _active_range(attempt_landmarks)}
+
+
+# Seconds between progress events of /api/evaluate-sign/stream while landmarks are extracted
+STREAM_PROGRESS_INTERVAL = 0.25
+
+
+def _sse(event: str, data: dict) -> str:
+    """One Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _evaluation_events(word: str, mode: str, reference_landmarks: str, extraction: "asyncio.Future",
+                             progress: _ExtractionProgress, timings: StageTimings):
+    """The event stream of /api/evaluate-sign/stream, from extraction to the final result."""
+    outcome = "error"
+    with request_timings(timings):
+        try:
+            reported = None
+            while not extraction.done():
+                frames = progress.frames()
+                if frames != reported:
+                    reported = frames
+                    yield _sse("progress", {"stage": "extracting", "frame": frames, "total": progress.total})
+                await asyncio.wait({extraction}, timeout=STREAM_PROGRESS_INTERVAL)
+            try:
+                attempt_landmarks, upload_key = await extraction
+            except (PoolSaturatedError, UploadError) as e:
+                yield _sse("error", {"detail": str(e), "status": getattr(e, "status_code", 400)})
+                return
+            except ValueError as e:
+                yield _sse("error", {"detail": f"Video processing error: {str(e)}", "status": 400})
+                return
+            except Exception as e:
+                yield _sse("error", {"detail": f"Failed to process video: {str(e)}", "status": 500})
+                return
+            frames = progress.frames()
+            if (frames, progress.total) != (reported, frames):
+                yield _sse("progress", {"stage": "extracting", "frame": frames, "total": frames})
+
+            yield _sse("progress", {"stage": "evaluating"})
+            evaluation = None
+            try:
+                if mode == "local":
+                    evaluation = await asyncio.to_thread(_score_locally, word, attempt_landmarks)
+                else:
+                    fallback = partial(_score_locally, word, attempt_landmarks) if mode == "auto" else None
+                    async for event, data in stream_gemini_response(reference_landmarks, attempt_landmarks,
+                                                                     cache_key=upload_key, fallback=fallback):
+                        if event == "result":
+                            evaluation = data
+                        else:
+                            yield _sse(event, data)
+            except (PoolSaturatedError, GeminiUnavailableError) as e:
+                if mode != "auto":
+                    yield _sse("error", {"detail": str(e), "status": e.status_code, "retry_after": e.retry_after})
+                    return
+                note_fallback()
+                evaluation = await asyncio.to_thread(_score_locally, word, attempt_landmarks)
+            except Exception as e:
+                yield _sse("error", {"detail": f"AI evaluation failed: {str(e)}", "status": 500})
+                return
+
+            outcome = "fallback" if timings.fallback else "ok"
+            yield _sse("result", {
+                "word": word,
+                "evaluation": evaluation.model_dump(),
+                "active_range": _active_range(attempt_landmarks),
+            })
+        finally:
+            if not extraction.done():
+                extraction.cancel()  # the client went away: stop reading and abandon the worker's job
+            progress.close()
+            observe_request(timings, _metric_word(word), outcome)
+
+
+@app.post("/api/evaluate-sign/stream", openapi_extra=VIDEO_UPLOAD_BODY)
+async def evaluate_sign_stream(word: str, request: Request, mode: Optional[str] = None):
+    """
+    /api/evaluate-sign, answered as a stream of Server-Sent Events:
+
+        progress  {"stage": "extracting", "frame": N, "total": M or null} while landmarks are extracted
+        progress  {"stage": "evaluating"}
+        score     {"overall_score_0_to_4": 3}       as soon as Gemini has written it
+        summary   {"summary": "..."}
+        pros      {"points": [...]}
+        cons      {"points": [...]}
+        result    {word, evaluation, active_range}  as /api/evaluate-sign returns, validated
+        error     {"detail": ..., "status": ...}    instead of the rest, if evaluation fails
+
+    The stream starts once the upload is in; problems found before that
+    (bad upload, unknown word) get the usual HTTP errors. score, summary,
+    pros and cons are previews read from Gemini's partial answer; they are
+    skipped for cached and local evaluations. `mode` picks the scorer, as for /rating.
+    """
+    mode = _evaluation_mode(mode)
+    try:
+        reference_landmarks = _load_reference(word)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No reference found for word '{word}'.")
+
+    upload = StreamedUpload(request, "video", MAX_FILE_SIZE)
+    try:
+        await upload.open()
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    mime = upload.content_type.split(";")[0].strip().lower()
+    if mime not in VIDEO_SUFFIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid video type: {upload.content_type}. Allowed: mp4, webm."
+        )
+
+    progress = _ExtractionProgress(new_progress_file())
+    timings = StageTimings()
+    with request_timings(timings):  # the extraction task runs with this request's timings
+        extraction = asyncio.ensure_future(
+            _extract_streamed(word, upload, VIDEO_SUFFIXES[mime], progress=progress)
+        )
+    extraction.add_done_callback(_ignore_result)
+
+    # Read the whole upload before responding: once the response starts, the request body can't be read
+    uploaded = asyncio.ensure_future(progress.uploaded.wait())
+    await asyncio.wait({extraction, uploaded}, return_when=asyncio.FIRST_COMPLETED)
+    uploaded.cancel()
+    if extraction.done() and extraction.exception() is not None:
+        progress.close()
+        observe_request(timings, _metric_word(word), "error")
+        try:
+            extraction.result()
+        except PoolSaturatedError:
+            raise
+        except UploadTooLargeError:
+            raise HTTPException(status_code=400, detail="Video file too large. Maximum size: 50MB")
+        except UploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Video processing error: {str(e)}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
+
+    return StreamingResponse(
+        _evaluation_events(word, mode, reference_landmarks, extraction, progress, timings),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# /api/evaluate-landmarks takes a JSON or binary body instead of a multipart upload
+LANDMARK_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {
+                "type": "object",
+                "description": "Landmark sequence in the format the server extracts (see schemas/landmarks.py)",
+            }},
+            "application/octet-stream": {"schema": {
+                "type": "string", "format": "binary",
+                "description": "Compact binary .lmk landmark file (see services/landmark_format.py)",
+            }},
+        },
     }
-    mime = (video.content_type or "").split(";")[0].strip().lower()
-    if mime not in CONTENT_TYPE_TO_SUFFIX:
+}
+
+
+@app.post("/api/evaluate-landmarks", openapi_extra=LANDMARK_UPLOAD_BODY)
+async def evaluate_landmarks(word: str, request: Request, mode: Optional[str] = None):
+    """
+    Evaluate landmarks the client extracted itself (e.g. MediaPipe in the browser).
+
+    The body is the landmark JSON the server's extractor produces
+    (application/json) or the binary .lmk format (application/octet-stream),
+    optionally with Content-Encoding: gzip. Landmarks must come from mirrored
+    (selfie-view) frames, as the server's own extraction does. No video is
+    decoded and no model runs on the server. `mode` picks the scorer, as for /rating.
+    Returns the evaluation wrapped as { word, evaluation: { ... } }.
+    """
+    mode = _evaluation_mode(mode)
+
+    content_type = request.headers.get("content-type", "")
+    note_container("lmk" if content_type.startswith("application/octet-stream") else "json")
+    try:
+        with timed_stage("upload_read"):
+            body = await read_body(request, MAX_LANDMARK_SIZE)
+        attempt_landmarks, _ = parse_client_landmarks(
+            body,
+            content_type,
+            request.headers.get("content-encoding", ""),
+            word,
+        )
+    except UploadTooLargeError:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid video type: {video.content_type}. Allowed: mp4, webm."
+            detail=f"Landmarks too large. Maximum size: {MAX_LANDMARK_SIZE // (1024*1024)}MB"
         )
-    file_suffix = CONTENT_TYPE_TO_SUFFIX[mime]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid landmarks: {str(e)}")
+
+    try:
+        reference_landmarks = _load_reference(word)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No reference found for word '{word}'.")
+
+    upload_key = cache_key(attempt_landmarks, word, "client-landmarks")
+    try:
+        evaluation = await _evaluate(word, reference_landmarks, attempt_landmarks, mode, upload_key)
+    except (PoolSaturatedError, GeminiUnavailableError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI evaluation failed: {str(e)}")
+
+    return {"word": word, "evaluation": evaluation}
 
-    video_content = await video.read()
 
-    MAX_FILE_SIZE = 50 * 1024 * 1024
-    if len(video_content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="Video file too large. Maximum size: 50MB")
-    if len(video_content) == 0:
-        raise HTTPException(status_code=400, detail="Video file is empty")
+# Most attempts one /api/evaluate-batch request may carry, and the largest body it accepts
+MAX_BATCH_ATTEMPTS = 32
+MAX_BATCH_SIZE = 4 * MAX_LANDMARK_SIZE
+
+BATCH_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {
+                "type": "object",
+                "properties": {"attempts": {
+                    "type": "array",
+                    "maxItems": MAX_BATCH_ATTEMPTS,
+                    "items": {"type": "object", "description": "Landmark sequence, as for /api/evaluate-landmarks"},
+                }},
+                "required": ["attempts"],
+            }},
+        },
+    }
+}
+
+
+def _parse_batch_attempt(item, word: str) -> str:
+    if not isinstance(item, dict):
+        raise ValueError("Each attempt must be a landmark JSON object")
+    attempt_landmarks, _ = parse_client_landmarks(json.dumps(item).encode(), "application/json", "", word)
+    return attempt_landmarks
+
+
+async def _score_locally_or_error(word: str, attempt_landmarks: str) -> object:
+    """_score_locally in a worker thread; returns the error instead of raising it."""
+    try:
+        return await asyncio.to_thread(_score_locally, word, attempt_landmarks)
+    except Exception as e:
+        return e
+
+
+async def _evaluate_many(word: str, reference_landmarks: str, attempts: Dict[int, str], mode: str) -> Dict[int, object]:
+    """Evaluate attempts (index -> landmarks); each result is an EvaluationResponse or the error it met."""
+    if mode == "local":
+        scored = await asyncio.gather(*(_score_locally_or_error(word, attempt) for attempt in attempts.values()))
+        return dict(zip(attempts, scored))
+
+    indices = list(attempts)
+    results = await get_gemini_batch_async(
+        reference_landmarks,
+        [attempts[i] for i in indices],
+        cache_keys=[cache_key(attempts[i], word, "client-landmarks") for i in indices],
+    )
+    evaluated = {}
+    for i, result in zip(indices, results):
+        if isinstance(result, Exception) and mode == "auto":
+            note_fallback()
+            result = await _score_locally_or_error(word, attempts[i])
+        evaluated[i] = result
+    return evaluated
+
+
+@app.post("/api/evaluate-batch", openapi_extra=BATCH_UPLOAD_BODY)
+async def evaluate_batch(word: str, request: Request, mode: Optional[str] = None):
+    """
+    Evaluate several client-extracted attempts at one word in one request,
+    e.g. a whole class's attempts. The body is { "attempts": [ ... ] }, each
+    attempt in the landmark JSON format /api/evaluate-landmarks accepts,
+    optionally with Content-Encoding: gzip. With Gemini, attempts are graded
+    GEMINI_BATCH_MAX_SIZE per call, sharing the prompt and the reference.
+
+    Attempts succeed or fail on their own: `results` has one entry per
+    attempt, in order, either { evaluation: { ... } } or { error: "..." }.
+    `mode` picks the scorer, as for /rating.
+    """
+    mode = _evaluation_mode(mode)
 
+    note_container("json")
     try:
-        attempt_landmarks = convert_video_to_json(word, video_content, suffix=file_suffix)
+        with timed_stage("upload_read"):
+            body = await read_body(request, MAX_BATCH_SIZE)
+        items = json.loads(decompress(body, request.headers.get("content-encoding", ""), MAX_BATCH_SIZE))
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large. Maximum size: {MAX_BATCH_SIZE // (1024*1024)}MB"
+        )
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"Video processing error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Invalid batch: {str(e)}")
+
+    items = items.get("attempts") if isinstance(items, dict) else None
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail='Invalid batch: expected { "attempts": [ ... ] } with at least one attempt.')
+    if len(items) > MAX_BATCH_ATTEMPTS:
+        raise HTTPException(status_code=400, detail=f"Too many attempts. Maximum: {MAX_BATCH_ATTEMPTS}")
+
+    try:
+        reference_landmarks = _load_reference(word)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No reference found for word '{word}'.")
+
+    results, attempts = {}, {}
+    for i, item in enumerate(items):
+        try:
+            attempts[i] = _parse_batch_attempt(item, word)
+        except ValueError as e:
+            results[i] = {"error": f"Invalid landmarks: {str(e)}"}
+
+    try:
+        evaluated = await _evaluate_many(word, reference_landmarks, attempts, mode)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"AI evaluation failed: {str(e)}")
+
+    for i, result in evaluated.items():
+        results[i] = {"error": str(result)} if isinstance(result, Exception) else {"evaluation": result}
+    return {"word": word, "results": [results[i] for i in range(len(items))]}
+
 
+# Job mode: uploads are stored and evaluated in the background (see job_queue.py)
+JOB_UPLOAD_DIR = JOBS_DIR / "uploads"
+
+
+async def _run_job(job: Job) -> dict:
+    """Evaluate a stored upload, as /api/evaluate-sign would have."""
+    word, mode = job.payload["word"], job.payload["mode"]
+    evaluation = None
+    with request_timings() as timings:
+        try:
+            attempt_landmarks, upload_key = await _extract_streamed(
+                word, FileUpload(job.payload["upload"]), job.payload["suffix"]
+            )
+            reference_landmarks = _load_reference(word)
+            evaluation = await _evaluate(word, reference_landmarks, attempt_landmarks, mode, upload_key)
+        finally:
+            outcome = "error" if evaluation is None else "fallback" if timings.fallback else "ok"
+            observe_request(timings, _metric_word(word), outcome)
+    return {
+        "word": word,
+        "evaluation": evaluation.model_dump(),
+        "active_range": _active_range(attempt_landmarks),
+    }
+
+
+def _job_retryable(error: Exception) -> bool:
+    # Busy or failing services, crashed workers and detector timeouts. A video that can't be
+    # decoded won't improve, and neither will a missing upload or an unreadable reference.
+    return isinstance(error, (PoolSaturatedError, GeminiUnavailableError, WorkerCrashedError, TimeoutError))
+
+
+def _delete_job_upload(job: Job) -> None:
     try:
-        reference_landmarks = load_reference_landmarks(word)
+        os.unlink(job.payload["upload"])
+    except OSError:
+        pass
+
+
+job_queue = JobQueue(
+    JOBS_DIR / "jobs.sqlite3",
+    max_attempts=JOB_MAX_ATTEMPTS,
+    visibility_timeout=JOB_VISIBILITY_TIMEOUT,
+)
+job_runner = JobRunner(
+    job_queue, _run_job, _job_retryable,
+    workers=JOB_WORKERS,
+    on_finished=_delete_job_upload,
+    retention=JOB_RETENTION,
+)
+
+
+async def _store_upload(request: Request) -> Tuple[str, str]:
+    """Save the uploaded video (multipart field `video`) for a job. Returns (path, suffix)."""
+    upload = StreamedUpload(request, "video", MAX_FILE_SIZE)
+    await upload.open()
+    mime = upload.content_type.split(";")[0].strip().lower()
+    if mime not in VIDEO_SUFFIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid video type: {upload.content_type}. Allowed: mp4, webm."
+        )
+
+    JOB_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=VIDEO_SUFFIXES[mime], dir=JOB_UPLOAD_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in upload:
+                f.write(chunk)
+            if f.tell() == 0:
+                raise UploadError("Video file is empty")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, VIDEO_SUFFIXES[mime]
+
+
+def _job_status(job: Job) -> dict:
+    body = {
+        "job_id": job.id,
+        "status": job.status,
+        "word": job.payload["word"],
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+    if job.status == "done":
+        body["result"] = job.result
+    elif job.error is not None:
+        body["error"] = job.error  # for queued jobs, why the last attempt failed
+    return body
+
+
+@app.post("/jobs", status_code=202, openapi_extra=VIDEO_UPLOAD_BODY)
+async def submit_job(word: str, request: Request, mode: Optional[str] = None):
+    """
+    Queue a video (multipart field `video`, mp4 or webm) for evaluation and
+    return at once with { job_id, status: "queued", status_url }.
+
+    Poll GET /jobs/{job_id} for the result. Jobs are stored in SQLite, so they
+    survive a restart; a job interrupted by a crash is picked up again and
+    transient failures are retried. `mode` picks the scorer, as for /rating.
+    """
+    mode = _evaluation_mode(mode)
+    try:
+        _load_reference(word)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"No reference found for word '{word}'.")
+    if await asyncio.to_thread(job_queue.depth) >= JOB_QUEUE_MAX:
+        raise PoolSaturatedError("job", 503, 30)
+
+    try:
+        path, suffix = await _store_upload(request)
+    except UploadTooLargeError:
+        raise HTTPException(status_code=400, detail="Video file too large. Maximum size: 50MB")
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    payload = {"word": word, "mode": mode, "upload": path, "suffix": suffix}
+    try:
+        job_id = await asyncio.to_thread(job_queue.enqueue, payload)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    A job's status: "queued", "running", "done" (with `result`, shaped like
+    the /api/evaluate-sign response) or "failed" (with `error`).
+    """
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job '{job_id}'.")
+    return _job_status(job)
+
+
+# Live recordings: the `format` query parameter of /api/live-sign -> spool suffix.
+# "mjpeg" is one JPEG per binary message, for clients that capture frames themselves.
+LIVE_FORMATS = {"webm": ".webm", "mp4": ".mp4", "mkv": ".mkv", "mjpeg": ".mjpeg"}
+LIVE_MAX_FPS = 60
+# Longest recording a session may stream (and, for mjpeg, at most this many seconds' worth of frames)
+LIVE_MAX_SECONDS = float(os.getenv("LIVE_MAX_SECONDS", "30"))
+# Each session holds an extraction worker for its whole recording, so only some
+# of them may be taken by live sessions; the rest stay free for uploads
+LIVE_MAX_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS", str(max(1, extraction_pool.max_workers // 2))))
+
+
+class _LiveSessions:
+    """Count of live sessions recording at once, with a limit."""
+
+    def __init__(self, limit: int):
+        self.limit = max(0, limit)
+        self.active = 0
+        self.rejected = 0
+
+    def acquire(self) -> bool:
+        if self.active >= self.limit:
+            self.rejected += 1
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {"active": self.active, "limit": self.limit, "rejected": self.rejected,
+                "max_seconds": LIVE_MAX_SECONDS}
+
+
+live_sessions = _LiveSessions(LIVE_MAX_SESSIONS)
 
+# WebSocket close codes (RFC 6455)
+WS_POLICY_VIOLATION = 1008
+WS_MESSAGE_TOO_BIG = 1009
+WS_INTERNAL_ERROR = 1011
+WS_TRY_AGAIN_LATER = 1013
+
+
+async def _close_with_error(websocket: WebSocket, code: int, detail: str) -> None:
+    await websocket.send_json({"type": "error", "detail": detail})
+    await websocket.close(code)
+
+
+@app.websocket("/api/live-sign")
+async def live_sign(websocket: WebSocket, word: str, format: str = "webm", fps: float = 30,
+                    mode: Optional[str] = None):
+    """
+    Evaluate a sign while it is being recorded.
+
+    Protocol:
+        server -> {"type": "ready"} once the word and options are accepted
+        client -> binary messages: MediaRecorder chunks (`format` webm/mp4/mkv,
+                  e.g. recorder.start(250)) or one JPEG per frame (`format` mjpeg)
+        client -> {"type": "stop"} when recording ends ({"type": "cancel"} to abandon)
+        server -> {"type": "extracted", "wait_ms": ..., "active_range": {...}} landmarks ready,
+                  `wait_ms` after stop; active_range as for /api/evaluate-sign
+        server -> {"type": "result", "word": ..., "evaluation": {...}} then closes
+        server -> {"type": "error", "detail": ...} then closes, at any point
+
+    Landmarks are extracted by one worker with one set of MediaPipe detectors
+    for the whole session, as the chunks arrive, so after "stop" only the last
+    few frames and the evaluation remain. `fps` is the recording's frame rate
+    (browser recordings are resampled to it). `mode` picks the scorer, as for /rating.
+    Recordings are limited to LIVE_MAX_SECONDS, and at most LIVE_MAX_SESSIONS
+    sessions record at once (others get an error, and close code 1013).
+    Stage timings are recorded on /metrics as for the HTTP endpoints.
+    """
+    with request_timings() as timings:
+        evaluation = await _live_session(websocket, word, format, fps, mode)
+    outcome = "error" if evaluation is None else "fallback" if timings.fallback else "ok"
+    observe_request(timings, _metric_word(word), outcome)
+
+
+async def _live_session(websocket: WebSocket, word: str, format: str, fps: float,
+                        mode: Optional[str]) -> Optional[EvaluationResponse]:
+    """Run one live-sign session; returns the evaluation sent, or None if the session ended without one."""
+    await websocket.accept()
+
+    try:
+        mode = _evaluation_mode(mode)
+        if format not in LIVE_FORMATS:
+            raise ValueError(f"Invalid format: {format}. Allowed: {', '.join(LIVE_FORMATS)}.")
+        if not 0 < fps <= LIVE_MAX_FPS:
+            raise ValueError(f"Invalid fps: {fps}. Must be between 0 and {LIVE_MAX_FPS}.")
+        reference_landmarks = _load_reference(word)
+    except HTTPException as e:
+        return await _close_with_error(websocket, WS_POLICY_VIOLATION, e.detail)
+    except ValueError as e:
+        return await _close_with_error(websocket, WS_POLICY_VIOLATION, str(e))
+    except FileNotFoundError:
+        return await _close_with_error(websocket, WS_POLICY_VIOLATION, f"No reference found for word '{word}'.")
+
+    if not live_sessions.acquire():
+        return await _close_with_error(
+            websocket, WS_TRY_AGAIN_LATER, "Too many live sessions. Please try again shortly."
+        )
     try:
-        evaluation = get_gemini_response(
-            demonstrator_json=reference_landmarks,
-            user_attempt_json=attempt_landmarks
+        await websocket.send_json({"type": "ready"})
+        upload = WebSocketUpload(
+            websocket, MAX_FILE_SIZE, max_duration=LIVE_MAX_SECONDS,
+            max_chunks=int(LIVE_MAX_SECONDS * fps) if format == "mjpeg" else None,
         )
+        attempt_landmarks, upload_key = await _extract_streamed(
+            word, upload, LIVE_FORMATS[format], frame_rate=fps, live=True
+        )
+    except WebSocketDisconnect:
+        return  # the spool was aborted on the way out, which stops the worker
+    except PoolSaturatedError as e:
+        return await _close_with_error(websocket, WS_TRY_AGAIN_LATER, str(e))
+    except UploadTooLargeError:
+        return await _close_with_error(
+            websocket, WS_MESSAGE_TOO_BIG,
+            f"Video file too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
+        )
+    except UploadError as e:
+        return await _close_with_error(websocket, WS_POLICY_VIOLATION, str(e))
+    except ValueError as e:
+        return await _close_with_error(websocket, WS_POLICY_VIOLATION, f"Video processing error: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI evaluation failed: {str(e)}")
+        return await _close_with_error(websocket, WS_INTERNAL_ERROR, f"Failed to process video: {str(e)}")
+    finally:
+        live_sessions.release()
 
-    return {"word": word, "evaluation": evaluation}
+    wait_ms = (time.monotonic() - upload.stopped_at) * 1000 if upload.stopped_at else 0.0
+    await websocket.send_json({
+        "type": "extracted", "wait_ms": round(wait_ms, 1), "active_range": _active_range(attempt_landmarks),
+    })
+
+    try:
+        evaluation = await _evaluate(word, reference_landmarks, attempt_landmarks, mode, upload_key)
+    except (PoolSaturatedError, GeminiUnavailableError) as e:
+        return await _close_with_error(websocket, WS_TRY_AGAIN_LATER, str(e))
+    except Exception as e:
+        return await _close_with_error(websocket, WS_INTERNAL_ERROR, f"AI evaluation failed: {str(e)}")
+
+    await websocket.send_json({"type": "result", "word": word, "evaluation": evaluation.model_dump()})
+    await websocket.close()
+    return evaluation
+
+
+@app.get("/words")
+async def list_words():
+    """Words that have reference landmarks and can be evaluated."""
+    return {"words": reference_store.words()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-stage latency histograms in the Prometheus text format."""
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "pools": {
+            "extraction": extraction_pool.stats(),
+        },
+        "gemini": gemini_client.stats(),
+        "batching": evaluation_batcher.stats(),
+        "live_sessions": live_sessions.stats(),
+        "jobs": {"queue": await asyncio.to_thread(job_queue.stats), "runner": job_runner.stats()},
+        "detectors": worker_stats(),
+        "references": reference_store.stats(),
+        "token_usage": token_usage.stats(),
+        "result_cache": {
+            "landmarks": landmark_cache.stats() if landmark_cache else None,
+            "evaluations": evaluation_cache.stats() if evaluation_cache else None,
+        },
+    }
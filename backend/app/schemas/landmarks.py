@@ -0,0 +1,63 @@
+import os
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+# Longest attempt accepted from a client (30 s at 30 fps by default)
+LANDMARK_MAX_FRAMES = int(os.getenv("LANDMARK_MAX_FRAMES", "900"))
+# MediaPipe's tracker occasionally reports a hand more than max_num_hands
+MAX_HANDS_PER_FRAME = 4
+HAND_POINTS = 21
+
+# Coordinates are normalized to the frame; points of a hand partly out of
+# view fall a little outside [0, 1], pixel coordinates fall far outside
+XY_MIN, XY_MAX = -1.0, 2.0
+Z_MIN, Z_MAX = -1.0, 1.0
+MAX_FPS = 120.0
+
+
+class Point(BaseModel):
+    """One normalized landmark."""
+    model_config = ConfigDict(extra="forbid", allow_inf_nan=False)
+
+    x: float = Field(..., ge=XY_MIN, le=XY_MAX)
+    y: float = Field(..., ge=XY_MIN, le=XY_MAX)
+    z: float = Field(..., ge=Z_MIN, le=Z_MAX)
+
+
+class Hand(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    handedness: Literal["Left", "Right"]
+    landmarks: List[Point] = Field(..., min_length=HAND_POINTS, max_length=HAND_POINTS)
+
+
+class Frame(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    frame_number: int = Field(..., ge=0)
+    hands: List[Hand] = Field(default_factory=list, max_length=MAX_HANDS_PER_FRAME)
+    face_reference: Optional[Dict[str, Point]] = None
+
+
+class LandmarkRecording(BaseModel):
+    """
+    A landmark sequence in the format video_convert produces, as sent by a
+    client that runs MediaPipe itself (on mirrored, selfie-view frames).
+
+    Summary fields of the server's output (total_frames, frames_with_hands,
+    ...) are accepted but ignored; they are recomputed from the frames.
+    """
+    model_config = ConfigDict(extra="ignore", allow_inf_nan=False)
+
+    fps: float = Field(..., gt=0, le=MAX_FPS)
+    face_sample_rate: int = Field(10, ge=1)
+    face_key_points_info: Optional[List[str]] = None
+    frames: List[Frame] = Field(..., min_length=1, max_length=LANDMARK_MAX_FRAMES)
+
+    @model_validator(mode="after")
+    def _frames_in_order(self) -> "LandmarkRecording":
+        for i, frame in enumerate(self.frames):
+            if frame.frame_number != i:
+                raise ValueError(f"frames[{i}] has frame_number {frame.frame_number}; frames must be numbered 0, 1, 2, ...")
+        return self
@@ -0,0 +1,131 @@
+"""
+Trimming idle time off the start and end of a recording.
+
+User recordings usually hold still for a second or two before and after the
+sign, and every one of those frames would otherwise go through both MediaPipe
+models and into the Gemini prompt. Idle frames can't be told apart by hand
+presence (hands at rest are usually in view), but they barely change from one
+frame to the next, so a cheap motion score decides: the share of pixels that
+changed noticeably between consecutive frames, on a ~96 px wide grayscale
+copy (the green channel, sampled with a stride, stands in for luma).
+
+ActiveSegmentTrimmer works on a stream of frames, so it also trims uploads
+that are still arriving. Frames before the motion starts are held back (only
+the last `margin` of them are passed on), and still frames after it are held
+until either motion resumes (a pause within the sign: they are passed on) or
+the stream ends (the trailing idle time: only `margin` of them are passed on).
+Held frames are bounded by `max_hold` so a long pause can't buffer without
+limit; beyond it they are passed on as part of the sign. `max_hold_bytes`
+bounds them by memory as well: three seconds of full-resolution 1080p RGB
+frames would be over half a gigabyte per extraction worker, so large frames
+get a shorter hold (at least the margin) and long trailing idle time at high
+resolutions is partly kept rather than buffered.
+"""
+from collections import deque
+from typing import Deque, Iterable, Iterator, Optional
+
+import cv2
+import numpy as np
+
+# Width of the grayscale copy the motion score is computed on
+MOTION_WIDTH = 96
+# A pixel changed if its value moved by more than this (0-255)
+PIXEL_THRESHOLD = 12
+# A frame is active if more than this share of its pixels changed
+ACTIVE_THRESHOLD = 0.004
+# Consecutive active frames that count as the start of the sign
+MIN_ACTIVE_RUN = 2
+
+
+def small_gray(rgb: np.ndarray) -> np.ndarray:
+    """A ~MOTION_WIDTH wide grayscale copy of an RGB frame."""
+    height, width = rgb.shape[:2]
+    step = max(1, width // (MOTION_WIDTH * 2))
+    size = (MOTION_WIDTH, max(1, round(MOTION_WIDTH * height / width)))
+    return cv2.resize(rgb[::step, ::step, 1], size, interpolation=cv2.INTER_AREA)
+
+
+def motion_score(previous: np.ndarray, current: np.ndarray) -> float:
+    """Share of pixels that changed by more than PIXEL_THRESHOLD."""
+    changed = cv2.absdiff(previous, current) > PIXEL_THRESHOLD
+    return float(np.count_nonzero(changed)) / changed.size
+
+
+class ActiveSegmentTrimmer:
+    """
+    Pass on only the active part of a frame stream, plus `margin_seconds` on each side.
+
+    Usage:
+        trimmer = ActiveSegmentTrimmer(fps)
+        for frame in trimmer.filter(frames):
+            ...
+        trimmer.active_range()  # which source frames were passed on
+    """
+
+    def __init__(self, fps: float, margin_seconds: float = 0.3, max_hold_seconds: float = 3.0,
+                 max_hold_bytes: Optional[int] = None):
+        fps = fps if fps and fps > 0 else 30.0
+        self.margin = max(1, round(margin_seconds * fps))
+        self.max_hold = max(self.margin, round(max_hold_seconds * fps))
+        self.max_hold_bytes = max_hold_bytes
+        self.source_frames = 0
+        self.start: Optional[int] = None
+        self.passed = 0
+        self.found_motion = False
+
+    def filter(self, frames: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        held: Deque[np.ndarray] = deque()  # frames not passed on yet, up to the current one
+        previous = None
+        run = 0
+        started = False
+        max_hold = self.max_hold
+
+        for index, rgb in enumerate(frames):
+            self.source_frames = index + 1
+            if index == 0 and self.max_hold_bytes:
+                max_hold = max(self.margin, min(self.max_hold, self.max_hold_bytes // max(1, rgb.nbytes)))
+            small = small_gray(rgb)
+            active = previous is not None and motion_score(previous, small) > ACTIVE_THRESHOLD
+            previous = small
+            run = run + 1 if active else 0
+            held.append(rgb)
+
+            if not started:
+                if run >= MIN_ACTIVE_RUN:
+                    started = self.found_motion = True
+                    # The sign started with this run: pass on `margin` frames before it
+                    keep = run + self.margin
+                    while len(held) > keep:
+                        held.popleft()
+                    self.start = index + 1 - len(held)
+                    yield from self._release(held, len(held))
+                elif len(held) > max_hold:
+                    held.popleft()
+                continue
+
+            if active:
+                yield from self._release(held, len(held))
+            elif len(held) > max_hold:
+                yield from self._release(held, 1)
+
+        if not started:
+            # No motion found: keep the last frames rather than nothing
+            self.start = self.source_frames - len(held)
+            yield from self._release(held, len(held))
+        else:
+            yield from self._release(held, min(self.margin, len(held)))
+
+    def _release(self, held: Deque[np.ndarray], count: int) -> Iterator[np.ndarray]:
+        for _ in range(count):
+            self.passed += 1
+            yield held.popleft()
+
+    def active_range(self) -> dict:
+        """Source frames [start, end) that were passed on, out of source_frames."""
+        start = self.start or 0
+        return {
+            "start_frame": start,
+            "end_frame": start + self.passed,
+            "source_frames": self.source_frames,
+            "motion_found": self.found_motion,
+        }
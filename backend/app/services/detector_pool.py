@@ -0,0 +1,187 @@
+"""
+Pool of warm MediaPipe detector pairs (Hands + FaceMesh).
+
+Building the MediaPipe graphs and loading their models is a noticeable part of
+the latency for a 2-3 second clip, so detectors are created once per worker and
+reused. A pair is reset after every video so tracking state from one user's
+recording never carries over into the next.
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import mediapipe as mp
+
+mp_face_mesh = mp.solutions.face_mesh
+mp_hands = mp.solutions.hands
+
+
+class DetectorPair:
+    """One Hands + FaceMesh pair, configured like the original per-request detectors."""
+
+    def __init__(self):
+        self.hands = mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=2,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.face_mesh = mp_face_mesh.FaceMesh(
+            max_num_faces=1,
+            refine_landmarks=False,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+
+    def reset(self) -> None:
+        """Restart both graphs so no tracking state survives into the next video."""
+        self.hands.reset()
+        self.face_mesh.reset()
+
+    def close(self) -> None:
+        self.hands.close()
+        self.face_mesh.close()
+
+
+class DetectorPool:
+    """
+    A fixed-size pool of DetectorPairs.
+
+    Pairs are created lazily (or all at once by preload()) and handed out with
+    acquire(). If a pair fails to reset it is discarded and a fresh one is built
+    on the next acquire, so a broken graph can't poison later requests.
+    """
+
+    def __init__(self, size: int = 1):
+        self.size = max(1, size)
+        self._available: "queue.LifoQueue[DetectorPair]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._discarded = 0
+        self._acquisitions = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _try_create(self) -> Optional[DetectorPair]:
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return DetectorPair()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def preload(self) -> None:
+        """Create every pair up front so the first request doesn't pay for model loading."""
+        while True:
+            pair = self._try_create()
+            if pair is None:
+                return
+            self._available.put(pair)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[DetectorPair]:
+        """
+        Borrow a pair for the duration of one video.
+
+        Raises:
+            TimeoutError: if no pair became free within `timeout` seconds
+        """
+        start = time.perf_counter()
+        try:
+            pair = self._available.get_nowait()
+        except queue.Empty:
+            pair = self._try_create()
+            if pair is None:
+                try:
+                    pair = self._available.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError("Timed out waiting for a free MediaPipe detector")
+        waited = time.perf_counter() - start
+
+        with self._lock:
+            self._acquisitions += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+        try:
+            yield pair
+        finally:
+            try:
+                pair.reset()
+            except Exception:
+                pair.close()
+                with self._lock:
+                    self._created -= 1
+                    self._discarded += 1
+            else:
+                self._available.put(pair)
+
+    def close(self) -> None:
+        while True:
+            try:
+                pair = self._available.get_nowait()
+            except queue.Empty:
+                break
+            pair.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            acquisitions = self._acquisitions
+            return {
+                "pid": os.getpid(),
+                "size": self.size,
+                "created": self._created,
+                "available": self._available.qsize(),
+                "discarded": self._discarded,
+                "acquisitions": acquisitions,
+                "avg_wait_ms": round(self._total_wait / acquisitions * 1000, 3) if acquisitions else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+
+DETECTOR_POOL_SIZE = int(os.getenv("DETECTOR_POOL_SIZE", "1"))
+
+# One pool per process. In the extraction process pool each worker preloads its
+# own pair via preload_detectors(), giving one warm pair per worker.
+detector_pool = DetectorPool(size=DETECTOR_POOL_SIZE)
+
+# Latest stats reported by each extraction worker, keyed by pid (parent process only)
+_worker_stats: Dict[int, Dict[str, Any]] = {}
+
+
+def preload_detectors() -> None:
+    """Process-pool initializer: build this worker's detectors before any job arrives."""
+    detector_pool.preload()
+
+
+def run_with_detector_stats(fn, *args, **kwargs):
+    """Run fn in a worker and return (result, that worker's detector stats)."""
+    return fn(*args, **kwargs), detector_pool.stats()
+
+
+def record_worker_stats(stats: Dict[str, Any]) -> None:
+    _worker_stats[stats["pid"]] = stats
+
+
+def worker_stats() -> Dict[str, Any]:
+    """Aggregate the most recent stats reported by each extraction worker."""
+    workers = list(_worker_stats.values())
+    acquisitions = sum(w["acquisitions"] for w in workers)
+    weighted_wait = sum(w["avg_wait_ms"] * w["acquisitions"] for w in workers)
+    return {
+        "workers_reporting": len(workers),
+        "pairs_per_worker": DETECTOR_POOL_SIZE,
+        "acquisitions": acquisitions,
+        "avg_wait_ms": round(weighted_wait / acquisitions, 3) if acquisitions else 0.0,
+        "max_wait_ms": max((w["max_wait_ms"] for w in workers), default=0.0),
+        "discarded": sum(w["discarded"] for w in workers),
+    }
@@ -0,0 +1,249 @@
+"""
+NumPy dynamic time warping (DTW) for landmark sequences.
+
+The recurrence
+
+    acc[i, j] = cost[i, j] + min(acc[i-1, j-1], acc[i-1, j], acc[i, j-1])
+
+depends on the cell to its left, so it looks inherently sequential along a
+row. Unrolling that dependency gives a closed form for a whole row:
+
+    best[j]   = cost[i, j] + min(acc[i-1, j-1], acc[i-1, j])
+    acc[i, j] = C[j] + min_{k <= j} (best[k] - C[k]),  C = cumsum(cost[i])
+
+which is one np.minimum.accumulate per row. Rows are processed top to
+bottom with these options:
+
+  - window: Sakoe-Chiba band. Only cells within `window` frames of the
+    diagonal from (0, 0) to (n-1, m-1) are computed.
+  - max_cost: early abandoning. Every warping path crosses every row, so
+    once a whole row exceeds max_cost the final distance must too, and the
+    comparison stops and returns inf.
+  - dtw_one_to_many: compares one query against many candidates at once
+    (zero-padded to a common length). Candidates are dropped from the
+    batch as they are abandoned.
+
+Features come from the extraction output via landmark_frames(): x/y of
+the 42 hand points (Right then Left) for each frame that has a hand.
+"""
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .landmark_format import HANDEDNESS_CODES, LandmarkSequence
+
+Window = Optional[Union[int, float]]
+
+
+@dataclass
+class DTWResult:
+    distance: float                                 # total cost along the path (inf if abandoned)
+    path: Optional[List[Tuple[int, int]]] = None    # (query frame, reference frame) pairs
+
+    @property
+    def abandoned(self) -> bool:
+        return math.isinf(self.distance)
+
+    @property
+    def normalized(self) -> float:
+        """Mean cost per aligned pair (needs the path)."""
+        if self.path is None:
+            raise ValueError("normalized distance needs return_path=True")
+        return self.distance / len(self.path)
+
+
+def landmark_frames(seq: LandmarkSequence, dims: int = 2, drop_empty: bool = True) -> np.ndarray:
+    """
+    (frames, 42 * dims) float32 array of hand points, Right hand then Left.
+
+    Hands that are not visible are zero. Frames without any hand are dropped
+    unless drop_empty is False.
+    """
+    hands = np.asarray(seq.hands, dtype=np.float32)[..., :dims]
+    out = np.zeros((seq.num_frames, 2, hands.shape[2], dims), dtype=np.float32)
+    for h, label in enumerate(("Right", "Left")):
+        matches = np.asarray(seq.hand_mask) == HANDEDNESS_CODES[label]
+        present = matches.any(axis=1)
+        slot = matches.argmax(axis=1)
+        out[present, h] = hands[present, slot[present]]
+
+    out = out.reshape(seq.num_frames, -1)
+    if drop_empty:
+        out = out[np.asarray(seq.hand_mask).any(axis=1)]
+    return out
+
+
+def frame_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise Euclidean distances between the rows of a (n, d) and b (m, d) -> (n, m)."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    sq = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2.0 * (a @ b.T)
+    return np.sqrt(np.maximum(sq, 0.0))
+
+
+def band_limits(n: int, m: int, window: Window) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-row [lo, hi) column range of a Sakoe-Chiba band around the diagonal
+    from (0, 0) to (n-1, m-1).
+
+    window is a number of frames (int) or a fraction of the longer sequence
+    (float below 1). It is widened when needed to keep the band connected.
+    """
+    rows = np.arange(n)
+    if window is None:
+        return np.zeros(n, dtype=np.int64), np.full(n, m, dtype=np.int64)
+
+    if isinstance(window, float) and window < 1:
+        window = window * max(n, m)
+    slope = (m - 1) / max(n - 1, 1)
+    w = max(float(window), math.ceil(slope), 1.0)
+
+    center = rows * slope
+    lo = np.clip(np.ceil(center - w), 0, m - 1).astype(np.int64)
+    hi = np.clip(np.floor(center + w) + 1, 1, m).astype(np.int64)
+    return lo, hi
+
+
+def dtw(
+    cost: np.ndarray,
+    window: Window = None,
+    max_cost: Optional[float] = None,
+    return_path: bool = False,
+) -> DTWResult:
+    """
+    DTW over a precomputed (n, m) cost matrix.
+
+    Args:
+        cost: non-negative pairwise frame costs
+        window: Sakoe-Chiba band half-width (frames, or fraction if < 1); None = unconstrained
+        max_cost: stop and return inf as soon as the distance is known to exceed this
+        return_path: also return the warping path
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    n, m = cost.shape
+    if n == 0 or m == 0:
+        raise ValueError("DTW needs two non-empty sequences")
+
+    lo, hi = band_limits(n, m, window)
+    limit = np.inf if max_cost is None else max_cost
+    csum = np.cumsum(cost, axis=1)
+    offset = cost - csum  # best[k] - C[k] == min(up, diag)[k] + offset[k]
+
+    # One extra inf column on the left, so acc[i-1, j-1] needs no special case at j = 0
+    acc = np.full((n, m + 1), np.inf)
+    acc[0, 1:hi[0] + 1] = csum[0, :hi[0]]
+    if acc[0].min() > limit:
+        return DTWResult(np.inf)
+
+    for i in range(1, n):
+        l, h = lo[i], hi[i]
+        prev = acc[i - 1]
+        row = np.minimum(prev[l:h], prev[l + 1:h + 1])
+        row += offset[i, l:h]
+        np.minimum.accumulate(row, out=row)
+        row += csum[i, l:h]
+        acc[i, l + 1:h + 1] = row
+        if row.min() > limit:
+            return DTWResult(np.inf)
+
+    distance = float(acc[n - 1, m])
+    if distance > limit:
+        return DTWResult(np.inf)
+    return DTWResult(distance, _backtrack(acc[:, 1:]) if return_path else None)
+
+
+def _backtrack(acc: np.ndarray) -> List[Tuple[int, int]]:
+    i, j = acc.shape[0] - 1, acc.shape[1] - 1
+    path = [(i, j)]
+    while i > 0 or j > 0:
+        if i == 0:
+            j -= 1
+        elif j == 0:
+            i -= 1
+        else:
+            step = int(np.argmin((acc[i - 1, j - 1], acc[i - 1, j], acc[i, j - 1])))
+            i, j = ((i - 1, j - 1), (i - 1, j), (i, j - 1))[step]
+        path.append((i, j))
+    path.reverse()
+    return path
+
+
+def dtw_features(a: np.ndarray, b: np.ndarray, window: Window = None,
+                 max_cost: Optional[float] = None, return_path: bool = False) -> DTWResult:
+    """DTW between two (frames, features) arrays with Euclidean frame cost."""
+    return dtw(frame_distances(a, b), window=window, max_cost=max_cost, return_path=return_path)
+
+
+def dtw_one_to_many(
+    query: np.ndarray,
+    candidates: Sequence[np.ndarray],
+    window: Window = None,
+    max_cost: Optional[float] = None,
+) -> np.ndarray:
+    """
+    DTW distances from one (n, d) query to each (m_k, d) candidate, computed as a batch.
+
+    Returns a float array with one distance per candidate; inf where the
+    candidate was abandoned because it exceeded max_cost.
+    """
+    query = np.asarray(query, dtype=np.float64)
+    k = len(candidates)
+    n = len(query)
+    out = np.full(k, np.inf)
+    if k == 0:
+        return out
+
+    lengths = np.array([len(c) for c in candidates])
+    m = int(lengths.max())
+    padded = np.zeros((k, m, query.shape[1]))
+    for idx, cand in enumerate(candidates):
+        padded[idx, :len(cand)] = cand
+
+    # (n, k, m) costs, so each row of the recurrence is a contiguous (k, m) block;
+    # the zero padding is masked out below and never read back
+    q2 = (query * query).sum(axis=1)
+    c2 = (padded * padded).sum(axis=2)
+    cross = np.ascontiguousarray((padded @ query.T).transpose(2, 0, 1))
+    cost = np.sqrt(np.maximum(q2[:, None, None] + c2[None] - 2.0 * cross, 0.0))
+
+    # Per-candidate band and length as an additive 0 / inf mask
+    cols = np.arange(m)
+    blocked = np.zeros((n, k, m))
+    for idx, length in enumerate(lengths):
+        lo, hi = band_limits(n, int(length), window)
+        blocked[:, idx][(cols[None, :] < lo[:, None]) | (cols[None, :] >= hi[:, None])] = np.inf
+
+    limit = np.inf if max_cost is None else max_cost
+    csum = np.cumsum(cost, axis=2)
+    offset = cost - csum + blocked
+    csum += blocked
+
+    active = np.arange(k)
+    prev = np.full((k, m + 1), np.inf)
+    prev[:, 1:] = csum[0]
+    for i in range(n):
+        if i > 0:
+            row = np.minimum(prev[:, :-1], prev[:, 1:])
+            if len(active) == k:
+                row += offset[i]
+                np.minimum.accumulate(row, axis=1, out=row)
+                row += csum[i]
+            else:
+                row += offset[i, active]
+                np.minimum.accumulate(row, axis=1, out=row)
+                row += csum[i, active]
+            prev[:, 1:] = row
+
+        if max_cost is not None:
+            alive = prev.min(axis=1) <= limit
+            if not alive.all():
+                # Drop abandoned candidates from the rest of the computation
+                active, prev = active[alive], prev[alive]
+                if len(active) == 0:
+                    return out
+
+    final = prev[np.arange(len(active)), lengths[active]]
+    out[active] = np.where(final <= limit, final, np.inf)
+    return out
@@ -0,0 +1,127 @@
+"""
+Frame preprocessing between the decoder and the MediaPipe models.
+
+cv2.VideoCapture hands out full-resolution BGR frames, and the extractors want
+mirrored RGB. Doing that as flip + cvtColor makes two full passes and two
+allocations per frame, which adds up for 1080p/4K phone uploads (MediaPipe
+resizes its input to a few hundred pixels anyway). to_model_rgb downsizes
+first, then converts the color into a new buffer and mirrors it in place.
+The ffmpeg path (video_decode.py) already scales and mirrors inside ffmpeg.
+
+RoiCropper optionally crops each frame to the region around the hands and
+face found in the previous frames, so the models get more pixels on the
+signer than a downscaled full frame gives them. The crop is "sticky": it only
+moves when the signer leaves it, since each move makes MediaPipe lose its
+tracking for a frame. Landmarks found in a crop are mapped back to full-frame
+normalized coordinates (to_full_frame), so the output does not change format.
+"""
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class Box(NamedTuple):
+    """A crop in full-frame normalized coordinates."""
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+
+
+def to_model_rgb(bgr: np.ndarray, max_long_edge: Optional[int] = None) -> np.ndarray:
+    """Mirrored RGB from a BGR frame, downsized so its long edge is at most `max_long_edge`."""
+    height, width = bgr.shape[:2]
+    if max_long_edge and max(height, width) > max_long_edge:
+        scale = max_long_edge / max(height, width)
+        bgr = cv2.resize(bgr, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+    rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    cv2.flip(rgb, 1, dst=rgb)
+    return rgb
+
+
+def to_full_frame(x: float, y: float, z: float, box: Optional[Box]) -> Tuple[float, float, float]:
+    """Map a landmark found in a crop back to the full frame. z is scaled like x, as MediaPipe's is."""
+    if box is None:
+        return x, y, z
+    width = box.x1 - box.x0
+    return box.x0 + x * width, box.y0 + y * (box.y1 - box.y0), z * width
+
+
+def to_full_frame_points(points: np.ndarray, box: Optional[Box]) -> np.ndarray:
+    """to_full_frame for an (N, 3) array of x, y, z rows."""
+    if box is None:
+        return points
+    width = box.x1 - box.x0
+    return points * (width, box.y1 - box.y0, width) + (box.x0, box.y0, 0.0)
+
+
+class RoiCropper:
+    """
+    Crop frames to the hands and face of the previous frames.
+
+    The crop covers the last hand and face boxes, grown by `margin` of their
+    size on every side and at least `min_size` of the frame. It is kept until
+    the tracked points come within `margin / 2` of its edge. With no hands in
+    the previous frame, and on every `refresh_every`-th frame, the full frame
+    is used so hands coming into view are found.
+    """
+
+    def __init__(self, margin: float = 0.35, min_size: float = 0.4, refresh_every: int = 30):
+        self.margin = margin
+        self.min_size = min_size
+        self.refresh_every = max(1, refresh_every)
+        self.reset()
+
+    def reset(self) -> None:
+        self._box: Optional[Box] = None
+        self._face: Optional[Box] = None
+        self._frames = 0
+
+    def crop(self, rgb: np.ndarray) -> Tuple[np.ndarray, Optional[Box]]:
+        """(frame to run the models on, its box, or None for the full frame)."""
+        self._frames += 1
+        box = self._box
+        if box is None or self._frames % self.refresh_every == 0:
+            return rgb, None
+        height, width = rgb.shape[:2]
+        x0, x1 = round(box.x0 * width), max(round(box.x1 * width), round(box.x0 * width) + 1)
+        y0, y1 = round(box.y0 * height), max(round(box.y1 * height), round(box.y0 * height) + 1)
+        # Pixel-aligned, so the mapping back uses the crop actually taken
+        aligned = Box(x0 / width, y0 / height, x1 / width, y1 / height)
+        return np.ascontiguousarray(rgb[y0:y1, x0:x1]), aligned
+
+    def update(self, frame_data: dict) -> None:
+        """Feed back the frame's landmarks (full-frame coordinates, as written to the output)."""
+        if frame_data["face_reference"]:
+            self._face = _bounds(frame_data["face_reference"].values())
+        hands = [point for hand in frame_data["hands"] for point in hand["landmarks"]]
+        if not hands:
+            self._box = None
+            return
+        target = _bounds(hands)
+        if self._face is not None:
+            target = Box(min(target.x0, self._face.x0), min(target.y0, self._face.y0),
+                         max(target.x1, self._face.x1), max(target.y1, self._face.y1))
+        if self._box is None or not _contains(self._box, _grow(target, self.margin / 2, 0)):
+            self._box = _grow(target, self.margin, self.min_size)
+
+
+def _bounds(points: Iterable[dict]) -> Box:
+    xs, ys = zip(*((p["x"], p["y"]) for p in points))
+    return Box(min(xs), min(ys), max(xs), max(ys))
+
+
+def _grow(box: Box, margin: float, min_size: float) -> Box:
+    """`box` grown by `margin` of its size per side, at least `min_size` wide and tall, clipped to the frame."""
+    def span(low: float, high: float) -> Tuple[float, float]:
+        pad = max((high - low) * margin, (min_size - (high - low)) / 2, 0)
+        return max(0.0, low - pad), min(1.0, high + pad)
+
+    x0, x1 = span(box.x0, box.x1)
+    y0, y1 = span(box.y0, box.y1)
+    return Box(x0, y0, x1, y1)
+
+
+def _contains(outer: Box, inner: Box) -> bool:
+    return outer.x0 <= inner.x0 and outer.y0 <= inner.y0 and inner.x1 <= outer.x1 and inner.y1 <= outer.y1
@@ -0,0 +1,131 @@
+"""
+Frame-sampling policies: decide per frame which MediaPipe models to run.
+
+Hands are needed on every frame for fluid motion, but the face is only kept as
+a sparse positional reference. Running FaceMesh on frames whose result is
+thrown away wastes most of the face inference, so the extractors ask a policy
+before running each model instead of running both unconditionally.
+
+FaceMesh in video mode needs a few consecutive frames to lock onto a face
+(detection alone often misses a face that tracking would hold), so the sparse
+policies run it on every frame until a face is found, then only on sample
+frames. A face is only kept in the output on sample frames either way.
+"""
+import math
+from typing import Dict, Optional
+
+
+class FrameSamplingPolicy:
+    """
+    Base policy: run every model on every frame, keep the face every
+    `face_sample_rate`-th frame. This is what the extractors did before
+    sampling policies existed.
+    """
+
+    name = "all"
+
+    def __init__(self, face_sample_rate: int = 10):
+        self.face_sample_rate = max(1, face_sample_rate)
+
+    def run_hands(self, frame_number: int) -> bool:
+        return True
+
+    def run_face(self, frame_number: int) -> bool:
+        return True
+
+    def keep_face(self, frame_number: int) -> bool:
+        """Whether a face found on this frame belongs in the output."""
+        return frame_number % self.face_sample_rate == 0
+
+    def observe_face(self, frame_number: int, face_key_points: Optional[Dict[str, dict]]) -> None:
+        """Feed back the face result of a frame the policy chose to process."""
+
+    def reset(self) -> None:
+        """Forget any per-video state before the policy is reused."""
+
+
+class EveryNthFacePolicy(FrameSamplingPolicy):
+    """
+    Hands every frame, face every `face_sample_rate`-th frame (the original output).
+    FaceMesh also runs on every frame while no face is being tracked.
+    """
+
+    name = "every_nth"
+
+    def __init__(self, face_sample_rate: int = 10):
+        super().__init__(face_sample_rate)
+        self.reset()
+
+    def reset(self) -> None:
+        self._tracking = False
+
+    def run_face(self, frame_number: int) -> bool:
+        return not self._tracking or self.keep_face(frame_number)
+
+    def observe_face(self, frame_number: int, face_key_points: Optional[Dict[str, dict]]) -> None:
+        self._tracking = face_key_points is not None
+
+
+class StableFacePolicy(EveryNthFacePolicy):
+    """
+    Like EveryNthFacePolicy, but stops running FaceMesh once the face has stopped
+    moving: after `stable_samples` consecutive samples whose key points all stay
+    within `tolerance` (normalized units) of the previous sample.
+    """
+
+    name = "until_stable"
+
+    def __init__(self, face_sample_rate: int = 10, tolerance: float = 0.01, stable_samples: int = 3):
+        self.tolerance = tolerance
+        self.stable_samples = stable_samples
+        super().__init__(face_sample_rate)
+
+    def reset(self) -> None:
+        super().reset()
+        self._previous: Optional[Dict[str, dict]] = None
+        self._stable_count = 0
+
+    @property
+    def is_stable(self) -> bool:
+        return self._stable_count >= self.stable_samples
+
+    def run_face(self, frame_number: int) -> bool:
+        return not self.is_stable and super().run_face(frame_number)
+
+    def observe_face(self, frame_number: int, face_key_points: Optional[Dict[str, dict]]) -> None:
+        super().observe_face(frame_number, face_key_points)
+        if not self.keep_face(frame_number):
+            return  # acquisition frame; stability is judged on sample frames only
+        if face_key_points is None:
+            self._previous = None
+            self._stable_count = 0
+            return
+
+        if self._previous is not None and _max_displacement(self._previous, face_key_points) <= self.tolerance:
+            self._stable_count += 1
+        else:
+            self._stable_count = 0
+        self._previous = face_key_points
+
+
+def _max_displacement(a: Dict[str, dict], b: Dict[str, dict]) -> float:
+    return max(
+        math.hypot(a[name]['x'] - b[name]['x'], a[name]['y'] - b[name]['y'])
+        for name in a.keys() & b.keys()
+    )
+
+
+SAMPLING_POLICIES = {
+    FrameSamplingPolicy.name: FrameSamplingPolicy,
+    EveryNthFacePolicy.name: EveryNthFacePolicy,
+    StableFacePolicy.name: StableFacePolicy,
+}
+
+
+def make_sampling_policy(name: str = EveryNthFacePolicy.name, face_sample_rate: int = 10) -> FrameSamplingPolicy:
+    """Build a policy by name ('all', 'every_nth' or 'until_stable')."""
+    try:
+        policy_cls = SAMPLING_POLICIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown frame sampling policy '{name}'. Options: {', '.join(SAMPLING_POLICIES)}")
+    return policy_cls(face_sample_rate=face_sample_rate)
@@ -0,0 +1,426 @@
+"""
+A durable job queue in SQLite, and the workers that run its jobs.
+
+Evaluating a video (extraction plus the Gemini call) can take longer than a
+proxy lets a request stay open, and work in flight used to be lost when the
+server restarted. In job mode the upload is stored and queued, the request
+returns a job id at once, and JobRunner workers run the job in the
+background while the client polls for the result.
+
+Jobs live in one SQLite file (WAL mode), so they survive restarts and
+several server processes can share the queue. A worker that claims a job
+holds a lease on it for `visibility_timeout` seconds and renews it while it
+works. If the worker dies, the lease runs out and another worker claims
+the job again. Failed jobs are retried with a growing delay if the error is
+one retrying can fix, up to `max_attempts` claims in all.
+
+States:
+    queued   waiting to run (again); `available_at` is when it may be claimed
+    running  claimed; `available_at` is when the claim's lease expires
+    done     finished; `result` holds the handler's return value
+    failed   gave up; `error` says why
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+JOBS_DIR = Path(os.getenv("JOBS_DIR", Path(tempfile.gettempdir()) / "handinhand-jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "1000"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(24 * 3600)))
+
+STATES = ("queued", "running", "done", "failed")
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+"""
+
+
+@dataclass
+class Job:
+    id: str
+    payload: Dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    result: Any
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            result=json.loads(row["result"]) if row["result"] is not None else None,
+            error=row["error"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+
+class JobQueue:
+    """
+    Usage:
+        queue = JobQueue(JOBS_DIR / "jobs.sqlite3")
+        job_id = queue.enqueue({"word": "hello", ...})
+        job = queue.claim("worker-1")        # None when nothing is ready
+        queue.complete(job.id, "worker-1", {"score": 3})
+        queue.get(job_id).status             # "done"
+
+    Args:
+        path: SQLite database file; created on first use
+        max_attempts: claims a job gets before it fails for good
+        visibility_timeout: seconds a claim lasts unless renewed with extend()
+        retry_delay: delay before the first retry; doubles with each further attempt
+    """
+
+    def __init__(self, path: Path, max_attempts: int = 3, visibility_timeout: float = 300.0,
+                 retry_delay: float = 5.0):
+        self.path = Path(path)
+        self.max_attempts = max(1, max_attempts)
+        self.visibility_timeout = visibility_timeout
+        self.retry_delay = retry_delay
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per operation: operations run on whichever thread asyncio.to_thread picks
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    db = sqlite3.connect(self.path, timeout=30)
+                    try:
+                        db.execute("PRAGMA journal_mode=WAL")
+                        db.executescript(_SCHEMA)
+                    finally:
+                        db.close()
+                    self._initialized = True
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        db = self._connect()
+        try:
+            db.execute(
+                "INSERT INTO jobs (id, payload, status, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), self.max_attempts, now, now, now),
+            )
+        finally:
+            db.close()
+        return job_id
+
+    def claim(self, owner: str) -> Optional[Job]:
+        """
+        Take the oldest job that is ready to run: queued and due, or running
+        with an expired lease (its worker died). Returns None if there is none.
+        """
+        db = self._connect()
+        try:
+            while True:
+                now = time.time()
+                db.execute("BEGIN IMMEDIATE")
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE status IN ('queued', 'running') AND available_at <= ?"
+                    " ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                if row["attempts"] >= row["max_attempts"]:
+                    # Its last claim's lease ran out: the job keeps taking its worker down with it
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', lease_owner = NULL, updated_at = ?,"
+                        " error = COALESCE(error, 'Job was abandoned by its worker too many times') WHERE id = ?",
+                        (now, row["id"]),
+                    )
+                    db.execute("COMMIT")
+                    continue
+                db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?,"
+                    " available_at = ?, updated_at = ? WHERE id = ?",
+                    (owner, now + self.visibility_timeout, now, row["id"]),
+                )
+                db.execute("COMMIT")
+                return self._get(db, row["id"])
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _update_claimed(self, job_id: str, owner: str, assignments: str, *values: Any) -> bool:
+        """Update a job this owner still holds; False if its lease was lost to another worker."""
+        db = self._connect()
+        try:
+            cursor = db.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ?"
+                " WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (*values, time.time(), job_id, owner),
+            )
+            return cursor.rowcount == 1
+        finally:
+            db.close()
+
+    def extend(self, job_id: str, owner: str) -> bool:
+        """Renew the lease on a running job."""
+        return self._update_claimed(job_id, owner, "available_at = ?", time.time() + self.visibility_timeout)
+
+    def complete(self, job_id: str, owner: str, result: Any) -> bool:
+        return self._update_claimed(
+            job_id, owner, "status = 'done', lease_owner = NULL, result = ?, error = NULL", json.dumps(result)
+        )
+
+    def fail(self, job_id: str, owner: str, error: str, retry: bool = False) -> Optional[str]:
+        """
+        Record a failed attempt. With `retry`, the job is queued again after a
+        backoff unless it has used all its attempts. Returns the job's new
+        status, or None if the lease was lost.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if retry and job.attempts < job.max_attempts:
+            delay = self.retry_delay * 2 ** (job.attempts - 1)
+            updated = self._update_claimed(
+                job_id, owner, "status = 'queued', lease_owner = NULL, available_at = ?, error = ?",
+                time.time() + delay, error,
+            )
+            return "queued" if updated else None
+        updated = self._update_claimed(job_id, owner, "status = 'failed', lease_owner = NULL, error = ?", error)
+        return "failed" if updated else None
+
+    def release(self, job_id: str, owner: str) -> bool:
+        """Give a claimed job back without counting the attempt (e.g. on shutdown)."""
+        return self._update_claimed(
+            job_id, owner, "status = 'queued', lease_owner = NULL, available_at = ?, attempts = attempts - 1",
+            time.time(),
+        )
+
+    @staticmethod
+    def _get(db: sqlite3.Connection, job_id: str) -> Optional[Job]:
+        row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row is not None else None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        db = self._connect()
+        try:
+            return self._get(db, job_id)
+        finally:
+            db.close()
+
+    def depth(self) -> int:
+        """Jobs not finished yet (queued or running)."""
+        db = self._connect()
+        try:
+            return db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+        finally:
+            db.close()
+
+    def prune(self, max_age: float) -> List[Job]:
+        """Delete finished jobs last updated more than max_age seconds ago and return them."""
+        cutoff = time.time() - max_age
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute(
+                "SELECT * FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+            ).fetchall()
+            db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,))
+            db.execute("COMMIT")
+            return [Job.from_row(row) for row in rows]
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, int]:
+        db = self._connect()
+        try:
+            counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        finally:
+            db.close()
+        return {state: counts.get(state, 0) for state in STATES}
+
+
+class JobRunner:
+    """
+    Background workers that claim jobs from a JobQueue and run them.
+
+    Usage:
+        runner = JobRunner(queue, handler, is_retryable)
+        runner.start()       # in the server's event loop, e.g. at startup
+        ...
+        await runner.stop()  # jobs still running are handed back to the queue
+
+    Args:
+        queue: the JobQueue to take jobs from
+        handler: async function of a Job; its return value (JSON-serializable) is the job's result
+        is_retryable: whether an exception the handler raised is worth another attempt
+        workers: jobs run at once by this process
+        on_finished: called with jobs that reached done or failed, e.g. to delete their files
+                     (again when a finished job is pruned, so it must tolerate repeats)
+        poll_interval: seconds a worker waits when the queue is empty
+        retention: finished jobs are deleted this many seconds after they finish
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Job], Awaitable[Any]],
+        is_retryable: Callable[[Exception], bool],
+        workers: int = 2,
+        on_finished: Optional[Callable[[Job], None]] = None,
+        poll_interval: float = 0.5,
+        retention: float = 24 * 3600,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.is_retryable = is_retryable
+        self.workers = max(1, workers)
+        self.on_finished = on_finished
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._tasks: List["asyncio.Task"] = []
+        self._next_prune = 0.0
+        self._stats = dict.fromkeys(("done", "failed", "retried", "lost", "errors"), 0)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                await self._prune()
+                job = await asyncio.to_thread(self.queue.claim, self.owner)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job queue unavailable")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # e.g. the queue was locked when the outcome was recorded: the job's
+                # lease runs out and it is run again, but this worker keeps going
+                self._stats["errors"] += 1
+                logger.exception("job %s: could not record the outcome", job.id)
+
+    async def _run(self, job: Job) -> None:
+        heartbeat = asyncio.ensure_future(self._heartbeat(job))
+        try:
+            result = await self.handler(job)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so the next worker starts it right away
+            await asyncio.to_thread(self.queue.release, job.id, self.owner)
+            raise
+        except Exception as e:
+            retry = self.is_retryable(e)
+            logger.warning("job %s attempt %d failed (%s): %s", job.id, job.attempts,
+                           "retrying" if retry else "giving up", e)
+            await self._to_the_end(self._fail(job, str(e) or type(e).__name__, retry))
+        else:
+            await self._to_the_end(self._complete(job, result))
+        finally:
+            heartbeat.cancel()
+
+    @staticmethod
+    async def _to_the_end(coro: Awaitable[None]) -> None:
+        """
+        Await coro, letting it finish even if the worker is cancelled meanwhile: once
+        the queue has recorded an outcome, on_finished and the stats must follow.
+        """
+        task = asyncio.ensure_future(coro)
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            try:
+                await task
+            except Exception:
+                logger.exception("job outcome not recorded while shutting down")
+            raise
+
+    async def _fail(self, job: Job, error: str, retry: bool) -> None:
+        status = await asyncio.to_thread(self.queue.fail, job.id, self.owner, error, retry)
+        self._finished(job, status, "retried" if status == "queued" else "failed")
+
+    async def _complete(self, job: Job, result: Any) -> None:
+        completed = await asyncio.to_thread(self.queue.complete, job.id, self.owner, result)
+        self._finished(job, "done" if completed else None, "done")
+
+    def _finished(self, job: Job, status: Optional[str], outcome: str) -> None:
+        if status is None:
+            # The lease ran out and another worker has the job now; its result wins
+            self._stats["lost"] += 1
+            return
+        self._stats[outcome] += 1
+        if status in ("done", "failed") and self.on_finished is not None:
+            self.on_finished(job)
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            try:
+                await asyncio.to_thread(self.queue.extend, job.id, self.owner)
+            except Exception:
+                logger.exception("job %s: could not extend the lease", job.id)
+
+    async def _prune(self) -> None:
+        if time.monotonic() < self._next_prune:
+            return
+        self._next_prune = time.monotonic() + min(self.retention, 600)
+        for job in await asyncio.to_thread(self.queue.prune, self.retention):
+            if self.on_finished is not None:
+                self.on_finished(job)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "started": bool(self._tasks), **self._stats}
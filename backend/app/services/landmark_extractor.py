@@ -4,6 +4,13 @@ import json
 from pathlib import Path
 import os
 
+try:
+    from .frame_sampling import FrameSamplingPolicy, EveryNthFacePolicy
+    from .landmark_format import write_landmarks
+except ImportError:  # run directly as a script
+    from frame_sampling import FrameSamplingPolicy, EveryNthFacePolicy
+    from landmark_format import write_landmarks
+
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent
 REFERENCE_VIDEOS_DIR = SCRIPT_DIR / 'reference_videos'
@@ -26,7 +33,8 @@ FACE_KEY_POINTS = {
     'mouth_center': 13
 }
 
-def extract_landmarks_from_video(video_path, word, show_preview=True, face_sample_rate=10):
+def extract_landmarks_from_video(video_path, word, show_preview=True, face_sample_rate=10,
+                                 sampling_policy: FrameSamplingPolicy = None):
     """
     Extract hand landmarks (every frame) + face reference (sampled)
     
@@ -36,7 +44,12 @@ def extract_landmarks_from_video(video_path, word, show_preview=True, face_sampl
         show_preview: If True, shows a preview window while processing
         face_sample_rate: Only save face every Nth frame (default: 10)
                          Hands are saved EVERY frame for fluid motion
+        sampling_policy: Decides which models run on each frame
+                         (default: face every face_sample_rate frames)
     """
+    if sampling_policy is None:
+        sampling_policy = EveryNthFacePolicy(face_sample_rate)
+    sampling_policy.reset()
     
     print(f"\n{'='*60}")
     print(f"Extracting landmarks from: {video_path}")
@@ -92,8 +105,10 @@ def extract_landmarks_from_video(video_path, word, show_preview=True, face_sampl
         frame = cv2.flip(frame, 1)
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
-        results_hands = hands.process(rgb)
-        results_face = face_mesh.process(rgb)
+        # Only run the models the sampling policy asks for on this frame
+        results_hands = hands.process(rgb) if sampling_policy.run_hands(frame_count) else None
+        run_face = sampling_policy.run_face(frame_count)
+        results_face = face_mesh.process(rgb) if run_face else None
         
         # Save EVERY frame for hands
         frame_data = {
@@ -103,7 +118,7 @@ def extract_landmarks_from_video(video_path, word, show_preview=True, face_sampl
         }
         
         # Extract hand landmarks - EVERY FRAME
-        if results_hands.multi_hand_landmarks:
+        if results_hands is not None and results_hands.multi_hand_landmarks:
             frames_with_hands += 1
             
             for hand_idx, hand_landmarks in enumerate(results_hands.multi_hand_landmarks):
@@ -131,10 +146,10 @@ def extract_landmarks_from_video(video_path, word, show_preview=True, face_sampl
                         mp_drawing_styles.get_default_hand_connections_style()
                     )
         
-        # Extract face landmarks - ONLY EVERY Nth FRAME
-        if frame_count % face_sample_rate == 0:
+        # Extract face landmarks - ONLY ON FRAMES THE POLICY SAMPLED
+        if run_face:
+            face_key_points = None
             if results_face.multi_face_landmarks:
-                frames_with_face += 1
                 face_landmarks = results_face.multi_face_landmarks[0].landmark
                 
                 face_key_points = {}
@@ -145,11 +160,15 @@ def extract_landmarks_from_video(video_path, word, show_preview=True, face_sampl
                         'y': round(lm.y, 4),
                         'z': round(lm.z, 4)
                     }
-                
+            
+            sampling_policy.observe_face(frame_count, face_key_points)
+            
+            if face_key_points is not None and sampling_policy.keep_face(frame_count):
+                frames_with_face += 1
                 frame_data['face_reference'] = face_key_points
         
-        # Draw face on preview (even if not saving this frame)
-        if show_preview and results_face.multi_face_landmarks:
+        # Draw face on preview (only on frames where FaceMesh ran)
+        if show_preview and results_face is not None and results_face.multi_face_landmarks:
             mp_drawing.draw_landmarks(
                 image=frame,
                 landmark_list=results_face.multi_face_landmarks[0],
@@ -199,7 +218,8 @@ def extract_landmarks_from_video(video_path, word, show_preview=True, face_sampl
         'total_frames': frame_count,
         'frames_with_hands': frames_with_hands,
         'frames_with_face': frames_with_face,
-        'face_sample_rate': face_sample_rate,
+        'face_sample_rate': sampling_policy.face_sample_rate,
+        'frame_sampling_policy': sampling_policy.name,
         'fps': fps,
         'face_key_points_info': list(FACE_KEY_POINTS.keys()),
         'video_file': str(video_path),
@@ -212,14 +232,23 @@ def extract_landmarks_from_video(video_path, word, show_preview=True, face_sampl
     with open(output_path, 'w') as f:
         json.dump(output_data, f, indent=2)
     
+    # Compact binary copy, memory-mapped by landmark_load.load_reference_sequence
+    binary_path = write_landmarks(REFERENCE_LANDMARKS_DIR / f'{word}.lmk', output_data)
+    
     print(f"\n💾 Saved landmarks to: {output_path}")
-    print(f"📊 File size: {output_path.stat().st_size / 1024:.1f} KB")
+    print(f"📊 File size: {output_path.stat().st_size / 1024:.1f} KB "
+          f"(binary: {binary_path.stat().st_size / 1024:.1f} KB)")
     
     return str(output_path)
 
 
-def extract_multiple_videos(video_folder=None, face_sample_rate=10):
-    """Extract landmarks from all videos in a folder"""
+def extract_multiple_videos(video_folder=None, face_sample_rate=10, show_preview=False):
+    """
+    Extract landmarks from all videos in a folder, one at a time.
+
+    For rebuilding the reference library, prefer reference_build.py: it runs
+    in parallel and only re-extracts videos that changed.
+    """
     
     if video_folder is None:
         video_folder = REFERENCE_VIDEOS_DIR
@@ -245,7 +274,7 @@ def extract_multiple_videos(video_folder=None, face_sample_rate=10):
         print(f"Processing: {video_path.name}")
         print(f"{'='*60}")
         
-        extract_landmarks_from_video(str(video_path), word, show_preview=True, face_sample_rate=face_sample_rate)
+        extract_landmarks_from_video(str(video_path), word, show_preview=show_preview, face_sample_rate=face_sample_rate)
         
         print(f"\n✅ Completed: {word}")
     
@@ -0,0 +1,280 @@
+"""
+Compact binary landmark format (.lmk) and converters to/from the JSON format.
+
+The JSON format stores one {"x", "y", "z"} dict per point, pretty-printed,
+which makes a 3 second reference several hundred KB to parse. The binary
+format stores the same data as dense arrays that are memory-mapped on load:
+
+    magic      b"HIHLMK"
+    version    uint16
+    header_len uint32
+    header     UTF-8 JSON: the JSON format's top-level metadata plus the
+               dtype, shape and byte offset of each array
+    arrays     (each starting on a 64-byte boundary)
+        hands       (frames, slots, 21, 3)  float16 or float32, NaN where absent
+        hand_mask   (frames, slots)         uint8: 0 = no hand, 1 = Left, 2 = Right
+        face_frames (samples,)              int32 frame numbers with face data
+        face        (samples, 8, 3)         float16 or float32
+
+There are 2 hand slots, or more for recordings where MediaPipe's tracker
+briefly reported a third hand. Slots keep the order MediaPipe reported the
+hands in, so converting to binary and back reproduces the original JSON (up
+to float16 precision).
+
+Usage:
+    python -m backend.app.services.landmark_format to-bin  path/to/word.json [...]
+    python -m backend.app.services.landmark_format to-json path/to/word.lmk [...]
+"""
+import json
+import struct
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+MAGIC = b"HIHLMK"
+FORMAT_VERSION = 1
+MAX_HANDS = 2  # minimum number of hand slots
+HAND_POINTS = 21
+FACE_POINTS = 8
+_ALIGN = 64
+
+HANDEDNESS_CODES = {"Left": 1, "Right": 2}
+HANDEDNESS_LABELS = {code: label for label, code in HANDEDNESS_CODES.items()}
+
+_PREAMBLE = struct.Struct("<6sHI")
+
+
+@dataclass
+class LandmarkSequence:
+    """Dense-array view of one landmark recording."""
+    meta: Dict[str, Any]
+    hands: np.ndarray            # (frames, slots, 21, 3)
+    hand_mask: np.ndarray        # (frames, slots) uint8
+    face_frames: np.ndarray      # (samples,) int32
+    face: np.ndarray             # (samples, 8, 3)
+    face_key_points: List[str] = field(default_factory=list)
+
+    @property
+    def num_frames(self) -> int:
+        return self.hands.shape[0]
+
+
+def json_to_sequence(data: Dict[str, Any], dtype=np.float16) -> LandmarkSequence:
+    """Convert a parsed landmark JSON dict to a LandmarkSequence."""
+    frames = data.get("frames", [])
+    face_names = list(data.get("face_key_points_info", []))
+    n = len(frames)
+    slots = max([MAX_HANDS] + [len(frame.get("hands", [])) for frame in frames])
+
+    hands = np.full((n, slots, HAND_POINTS, 3), np.nan, dtype=np.float32)
+    hand_mask = np.zeros((n, slots), dtype=np.uint8)
+    face_frames = []
+    face_rows = []
+
+    for i, frame in enumerate(frames):
+        for slot, hand in enumerate(frame.get("hands", [])):
+            hand_mask[i, slot] = HANDEDNESS_CODES.get(hand.get("handedness"), 0)
+            hands[i, slot] = [(lm["x"], lm["y"], lm["z"]) for lm in hand["landmarks"]]
+
+        face_ref = frame.get("face_reference")
+        if face_ref:
+            face_frames.append(frame.get("frame_number", i))
+            face_rows.append([(face_ref[name]["x"], face_ref[name]["y"], face_ref[name]["z"]) for name in face_names])
+
+    meta = {k: v for k, v in data.items() if k != "frames"}
+    return LandmarkSequence(
+        meta=meta,
+        hands=hands.astype(dtype),
+        hand_mask=hand_mask,
+        face_frames=np.asarray(face_frames, dtype=np.int32),
+        face=np.asarray(face_rows, dtype=dtype).reshape(-1, len(face_names), 3),
+        face_key_points=face_names,
+    )
+
+
+def _point(xyz) -> Dict[str, float]:
+    return {"x": round(float(xyz[0]), 4), "y": round(float(xyz[1]), 4), "z": round(float(xyz[2]), 4)}
+
+
+def sequence_to_json(seq: LandmarkSequence) -> Dict[str, Any]:
+    """Convert a LandmarkSequence back to the JSON landmark dict."""
+    face_by_frame = {int(f): i for i, f in enumerate(seq.face_frames)}
+    frames = []
+    for i in range(seq.num_frames):
+        hands = []
+        for slot in range(seq.hand_mask.shape[1]):
+            code = int(seq.hand_mask[i, slot])
+            if code:
+                hands.append({
+                    "handedness": HANDEDNESS_LABELS[code],
+                    "landmarks": [_point(p) for p in seq.hands[i, slot]],
+                })
+        face_ref = None
+        if i in face_by_frame:
+            row = seq.face[face_by_frame[i]]
+            face_ref = {name: _point(row[j]) for j, name in enumerate(seq.face_key_points)}
+        frames.append({"frame_number": i, "hands": hands, "face_reference": face_ref})
+
+    data = dict(seq.meta)
+    data["frames"] = frames
+    return data
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_landmarks(path: Union[str, Path], data: Union[Dict[str, Any], LandmarkSequence], dtype=np.float16) -> Path:
+    """Write landmark JSON data (or a LandmarkSequence) to a .lmk file."""
+    seq = data if isinstance(data, LandmarkSequence) else json_to_sequence(data, dtype=dtype)
+    arrays = {
+        "hands": seq.hands,
+        "hand_mask": seq.hand_mask,
+        "face_frames": seq.face_frames,
+        "face": seq.face,
+    }
+
+    # The header holds the array offsets, so size it first with placeholder offsets
+    layout = {name: {"dtype": str(arr.dtype), "shape": list(arr.shape), "offset": 0} for name, arr in arrays.items()}
+    header = {"meta": seq.meta, "face_key_points": seq.face_key_points, "arrays": layout}
+    header_len = len(json.dumps(header).encode()) + 16 * len(arrays)  # room for offset digits
+    offset = _aligned(_PREAMBLE.size + header_len)
+    for name, arr in arrays.items():
+        layout[name]["offset"] = offset
+        offset = _aligned(offset + arr.nbytes)
+    header_bytes = json.dumps(header).encode().ljust(header_len)
+
+    path = Path(path)
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, arr in arrays.items():
+            f.seek(layout[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(offset)
+    return path
+
+
+def _parse_header(data: bytes, name: str) -> Dict[str, Any]:
+    """Header dict from the start of a .lmk file (preamble + header bytes)."""
+    if len(data) < _PREAMBLE.size:
+        raise ValueError(f"{name} is not a landmark file")
+    magic, version, header_len = _PREAMBLE.unpack(data[:_PREAMBLE.size])
+    if magic != MAGIC:
+        raise ValueError(f"{name} is not a landmark file")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"{name} uses landmark format v{version}; this build reads up to v{FORMAT_VERSION}")
+    try:
+        return json.loads(data[_PREAMBLE.size:_PREAMBLE.size + header_len])
+    except ValueError:
+        raise ValueError(f"{name} has a corrupt header")
+
+
+def read_landmarks(path: Union[str, Path]) -> LandmarkSequence:
+    """
+    Memory-map a .lmk file. Arrays are read-only views backed by the file.
+
+    Raises:
+        ValueError: if the file is not a supported .lmk file
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        header_len = _PREAMBLE.unpack(preamble)[2] if len(preamble) == _PREAMBLE.size else 0
+        header = _parse_header(preamble + f.read(header_len), path.name)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if 0 in shape:
+            arrays[name] = np.empty(shape, dtype=spec["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=spec["dtype"], mode="r", offset=spec["offset"], shape=shape)
+
+    return LandmarkSequence(
+        meta=header["meta"],
+        hands=arrays["hands"],
+        hand_mask=arrays["hand_mask"],
+        face_frames=arrays["face_frames"],
+        face=arrays["face"],
+        face_key_points=header["face_key_points"],
+    )
+
+
+# dtypes each array may have in a .lmk file
+_ARRAY_DTYPES = {
+    "hands": ("float16", "float32"),
+    "hand_mask": ("uint8",),
+    "face_frames": ("int32",),
+    "face": ("float16", "float32"),
+}
+
+
+def parse_landmark_bytes(data: bytes, name: str = "landmark data") -> LandmarkSequence:
+    """
+    Parse .lmk content held in memory, e.g. an upload. Unlike read_landmarks
+    this treats the input as untrusted: the array layout is checked against
+    the buffer before any array is created. Arrays are read-only views of `data`.
+
+    Raises:
+        ValueError: if the data is not a well-formed .lmk file
+    """
+    header = _parse_header(data, name)
+    try:
+        layout = header["arrays"]
+        arrays = {}
+        for array_name, dtypes in _ARRAY_DTYPES.items():
+            spec = layout[array_name]
+            if spec["dtype"] not in dtypes:
+                raise ValueError(f"{name}: {array_name} must be {' or '.join(dtypes)}, not {spec['dtype']}")
+            shape = tuple(int(n) for n in spec["shape"])
+            if any(n < 0 for n in shape):
+                raise ValueError(f"{name}: {array_name} has a negative dimension")
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(shape))
+            offset = int(spec["offset"])
+            if count == 0:
+                arrays[array_name] = np.empty(shape, dtype=dtype)
+                continue
+            if offset < 0 or offset + count * dtype.itemsize > len(data):
+                raise ValueError(f"{name}: {array_name} extends past the end of the data")
+            arrays[array_name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape)
+        meta = dict(header["meta"])
+        face_key_points = [str(point) for point in header["face_key_points"]]
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"{name} has a malformed header: {e}")
+
+    return LandmarkSequence(meta=meta, face_key_points=face_key_points, **arrays)
+
+
+def json_file_to_binary(json_path: Union[str, Path], dtype=np.float16) -> Path:
+    json_path = Path(json_path)
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    return write_landmarks(json_path.with_suffix(".lmk"), data, dtype=dtype)
+
+
+def binary_file_to_json(lmk_path: Union[str, Path]) -> Path:
+    lmk_path = Path(lmk_path)
+    out_path = lmk_path.with_suffix(".json")
+    with open(out_path, "w") as f:
+        json.dump(sequence_to_json(read_landmarks(lmk_path)), f, indent=2)
+    return out_path
+
+
+def main(argv: List[str]) -> None:
+    if len(argv) < 2 or argv[0] not in ("to-bin", "to-json"):
+        print(__doc__)
+        sys.exit(1)
+
+    convert = json_file_to_binary if argv[0] == "to-bin" else binary_file_to_json
+    for src in argv[1:]:
+        out = convert(src)
+        print(f"{src} ({Path(src).stat().st_size / 1024:.1f} KB) -> {out} ({out.stat().st_size / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,189 @@
+"""
+Landmark sequences computed by the client.
+
+A client that runs MediaPipe in the browser can send its landmarks instead of
+a video, so the server skips decoding and inference entirely. Two forms are
+accepted:
+
+  - application/json: the format video_convert produces (schemas/landmarks.py)
+  - application/octet-stream: the compact binary .lmk format (landmark_format.py),
+    about 10x smaller than the JSON before compression
+
+Either may be gzip-compressed (Content-Encoding: gzip). Everything is treated
+as untrusted: the decompressed size, frame count, hand count, handedness,
+face key points and coordinate ranges are all checked, and the result is
+re-serialized into the server's own JSON format before it reaches the scorers.
+"""
+import zlib
+from typing import Tuple
+
+import numpy as np
+from pydantic import ValidationError
+
+from ..schemas.landmarks import (
+    HAND_POINTS, LANDMARK_MAX_FRAMES, MAX_FPS, MAX_HANDS_PER_FRAME,
+    XY_MAX, XY_MIN, Z_MAX, Z_MIN, LandmarkRecording,
+)
+from .landmark_format import (
+    HANDEDNESS_CODES, LandmarkSequence, json_to_sequence, parse_landmark_bytes, sequence_to_json,
+)
+from .json_codec import dumps
+from .video_convert import FACE_KEY_POINTS
+
+# Largest landmark body accepted, after decompression
+MAX_LANDMARK_SIZE = 16 * 1024 * 1024
+
+LANDMARK_CONTENT_TYPES = ("application/json", "application/octet-stream")
+
+# Validation errors listed in an error message
+_MAX_REPORTED_ERRORS = 3
+
+
+class LandmarkValidationError(ValueError):
+    """The landmark data is malformed or out of range."""
+
+
+def decompress(body: bytes, content_encoding: str, max_size: int = MAX_LANDMARK_SIZE) -> bytes:
+    """Undo a gzip Content-Encoding, refusing to inflate past max_size."""
+    encoding = content_encoding.strip().lower()
+    if encoding in ("", "identity"):
+        return body
+    if encoding != "gzip":
+        raise LandmarkValidationError(f"Unsupported Content-Encoding: {content_encoding}. Allowed: gzip.")
+
+    inflater = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        data = inflater.decompress(body, max_size + 1)
+    except zlib.error as e:
+        raise LandmarkValidationError(f"Invalid gzip data: {e}")
+    if len(data) > max_size or inflater.unconsumed_tail:
+        raise LandmarkValidationError(f"Landmarks too large. Maximum size: {max_size // (1024*1024)}MB decompressed")
+    if not inflater.eof:
+        raise LandmarkValidationError("Invalid gzip data: truncated")
+    return data
+
+
+def _describe(error: ValidationError) -> str:
+    problems = [
+        f"{'.'.join(str(part) for part in e['loc']) or 'body'}: {e['msg']}"
+        for e in error.errors()[:_MAX_REPORTED_ERRORS]
+    ]
+    more = error.error_count() - len(problems)
+    return "; ".join(problems) + (f" (and {more} more)" if more > 0 else "")
+
+
+def _sequence_from_json(data: bytes) -> LandmarkSequence:
+    try:
+        recording = LandmarkRecording.model_validate_json(data)
+    except ValidationError as e:
+        raise LandmarkValidationError(_describe(e))
+
+    names = list(FACE_KEY_POINTS)
+    if recording.face_key_points_info not in (None, names):
+        raise LandmarkValidationError(f"face_key_points_info must be {names}")
+    for frame in recording.frames:
+        if frame.face_reference is not None and sorted(frame.face_reference) != sorted(names):
+            raise LandmarkValidationError(
+                f"frames.{frame.frame_number}.face_reference must have exactly the points {names}"
+            )
+
+    data = recording.model_dump()
+    data["face_key_points_info"] = names
+    return json_to_sequence(data, dtype=np.float32)
+
+
+def _check_range(name: str, values: np.ndarray, low: float, high: float) -> None:
+    if values.size and (values.min() < low or values.max() > high):
+        raise LandmarkValidationError(f"{name} coordinates must be normalized to [{low}, {high}]")
+
+
+def _check_binary_sequence(seq: LandmarkSequence) -> None:
+    """What the JSON schema enforces for JSON input, for a parsed .lmk upload."""
+    n, slots = seq.hand_mask.shape if seq.hand_mask.ndim == 2 else (-1, -1)
+    if seq.hands.shape != (n, slots, HAND_POINTS, 3):
+        raise LandmarkValidationError(f"hands must have shape (frames, slots, {HAND_POINTS}, 3) matching hand_mask")
+    if not 1 <= n <= LANDMARK_MAX_FRAMES:
+        raise LandmarkValidationError(f"Recording must have 1 to {LANDMARK_MAX_FRAMES} frames, not {n}")
+    if slots > MAX_HANDS_PER_FRAME:
+        raise LandmarkValidationError(f"At most {MAX_HANDS_PER_FRAME} hands per frame")
+    if not np.isin(seq.hand_mask, [0, *HANDEDNESS_CODES.values()]).all():
+        raise LandmarkValidationError("hand_mask values must be 0 (no hand), 1 (Left) or 2 (Right)")
+
+    present = seq.hands[seq.hand_mask > 0].astype(np.float32)
+    if not np.isfinite(present).all():
+        raise LandmarkValidationError("Every detected hand needs finite coordinates for all points")
+    _check_range("Hand", present[..., :2], XY_MIN, XY_MAX)
+    _check_range("Hand z", present[..., 2], Z_MIN, Z_MAX)
+
+    names = list(FACE_KEY_POINTS)
+    samples = seq.face_frames.shape[0] if seq.face_frames.ndim == 1 else -1
+    if seq.face.shape != (samples, len(names), 3):
+        raise LandmarkValidationError(f"face must have shape (samples, {len(names)}, 3) matching face_frames")
+    if samples > 0:
+        if seq.face_key_points != names:
+            raise LandmarkValidationError(f"face_key_points must be {names}")
+        if (np.diff(seq.face_frames) <= 0).any() or seq.face_frames[0] < 0 or seq.face_frames[-1] >= n:
+            raise LandmarkValidationError("face_frames must be increasing frame numbers within the recording")
+    face = seq.face.astype(np.float32)
+    if not np.isfinite(face).all():
+        raise LandmarkValidationError("Face coordinates must be finite")
+    _check_range("Face", face[..., :2], XY_MIN, XY_MAX)
+    _check_range("Face z", face[..., 2], Z_MIN, Z_MAX)
+
+    fps = seq.meta.get("fps")
+    if not isinstance(fps, (int, float)) or not 0 < fps <= MAX_FPS:
+        raise LandmarkValidationError(f"meta.fps must be a number in (0, {MAX_FPS}]")
+    rate = seq.meta.get("face_sample_rate", 10)
+    if not isinstance(rate, int) or rate < 1:
+        raise LandmarkValidationError("meta.face_sample_rate must be a positive integer")
+
+
+def _sequence_from_binary(data: bytes) -> LandmarkSequence:
+    try:
+        seq = parse_landmark_bytes(data, "Landmark upload")
+    except ValueError as e:
+        raise LandmarkValidationError(str(e))
+    _check_binary_sequence(seq)
+    return seq
+
+
+def parse_client_landmarks(body: bytes, content_type: str, content_encoding: str, word: str) -> Tuple[str, LandmarkSequence]:
+    """
+    Validate a client's landmark upload and convert it to the server's format.
+
+    Args:
+        body: the request body as received
+        content_type: application/json or application/octet-stream
+        content_encoding: "" or "gzip"
+        word: the word being signed (the upload's own "word" is ignored)
+
+    Returns:
+        (attempt landmark JSON as convert_video_to_json returns it, LandmarkSequence)
+
+    Raises:
+        LandmarkValidationError: if the body is not an acceptable landmark sequence
+    """
+    mime = content_type.split(";")[0].strip().lower()
+    if mime not in LANDMARK_CONTENT_TYPES:
+        raise LandmarkValidationError(
+            f"Invalid content type: {content_type}. Allowed: {', '.join(LANDMARK_CONTENT_TYPES)}."
+        )
+    data = decompress(body, content_encoding)
+    seq = _sequence_from_json(data) if mime == "application/json" else _sequence_from_binary(data)
+
+    frames_with_hands = int((seq.hand_mask > 0).any(axis=1).sum())
+    if frames_with_hands == 0:
+        raise LandmarkValidationError("No hands detected in recording")
+
+    seq.meta = {
+        "word": word,
+        "total_frames": seq.num_frames,
+        "frames_with_hands": frames_with_hands,
+        "frames_with_face": int(seq.face_frames.shape[0]),
+        "face_sample_rate": seq.meta.get("face_sample_rate", 10),
+        "frame_sampling_policy": "client",
+        "fps": seq.meta["fps"],
+        "face_key_points_info": list(FACE_KEY_POINTS),
+    }
+    seq.face_key_points = list(FACE_KEY_POINTS)
+    return dumps(sequence_to_json(seq)), seq
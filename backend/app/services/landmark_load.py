@@ -1,23 +1,37 @@
+from .landmark_format import LandmarkSequence, json_to_sequence, read_landmarks
+from .reference_store import REFERENCE_LANDMARKS_DIR, reference_store
+
+
 def load_reference_landmarks(word: str) -> str:
     """
     Load reference landmarks JSON for a given word.
-    
+
     Args:
         word: The ASL word/sign name
-        
+
     Returns:
-        JSON string of reference landmarks
+        JSON string of reference landmarks (served from the in-memory reference store)
     """
-    import json
-    from pathlib import Path
-
-    # Adjust path to your reference landmarks folder
-    # Use absolute path based on this file's location
-    services_dir = Path(__file__).parent
-    reference_path = services_dir / "reference_landmarks" / f"{word}.json"
-    
-    if not reference_path.exists():
-        raise FileNotFoundError(f"No reference landmarks found for '{word}'")
-    
-    with open(reference_path, 'r') as f:
-        return json.dumps(json.load(f))
\ No newline at end of file
+    return reference_store.get_json(word)
+
+
+def load_reference_sequence(word: str) -> LandmarkSequence:
+    """
+    Load reference landmarks for a given word as dense arrays.
+
+    Prefers the binary `{word}.lmk` file, which is memory-mapped rather than
+    parsed, and falls back to converting the cached `{word}.json` when there
+    is no binary file or it is older than the JSON.
+
+    Args:
+        word: The ASL word/sign name
+
+    Returns:
+        LandmarkSequence for the word
+    """
+    entry = reference_store.get(word)  # raises FileNotFoundError for unknown words
+    binary_path = REFERENCE_LANDMARKS_DIR / f"{word}.lmk"
+    if binary_path.exists() and binary_path.stat().st_mtime_ns >= entry.mtime_ns:
+        return read_landmarks(binary_path)
+
+    return json_to_sequence(entry.data)
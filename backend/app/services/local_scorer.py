@@ -0,0 +1,290 @@
+"""
+Local, deterministic sign scoring as a fast alternative to Gemini.
+
+The attempt and the reference are compared directly on their landmarks:
+
+  1. Normalize each frame. Hand shape is taken relative to the wrist and
+     divided by the recording's palm length, so it does not depend on where
+     the hand is or how far it is from the camera. Hand location is the
+     wrist relative to the nose, divided by face height. If either recording
+     has no face samples, location falls back to the wrist's offset from its
+     mean position, divided by palm length.
+  2. Align the two sequences in time with dynamic time warping (DTW), so
+     signing faster or slower than the reference is not penalized.
+  3. Average the per-frame cost along the alignment path.
+  4. Compare how much the hands move over the whole sign. DTW matches every
+     reference frame to its closest attempt frame, so an attempt that holds
+     one pose from the middle of the sign would otherwise be close to a sign
+     made near that pose. An attempt that moves much less than the reference
+     has a motion penalty added to its cost. The amount of motion is the
+     distance the wrist and fingers travel in normalized units, so it does
+     not depend on signing speed.
+  5. Map the cost to the same 0-4 scale Gemini uses, and derive pros/cons
+     from the shape, location, hand-presence and motion components.
+
+Only frames with at least one hand are compared. Scoring a typical attempt
+takes a few milliseconds.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ..schemas.evaluation import EvaluationResponse, ProsCons
+from .dtw import dtw
+from .landmark_format import HANDEDNESS_CODES, LandmarkSequence
+
+WRIST, MIDDLE_MCP = 0, 9
+HAND_ORDER = ("Right", "Left")
+
+# Weights of the per-frame cost components
+SHAPE_WEIGHT = 1.0
+LOCATION_WEIGHT = 1.0
+MISSING_HAND_COST = 1.0
+# Added to the cost in full for an attempt without motion, and scaled down to
+# nothing for one with at least MOTION_RATIO_TOLERANCE of the reference's motion
+MOTION_WEIGHT = 0.8
+MOTION_RATIO_TOLERANCE = 0.6
+# References with less motion than this are held signs, which get no motion penalty
+MIN_REFERENCE_MOTION = 0.3
+# Frames averaged before measuring motion, so landmark jitter does not count as movement
+MOTION_SMOOTHING = 3
+
+# Cost at or below each threshold earns the score (4, 3, 2, 1); above the last, 0.
+# A re-extraction of a reference at lower resolution and frame rate costs 0.05-0.25,
+# different signs that share a location (hello/father) 0.55-0.75, unrelated signs 1.0+,
+# one pose of the sign held still 1.1-1.3.
+SCORE_THRESHOLDS = (0.3, 0.6, 0.9, 1.2)
+
+# Component levels above which a con is reported
+SHAPE_TOLERANCE = 0.3
+LOCATION_TOLERANCE = 0.35
+PRESENCE_TOLERANCE = 0.2
+
+
+@dataclass
+class SignFeatures:
+    """Per-frame normalized features of the frames that contain a hand."""
+    frames: np.ndarray     # (T,) frame numbers
+    present: np.ndarray    # (T, 2) bool, hand in HAND_ORDER is visible
+    shape: np.ndarray      # (T, 2, 20, 2) finger points relative to the wrist, in palm lengths
+    location: np.ndarray   # (T, 2, 2) wrist position in face heights (or palm lengths)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+
+@dataclass
+class LocalScore:
+    score: int
+    cost: float
+    shape_error: float
+    location_error: float
+    presence_mismatch: float
+    duration_ratio: float
+    path_length: int
+    motion_ratio: float = 1.0  # attempt's motion / reference's (1.0 for held reference signs)
+
+
+def _first_slot(seq: LandmarkSequence, label: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(frames, 21, 3) points of the first hand with this label in each frame, and a presence mask."""
+    matches = seq.hand_mask == HANDEDNESS_CODES[label]
+    present = matches.any(axis=1)
+    slot = matches.argmax(axis=1)
+    points = np.asarray(seq.hands, dtype=np.float32)[np.arange(seq.num_frames), slot]
+    return points, present
+
+
+def _face_frame(seq: LandmarkSequence, frames: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Nose position and face height at the nearest face sample for each frame, or None."""
+    names = seq.face_key_points
+    if len(seq.face_frames) == 0 or not {"nose_tip", "forehead", "chin"} <= set(names):
+        return None
+
+    face = np.asarray(seq.face, dtype=np.float32)[:, :, :2]
+    samples = np.asarray(seq.face_frames)
+    idx = np.clip(np.searchsorted(samples, frames), 0, len(samples) - 1)
+    prev = np.clip(idx - 1, 0, len(samples) - 1)
+    nearest = np.where(np.abs(samples[prev] - frames) < np.abs(samples[idx] - frames), prev, idx)
+
+    nose = face[nearest, names.index("nose_tip")]
+    height = np.linalg.norm(face[:, names.index("forehead")] - face[:, names.index("chin")], axis=1)
+    return nose, np.maximum(height[nearest], 1e-3)
+
+
+def extract_features(seq: LandmarkSequence, use_face: bool = True) -> SignFeatures:
+    """Normalize a landmark sequence into SignFeatures."""
+    per_hand = [_first_slot(seq, label) for label in HAND_ORDER]
+    points = np.stack([p for p, _ in per_hand], axis=1)             # (F, 2, 21, 3)
+    present = np.stack([m for _, m in per_hand], axis=1)           # (F, 2)
+
+    keep = present.any(axis=1)
+    points, present = points[keep], present[keep]
+    frame_numbers = np.flatnonzero(keep)
+
+    # Palm length per hand over the whole recording. Measured in 3D and taken as
+    # the median because a palm facing the camera collapses to almost nothing in 2D.
+    palm_3d = np.linalg.norm(points[:, :, MIDDLE_MCP] - points[:, :, WRIST], axis=-1)
+    palm = np.ones(len(HAND_ORDER), dtype=np.float32)
+    for h in range(len(HAND_ORDER)):
+        if present[:, h].any():
+            palm[h] = max(float(np.median(palm_3d[present[:, h], h])), 1e-3)
+
+    points = points[..., :2]
+    wrist = points[:, :, WRIST]                                     # (T, 2, 2)
+    shape = (points[:, :, 1:] - wrist[:, :, None]) / palm[None, :, None, None]
+
+    face = _face_frame(seq, frame_numbers) if use_face else None
+    if face is not None:
+        nose, height = face
+        location = (wrist - nose[:, None]) / height[:, None, None]
+    else:
+        origin = wrist[present].mean(axis=0)
+        location = (wrist - origin) / palm[present.any(axis=0)].mean()
+
+    shape = np.where(present[:, :, None, None], shape, 0.0)
+    location = np.where(present[:, :, None], location, 0.0)
+    return SignFeatures(frame_numbers, present, shape.astype(np.float32), location.astype(np.float32))
+
+
+def cost_components(a: SignFeatures, b: SignFeatures) -> Dict[str, np.ndarray]:
+    """
+    Pairwise frame costs between two feature sequences, each (len(a), len(b)).
+
+    shape and location are averaged over the hands visible in both frames,
+    presence is the fraction of hands visible in only one of them.
+    """
+    both = a.present[:, None] & b.present[None, :]              # (Ta, Tb, 2)
+    either = a.present[:, None] | b.present[None, :]
+    shared = np.maximum(both.sum(axis=-1), 1)
+
+    shape_d = np.linalg.norm(a.shape[:, None] - b.shape[None, :], axis=-1).mean(axis=-1)   # (Ta, Tb, 2)
+    loc_d = np.linalg.norm(a.location[:, None] - b.location[None, :], axis=-1)            # (Ta, Tb, 2)
+
+    return {
+        "shape": np.where(both, shape_d, 0.0).sum(axis=-1) / shared,
+        "location": np.where(both, loc_d, 0.0).sum(axis=-1) / shared,
+        "presence": (either & ~both).sum(axis=-1) / np.maximum(either.sum(axis=-1), 1),
+    }
+
+
+def frame_cost(components: Dict[str, np.ndarray]) -> np.ndarray:
+    return (SHAPE_WEIGHT * components["shape"]
+            + LOCATION_WEIGHT * components["location"]
+            + MISSING_HAND_COST * components["presence"])
+
+
+def motion_amount(features: SignFeatures) -> float:
+    """
+    Distance the hands travel over the sign: wrist location plus the mean
+    movement of the finger points, after a MOTION_SMOOTHING-frame moving average.
+    """
+    kernel = np.ones(MOTION_SMOOTHING, dtype=np.float32) / MOTION_SMOOTHING
+    total = 0.0
+    for h in range(len(HAND_ORDER)):
+        visible = features.present[:, h]
+        if visible.sum() <= MOTION_SMOOTHING:
+            continue
+        location = features.location[visible, h]
+        shape = features.shape[visible, h]
+        points = np.concatenate([location[:, None], shape], axis=1)      # (T, 21, 2)
+        smoothed = np.apply_along_axis(np.convolve, 0, points, kernel, mode="valid")
+        step = np.linalg.norm(np.diff(smoothed, axis=0), axis=-1)        # (T - 1, 21)
+        total += float(step[:, 0].sum() + step[:, 1:].mean(axis=1).sum())
+    return total
+
+
+def motion_penalty(ratio: float) -> float:
+    """0 at or above MOTION_RATIO_TOLERANCE of the reference's motion, rising to 1 without motion."""
+    return max(0.0, 1.0 - ratio / MOTION_RATIO_TOLERANCE)
+
+
+def score_from_cost(cost: float) -> int:
+    for score, threshold in zip((4, 3, 2, 1), SCORE_THRESHOLDS):
+        if cost <= threshold:
+            return score
+    return 0
+
+
+def score_sequences(attempt: LandmarkSequence, reference: LandmarkSequence) -> LocalScore:
+    """
+    Compare an attempt to a reference.
+
+    Raises:
+        ValueError: if either sequence has no frames with hands
+    """
+    use_face = len(attempt.face_frames) > 0 and len(reference.face_frames) > 0
+    a = extract_features(attempt, use_face)
+    b = extract_features(reference, use_face)
+    if len(a) == 0 or len(b) == 0:
+        raise ValueError("No hands detected in video")
+
+    components = cost_components(a, b)
+    alignment = dtw(frame_cost(components), return_path=True)
+    path = alignment.path
+    rows, cols = map(np.asarray, zip(*path))
+    along = {name: float(values[rows, cols].mean()) for name, values in components.items()}
+
+    reference_motion = motion_amount(b)
+    motion_ratio = motion_amount(a) / reference_motion if reference_motion >= MIN_REFERENCE_MOTION else 1.0
+    cost = alignment.normalized + MOTION_WEIGHT * motion_penalty(motion_ratio)
+
+    return LocalScore(
+        score=score_from_cost(cost),
+        cost=round(cost, 4),
+        shape_error=round(along["shape"], 4),
+        location_error=round(along["location"], 4),
+        presence_mismatch=round(along["presence"], 4),
+        duration_ratio=round(len(a) / len(b), 3),
+        path_length=len(path),
+        motion_ratio=round(motion_ratio, 3),
+    )
+
+
+_SUMMARIES = {
+    4: "Excellent! Your sign closely matches the reference.",
+    3: "Good attempt. Your sign is close to the reference with a few small differences.",
+    2: "Fair attempt. The sign is recognizable but some parts differ from the reference.",
+    1: "The sign only partly matches the reference. Compare your attempt with the demonstration.",
+    0: "This attempt does not match the reference sign. Watch the demonstration and try again.",
+}
+
+
+def to_evaluation(result: LocalScore) -> EvaluationResponse:
+    """Express a LocalScore in the same shape as Gemini's evaluation."""
+    pros, cons = [], []
+
+    if result.shape_error <= SHAPE_TOLERANCE:
+        pros.append("Handshape matches the reference well.")
+    else:
+        cons.append("Handshape differs from the reference; check your finger positions.")
+
+    if result.location_error <= LOCATION_TOLERANCE:
+        pros.append("Hand position relative to your face is on target.")
+    else:
+        cons.append("Hand position differs from the reference; check where you sign relative to your face.")
+
+    if result.presence_mismatch <= PRESENCE_TOLERANCE:
+        pros.append("Uses the same hands as the reference.")
+    else:
+        cons.append("Hand usage differs; check whether the sign uses one hand or two.")
+
+    if result.motion_ratio < MOTION_RATIO_TOLERANCE:
+        cons.append("Your hands barely moved; the sign needs the full movement shown in the reference.")
+
+    if result.duration_ratio < 0.5:
+        cons.append("The sign was much shorter than the reference; slow down and complete the movement.")
+    elif result.duration_ratio > 2.0:
+        cons.append("The sign took much longer than the reference; try a smoother, continuous motion.")
+
+    return EvaluationResponse(
+        overall_score_0_to_4=result.score,
+        summary=_SUMMARIES[result.score],
+        pros=ProsCons(points=pros[:3]),
+        cons=ProsCons(points=cons[:3]),
+    )
+
+
+def evaluate_locally(attempt: LandmarkSequence, reference: LandmarkSequence) -> EvaluationResponse:
+    """Score an attempt against a reference without calling Gemini."""
+    return to_evaluation(score_sequences(attempt, reference))
@@ -0,0 +1,194 @@
+"""
+Per-stage latency metrics for the rating pipeline.
+
+Each request gets a StageTimings that collects how long it spent in each
+stage (upload read, decode, hands, face, serialize, reference load, Gemini
+call, parse). Code times a stage with `with timed_stage("decode"): ...`,
+which adds to the timings of the request being served (a context variable,
+so deeply nested code needs no extra arguments) and does nothing outside a
+request. Work that runs in a pool is wrapped in collect_timings, which
+returns the worker's timings next to its result for the caller to merge;
+this works for the extraction processes as well as the Gemini threads.
+
+When a request finishes, its timings are observed into Prometheus
+histograms (served as text on /metrics by render_prometheus) and written
+into a Server-Timing header. Labels are the stage, the word, the input
+container and the outcome: "ok", "fallback" (Gemini failed or couldn't
+score and a fallback answered) or "error" (the request failed).
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Histogram buckets in seconds, from a single frame's inference to a slow Gemini call
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+OUTCOMES = ("ok", "fallback", "error")
+
+_current: "contextvars.ContextVar[Optional[StageTimings]]" = contextvars.ContextVar("stage_timings", default=None)
+
+
+class StageTimings:
+    """Seconds spent per stage by one request, in the order the stages first ran."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.container: Optional[str] = None
+        self.fallback = False
+        self.started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def merge(self, worker: Dict[str, object]) -> None:
+        """Add the timings a collect_timings call returned."""
+        for stage, seconds in worker["stages"].items():
+            self.add(stage, seconds)
+        self.fallback = self.fallback or bool(worker["fallback"])
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """A Server-Timing header value, durations in milliseconds."""
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def request_timings(timings: Optional[StageTimings] = None) -> Iterator[StageTimings]:
+    """
+    Collect the stages timed in this context (one request) into a new StageTimings,
+    or into `timings` to carry on with one a request started earlier.
+    """
+    timings = timings if timings is not None else StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def current_timings() -> Optional[StageTimings]:
+    return _current.get()
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Add the time spent in the block to `stage` of the current request, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - start)
+
+
+def timed_frames(frames: Iterable, stage: str = "decode") -> Iterator:
+    """Pass `frames` through, adding the time spent producing each one to `stage`."""
+    timings = _current.get()
+    if timings is None:
+        yield from frames
+        return
+    iterator = iter(frames)
+    while True:
+        start = time.perf_counter()
+        try:
+            frame = next(iterator)
+        except StopIteration:
+            timings.add(stage, time.perf_counter() - start)
+            return
+        timings.add(stage, time.perf_counter() - start)
+        yield frame
+
+
+def note_container(container: str) -> None:
+    """Record the upload's container (webm, mp4, json, lmk, ...) on the current request, if any."""
+    timings = _current.get()
+    if timings is not None:
+        timings.container = container
+
+
+def note_fallback() -> None:
+    """Mark the current request as answered by a fallback rather than a scored Gemini response."""
+    timings = _current.get()
+    if timings is not None:
+        timings.fallback = True
+
+
+def collect_timings(fn: Callable, *args, **kwargs) -> Tuple[object, Dict[str, object]]:
+    """Run fn (in a worker) and return (result, its timings) for StageTimings.merge."""
+    with request_timings() as timings:
+        result = fn(*args, **kwargs)
+    return result, {"stages": timings.stages, "fallback": timings.fallback}
+
+
+class Histograms:
+    """Prometheus histograms keyed by label values, rendered in the text exposition format."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], seconds: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{pairs},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{pairs},le="+Inf"}} {series[len(self.buckets)]}')
+            lines.append(f"{self.name}_sum{{{pairs}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{pairs}}} {series[len(self.buckets)]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+stage_seconds = Histograms(
+    "handinhand_stage_seconds", "Time spent in each stage of the rating pipeline.",
+    ("stage", "word", "container", "outcome"),
+)
+request_seconds = Histograms(
+    "handinhand_request_seconds", "Time to answer a rating request, from start to response.",
+    ("word", "container", "outcome"),
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def observe_request(timings: StageTimings, word: str, outcome: str) -> None:
+    """Record a finished request's stages and total time."""
+    container = timings.container or "unknown"
+    for stage, seconds in timings.stages.items():
+        stage_seconds.observe((stage, word, container, outcome), seconds)
+    request_seconds.observe((word, container, outcome), timings.total())
+
+
+def render_prometheus() -> str:
+    return "\n".join(stage_seconds.render() + request_seconds.render()) + "\n"
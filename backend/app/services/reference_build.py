@@ -0,0 +1,399 @@
+"""
+Parallel, incremental build of the reference landmark library.
+
+Extracts landmarks from every video in reference_videos/ into
+reference_landmarks/<word>.json and <word>.lmk, without a preview window, on
+a pool of worker processes. A manifest (reference_landmarks/.manifest)
+records each video's content hash and the extractor settings it was built
+with, so later runs only re-extract videos that changed, are new, or were
+built by a different extractor. Outputs and the manifest are replaced
+atomically and the manifest is saved after every finished video, so an
+interrupted build resumes where it stopped. With --segment-seconds, long
+videos are also split into segments that extract on several workers at once
+(segment_extract.py).
+
+Usage (from backend/):
+    python -m app.services.reference_build                   # build what changed
+    python -m app.services.reference_build hello please      # only these words
+    python -m app.services.reference_build --force --workers 4
+    python -m app.services.reference_build --segment-seconds 5 long-take
+    python -m app.services.reference_build --dry-run
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import mediapipe as mp
+
+from .detector_pool import preload_detectors
+from .frame_sampling import SAMPLING_POLICIES, EveryNthFacePolicy, make_sampling_policy
+from .json_codec import dumps, loads
+from .landmark_format import write_landmarks
+from .segment_extract import (
+    MIN_SEGMENT_FRAMES, SEGMENT_LEAD_IN, Segment, extract_segment, plan_segments, probe_video, segments_for,
+    stitch_segments,
+)
+from .video_convert import EXTRACTOR_VERSION, _extract_landmarks, _landmarks_json
+
+SERVICES_DIR = Path(__file__).parent
+REFERENCE_VIDEOS_DIR = SERVICES_DIR / "reference_videos"
+REFERENCE_LANDMARKS_DIR = SERVICES_DIR / "reference_landmarks"
+# Not "<something>.json": every .json file in the output directory is served as a word
+MANIFEST_NAME = ".manifest"
+_LEGACY_MANIFEST_NAME = "manifest.json"
+VIDEO_SUFFIXES = (".mp4", ".mov", ".avi", ".webm")
+
+
+def build_fingerprint(face_sample_rate: int = 10, sampling_policy: str = EveryNthFacePolicy.name,
+                      segment_seconds: float = 0) -> str:
+    """
+    Everything besides the video that determines a reference's landmarks.
+    Segmented extraction differs slightly after each boundary, so its settings count too.
+    """
+    segments = f":segments-{segment_seconds:g}/{SEGMENT_LEAD_IN}/{MIN_SEGMENT_FRAMES}" if segment_seconds > 0 else ""
+    return f"{EXTRACTOR_VERSION}:{sampling_policy}:{face_sample_rate}{segments}:mediapipe-{mp.__version__}"
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write via a temp file in the same directory, so readers never see a partial file."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+# Manifest
+
+def load_manifest(out_dir: Path) -> Dict[str, dict]:
+    """Manifest entries keyed by word ({} if there is no readable manifest)."""
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        path = out_dir / _LEGACY_MANIFEST_NAME
+    try:
+        return json.loads(path.read_text()).get("entries", {})
+    except (FileNotFoundError, ValueError, AttributeError):
+        return {}
+
+
+def save_manifest(out_dir: Path, entries: Dict[str, dict]) -> None:
+    data = {"entries": dict(sorted(entries.items()))}
+    write_atomic(out_dir / MANIFEST_NAME, json.dumps(data, indent=2).encode())
+    # Written by earlier builds, where the reference store took it for a word
+    (out_dir / _LEGACY_MANIFEST_NAME).unlink(missing_ok=True)
+
+
+@dataclass
+class BuildPlan:
+    todo: List[Tuple[str, Path, str]] = field(default_factory=list)  # (word, video, reason)
+    up_to_date: List[str] = field(default_factory=list)
+    # Videos whose stat changed but whose content didn't: refresh their manifest stat only
+    touched: Dict[str, dict] = field(default_factory=dict)
+
+
+def find_videos(video_dir: Path, words: Optional[Iterable[str]] = None) -> Dict[str, Path]:
+    videos = {p.stem: p for p in sorted(video_dir.iterdir()) if p.suffix.lower() in VIDEO_SUFFIXES}
+    if words:
+        missing = sorted(set(words) - set(videos))
+        if missing:
+            raise ValueError(f"No reference video for: {', '.join(missing)}")
+        videos = {word: videos[word] for word in words}
+    return videos
+
+
+def plan_build(videos: Dict[str, Path], entries: Dict[str, dict], out_dir: Path,
+               fingerprint: str, force: bool = False) -> BuildPlan:
+    """
+    Decide which videos need extracting. Unchanged size + mtime skips hashing;
+    a changed stat with unchanged content only refreshes the manifest.
+    """
+    plan = BuildPlan()
+    for word, video in videos.items():
+        entry = entries.get(word)
+        st = video.stat()
+        if force:
+            reason = "forced"
+        elif entry is None:
+            reason = "new"
+        elif entry.get("fingerprint") != fingerprint:
+            reason = "extractor changed"
+        elif not all((out_dir / name).exists() for name in entry.get("outputs", ())):
+            reason = "output missing"
+        elif (entry.get("size"), entry.get("mtime_ns")) == (st.st_size, st.st_mtime_ns):
+            reason = None
+        elif entry.get("sha256") == file_sha256(video):
+            reason = None
+            plan.touched[word] = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+        else:
+            reason = "video changed"
+
+        if reason is None:
+            plan.up_to_date.append(word)
+        else:
+            plan.todo.append((word, video, reason))
+    return plan
+
+
+# Extraction (runs in the worker processes)
+
+def extract_reference(video_path: str, word: str, face_sample_rate: int, sampling_policy: str) -> dict:
+    """Landmarks of one reference video, plus how long they took."""
+    start = time.perf_counter()
+    policy = make_sampling_policy(sampling_policy, face_sample_rate=face_sample_rate)
+    data = loads(_extract_landmarks(video_path, word, sampling_policy=policy))
+    data["video_file"] = Path(video_path).name
+    return {"data": data, "seconds": time.perf_counter() - start}
+
+
+def extract_reference_segment(video_path: str, segment: Segment, face_sample_rate: int, sampling_policy: str) -> dict:
+    """Frames of one segment of a reference video, plus how long they took."""
+    start = time.perf_counter()
+    frames = extract_segment(video_path, segment, face_sample_rate, sampling_policy)
+    return {"frames": frames, "seconds": time.perf_counter() - start}
+
+
+def join_segments(video_path: str, word: str, segments: List[Segment], parts: List[dict],
+                  face_sample_rate: int, sampling_policy: str) -> dict:
+    """The extract_reference result for a video extracted segment by segment."""
+    _, fps = probe_video(video_path)
+    frames = stitch_segments(segments, [part["frames"] for part in parts])
+    data = loads(_landmarks_json(word, fps, frames, face_sample_rate, sampling_policy))
+    data["video_file"] = Path(video_path).name
+    return {"data": data, "seconds": sum(part["seconds"] for part in parts)}
+
+
+def _init_worker() -> None:
+    preload_detectors()
+
+
+def save_reference(out_dir: Path, word: str, data: dict) -> Dict[str, str]:
+    """Atomically write <word>.json and <word>.lmk; returns {file name: sha256}."""
+    json_bytes = dumps(data).encode()
+    write_atomic(out_dir / f"{word}.json", json_bytes)
+
+    tmp = out_dir / f".{word}.lmk.{os.getpid()}.tmp"
+    try:
+        write_landmarks(tmp, data)
+        lmk_bytes = tmp.read_bytes()
+        os.replace(tmp, out_dir / f"{word}.lmk")
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    return {
+        f"{word}.json": hashlib.sha256(json_bytes).hexdigest(),
+        f"{word}.lmk": hashlib.sha256(lmk_bytes).hexdigest(),
+    }
+
+
+# Build
+
+@dataclass
+class BuildSummary:
+    built: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    frames: int = 0
+    extract_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    workers: int = 1
+
+    def report(self) -> str:
+        lines = [
+            f"Built {len(self.built)}, up to date {len(self.skipped)}, failed {len(self.failed)} "
+            f"in {self.wall_seconds:.1f}s with {self.workers} worker(s)",
+        ]
+        if self.built and self.wall_seconds > 0:
+            lines.append(
+                f"  {self.frames} frames: {self.frames / self.wall_seconds:.1f} frames/s, "
+                f"{len(self.built) / self.wall_seconds:.2f} videos/s "
+                f"({self.extract_seconds / len(self.built):.2f}s per video per worker)"
+            )
+        for word, error in sorted(self.failed.items()):
+            lines.append(f"  failed {word}: {error}")
+        return "\n".join(lines)
+
+
+def build_references(
+    video_dir: Path = REFERENCE_VIDEOS_DIR,
+    out_dir: Path = REFERENCE_LANDMARKS_DIR,
+    words: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+    face_sample_rate: int = 10,
+    sampling_policy: str = EveryNthFacePolicy.name,
+    segment_seconds: float = 0,
+    extract: Callable[..., dict] = extract_reference,
+    log: Callable[[str], None] = print,
+) -> BuildSummary:
+    """
+    Extract every reference video that is new or changed since the last build.
+
+    `workers` processes extract in parallel (default: CPU count, at most one
+    per task); workers=0 extracts in this process. A task is a whole video,
+    or with `segment_seconds` > 0 a segment of about that length. The
+    manifest is saved after each finished video.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fingerprint = build_fingerprint(face_sample_rate, sampling_policy, segment_seconds)
+    entries = load_manifest(out_dir)
+    videos = find_videos(video_dir, words)
+    plan = plan_build(videos, entries, out_dir, fingerprint, force)
+
+    if plan.touched or (out_dir / _LEGACY_MANIFEST_NAME).exists():
+        entries.update(plan.touched)
+        save_manifest(out_dir, entries)
+
+    # (word, video, segments or None): one task per segment, or one for the whole video
+    jobs: List[Tuple[str, Path, Optional[List[Segment]]]] = []
+    for word, video, reason in plan.todo:
+        log(f"  {word}: {reason}")
+        segments = None
+        if segment_seconds > 0:
+            try:
+                total_frames, fps = probe_video(str(video))
+                segments = plan_segments(total_frames, segments_for(total_frames, fps, segment_seconds))
+            except ValueError:
+                pass  # unreadable: extracted whole, where the error is recorded as a failure
+        jobs.append((word, video, segments if segments and len(segments) > 1 else None))
+    tasks = sum(len(segments or [None]) for _, _, segments in jobs)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    summary = BuildSummary(skipped=plan.up_to_date, workers=max(1, min(workers, tasks)))
+
+    def finish(word: str, video: Path, result: dict) -> None:
+        data = result["data"]
+        st = video.stat()
+        entries[word] = {
+            "video": video.name,
+            "sha256": file_sha256(video),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "fingerprint": fingerprint,
+            "outputs": save_reference(out_dir, word, data),
+            "frames": data["total_frames"],
+            "seconds": round(result["seconds"], 3),
+        }
+        save_manifest(out_dir, entries)
+        summary.built.append(word)
+        summary.frames += data["total_frames"]
+        summary.extract_seconds += result["seconds"]
+        log(f"  built {word}: {data['total_frames']} frames in {result['seconds']:.1f}s")
+
+    def submit(run: Callable[..., Future], word: str, video: Path, segments: Optional[List[Segment]]) -> list:
+        if segments is None:
+            return [run(extract, str(video), word, face_sample_rate, sampling_policy)]
+        return [run(extract_reference_segment, str(video), segment, face_sample_rate, sampling_policy)
+                for segment in segments]
+
+    def collect(word: str, video: Path, segments: Optional[List[Segment]], results: List[dict]) -> None:
+        if segments is None:
+            finish(word, video, results[0])
+        else:
+            finish(word, video, join_segments(str(video), word, segments, results, face_sample_rate, sampling_policy))
+
+    start = time.perf_counter()
+    if workers == 0:
+        for word, video, segments in jobs:
+            try:
+                collect(word, video, segments, submit(lambda fn, *args: fn(*args), word, video, segments))
+            except Exception as e:
+                summary.failed[word] = str(e)
+    elif jobs:
+        # spawn, not fork: MediaPipe/TFLite threads are not fork-safe
+        with ProcessPoolExecutor(
+            max_workers=summary.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as executor:
+            # future -> job index; a job is collected once all of its futures are done
+            futures = [submit(executor.submit, word, video, segments) for word, video, segments in jobs]
+            pending: Dict[Future, int] = {future: i for i, job in enumerate(futures) for future in job}
+            remaining = [len(job) for job in futures]
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        i = pending.pop(future)
+                        remaining[i] -= 1
+                        if remaining[i]:
+                            continue
+                        word, video, segments = jobs[i]
+                        try:
+                            collect(word, video, segments, [f.result() for f in futures[i]])
+                        except Exception as e:
+                            summary.failed[word] = str(e)
+            except KeyboardInterrupt:
+                for future in pending:
+                    future.cancel()
+                raise
+    summary.wall_seconds = time.perf_counter() - start
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("words", nargs="*", help="only build these words (default: every video)")
+    parser.add_argument("--videos", type=Path, default=REFERENCE_VIDEOS_DIR, help="reference video directory")
+    parser.add_argument("--out", type=Path, default=REFERENCE_LANDMARKS_DIR, help="landmark output directory")
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-extract even if nothing changed")
+    parser.add_argument("--face-sample-rate", type=int, default=10)
+    parser.add_argument("--policy", choices=list(SAMPLING_POLICIES), default=EveryNthFacePolicy.name,
+                        help="frame-sampling policy (see frame_sampling.py)")
+    parser.add_argument("--segment-seconds", type=float, default=0,
+                        help="split videos longer than this into segments extracted in parallel (default: off)")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be extracted")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.dry_run:
+            plan = plan_build(
+                find_videos(args.videos, args.words or None), load_manifest(args.out), args.out,
+                build_fingerprint(args.face_sample_rate, args.policy, args.segment_seconds), args.force,
+            )
+            for word, _, reason in plan.todo:
+                print(f"  {word}: {reason}")
+            print(f"{len(plan.todo)} to extract, {len(plan.up_to_date)} up to date")
+            return 0
+
+        print(f"Building references from {args.videos} into {args.out}")
+        summary = build_references(
+            args.videos, args.out, args.words or None, args.workers, args.force,
+            args.face_sample_rate, args.policy, args.segment_seconds,
+        )
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("\nInterrupted; finished videos are saved and the next run resumes from here.", file=sys.stderr)
+        return 130
+
+    print(summary.report())
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+In-process cache of reference landmarks.
+
+Every word in reference_landmarks/ is loaded once at startup and served from
+memory in both parsed (dict) and pre-serialized (compact JSON string) form.
+Each lookup stats the file; if its mtime or size changed, the file is re-read
+and only re-parsed when its content hash actually differs, so re-extracting a
+reference takes effect without a restart. The word list is served from the
+loaded entries; the directory is only listed again when its own mtime shows
+that a file was added, removed or replaced.
+"""
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .json_codec import dumps, loads
+
+REFERENCE_LANDMARKS_DIR = Path(__file__).parent / "reference_landmarks"
+
+
+@dataclass
+class ReferenceEntry:
+    word: str
+    data: Dict[str, Any]
+    serialized: str
+    digest: str
+    mtime_ns: int
+    size: int
+
+
+class ReferenceStore:
+    """Cache of reference landmark files keyed by word."""
+
+    def __init__(self, directory: Path = REFERENCE_LANDMARKS_DIR):
+        self.directory = Path(directory)
+        self._entries: Dict[str, ReferenceEntry] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._reloads = 0
+        self._scanned_mtime_ns: Optional[int] = None
+
+    def _path(self, word: str) -> Optional[Path]:
+        # Words come from the query string; never let one escape the directory
+        if not word or Path(word).name != word or word.startswith("."):
+            return None
+        return self.directory / f"{word}.json"
+
+    def _load(self, word: str, path: Path, st: os.stat_result, previous: Optional[ReferenceEntry]) -> ReferenceEntry:
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if previous is not None and previous.digest == digest:
+            # Touched but unchanged: keep the parsed data, just remember the new stat
+            previous.mtime_ns, previous.size = st.st_mtime_ns, st.st_size
+            return previous
+
+        data = loads(raw)
+        return ReferenceEntry(
+            word=word,
+            data=data,
+            serialized=dumps(data),
+            digest=digest,
+            mtime_ns=st.st_mtime_ns,
+            size=st.st_size,
+        )
+
+    def _scan(self) -> None:
+        """Load references added to the directory since the last scan and forget removed ones."""
+        try:
+            mtime_ns = self.directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns is not None and mtime_ns == self._scanned_mtime_ns:
+            return
+
+        words = sorted(path.stem for path in self.directory.glob("*.json") if not path.name.startswith("."))
+        for word in words:
+            try:
+                self.get(word)
+            except FileNotFoundError:
+                pass  # removed while scanning; the next scan sees the new mtime
+        with self._lock:
+            for word in set(self._entries) - set(words):
+                del self._entries[word]
+        self._scanned_mtime_ns = mtime_ns
+
+    def preload(self) -> None:
+        """Load every reference in the directory."""
+        self._scanned_mtime_ns = None
+        self._scan()
+
+    def get(self, word: str) -> ReferenceEntry:
+        """
+        Return the cached reference for a word, reloading it if the file changed.
+
+        Raises:
+            FileNotFoundError: if there is no reference for the word
+        """
+        path = self._path(word)
+        try:
+            if path is None:
+                raise FileNotFoundError
+            st = path.stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(word, None)
+            raise FileNotFoundError(f"No reference landmarks found for '{word}'")
+
+        with self._lock:
+            entry = self._entries.get(word)
+            if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+                self._hits += 1
+                return entry
+
+            new_entry = self._load(word, path, st, entry)
+            if entry is not None and new_entry is not entry:
+                self._reloads += 1
+            self._entries[word] = new_entry
+            return new_entry
+
+    def get_json(self, word: str) -> str:
+        return self.get(word).serialized
+
+    def get_data(self, word: str) -> Dict[str, Any]:
+        return self.get(word).data
+
+    def words(self) -> List[str]:
+        """Every word with a reference file on disk."""
+        self._scan()
+        with self._lock:
+            return sorted(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cached_words": len(self._entries),
+                "hits": self._hits,
+                "reloads": self._reloads,
+            }
+
+
+reference_store = ReferenceStore()
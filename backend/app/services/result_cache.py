@@ -0,0 +1,235 @@
+"""
+Content-addressed, two-tier cache for rating pipeline results.
+
+Retries, double submits and re-uploads of the same recording would otherwise
+pay for ffmpeg, MediaPipe and Gemini again. Results are keyed by a hash of the
+uploaded bytes plus everything else that determines them (word, extractor
+settings, prompt version) and kept in:
+
+  - memory: an LRU dict bounded by total size
+  - disk:   one file per entry under RESULT_CACHE_DIR, bounded by total size,
+            so results survive restarts and are shared between workers
+
+Both tiers drop entries older than max_age. Values are strings (landmark JSON,
+serialized EvaluationResponse).
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE", "1") != "0"
+RESULT_CACHE_DIR = Path(os.getenv("RESULT_CACHE_DIR", Path(tempfile.gettempdir()) / "handinhand-cache"))
+RESULT_CACHE_MEMORY_MB = float(os.getenv("RESULT_CACHE_MEMORY_MB", "64"))
+RESULT_CACHE_DISK_MB = float(os.getenv("RESULT_CACHE_DISK_MB", "512"))
+RESULT_CACHE_MAX_AGE = int(os.getenv("RESULT_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+
+def cache_key(*parts: Union[str, bytes]) -> str:
+    """sha256 over the parts, each length-prefixed so ("ab", "c") != ("a", "bc")."""
+    h = hashlib.sha256()
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else part
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Memory LRU in front of a size-capped directory of files.
+
+    Args:
+        name: label used in stats and as the subdirectory name
+        directory: parent directory of the disk tier; None keeps the cache in memory only
+        memory_bytes: size limit of the memory tier
+        disk_bytes: size limit of the disk tier
+        max_age: entries older than this many seconds are treated as missing
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: Optional[Path] = None,
+        memory_bytes: int = 64 * 1024 * 1024,
+        disk_bytes: int = 512 * 1024 * 1024,
+        max_age: float = 7 * 24 * 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
+        self.directory = Path(directory) / name if directory is not None else None
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_age = max_age
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (value, stored_at)
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()    # key -> (size, stored_at)
+        self._disk_size = 0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0,
+                          "evicted": 0, "expired": 0}
+        self._scan_disk()
+
+    # Disk tier
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _scan_disk(self) -> None:
+        """Index files left by earlier runs (or other workers), oldest first."""
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        found = []
+        for path in self.directory.glob("*/*"):
+            if path.name.endswith(".tmp"):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            found.append((st.st_mtime, path.name, st.st_size))
+        for mtime, key, size in sorted(found):
+            self._disk[key] = (size, mtime)
+            self._disk_size += size
+        self._evict_disk()
+
+    def _drop_disk(self, key: str) -> None:
+        size, _ = self._disk.pop(key)
+        self._disk_size -= size
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict_disk(self) -> None:
+        while self._disk and self._disk_size > self.disk_bytes:
+            self._drop_disk(next(iter(self._disk)))
+            self._counters["evicted"] += 1
+
+    def _read_disk(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        entry = self._disk.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.max_age:
+            self._drop_disk(key)
+            self._counters["expired"] += 1
+            return None
+        try:
+            value = self._path(key).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            # Removed by another worker sharing the directory
+            size, _ = self._disk.pop(key)
+            self._disk_size -= size
+            return None
+        self._disk.move_to_end(key)
+        return value, entry[1]
+
+    def _write_disk(self, key: str, value: str, now: float) -> None:
+        data = value.encode("utf-8")
+        if len(data) > self.disk_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)  # readers never see a partial file
+
+        if key in self._disk:
+            self._disk_size -= self._disk.pop(key)[0]
+        self._disk[key] = (len(data), now)
+        self._disk_size += len(data)
+        self._evict_disk()
+
+    # Memory tier
+
+    def _remember(self, key: str, value: str, stored_at: float) -> None:
+        size = len(value)
+        if size > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key)[0])
+        self._memory[key] = (value, stored_at)
+        self._memory_size += size
+        while self._memory_size > self.memory_bytes:
+            _, (old, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    # Public API
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            now = self.clock()
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.max_age:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return entry[0]
+                self._memory_size -= len(self._memory.pop(key)[0])
+                self._counters["expired"] += 1
+
+            if self.directory is not None:
+                found = self._read_disk(key, now)
+                if found is not None:
+                    self._remember(key, *found)
+                    self._counters["disk_hits"] += 1
+                    return found[0]
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            now = self.clock()
+            self._remember(key, value, now)
+            if self.directory is not None:
+                try:
+                    self._write_disk(key, value, now)
+                except OSError:
+                    pass  # a full or read-only disk only costs us the second tier
+            self._counters["puts"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            for key in list(self._disk):
+                self._drop_disk(key)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            return dict(
+                self._counters,
+                hit_rate=round(hits / lookups, 3) if lookups else 0.0,
+                memory_items=len(self._memory),
+                memory_bytes=self._memory_size,
+                disk_items=len(self._disk),
+                disk_bytes=self._disk_size,
+            )
+
+
+def _make_cache(name: str) -> Optional[ResultCache]:
+    if not RESULT_CACHE_ENABLED:
+        return None
+    return ResultCache(
+        name,
+        directory=RESULT_CACHE_DIR,
+        memory_bytes=int(RESULT_CACHE_MEMORY_MB * 1024 * 1024),
+        disk_bytes=int(RESULT_CACHE_DISK_MB * 1024 * 1024),
+        max_age=RESULT_CACHE_MAX_AGE,
+    )
+
+
+# Attempt landmark JSON, keyed by upload + word + extractor settings
+landmark_cache = _make_cache("landmarks")
+# Serialized EvaluationResponse, keyed by upload + word + extractor + prompt version
+evaluation_cache = _make_cache("evaluations")
@@ -0,0 +1,179 @@
+"""
+Segment-parallel landmark extraction for long videos.
+
+_extract_landmarks walks a video frame by frame in one process, so a long
+recording uses one core however many are idle. Here the video is split into
+time segments that are decoded and run through MediaPipe independently (each
+on its own worker), then stitched back into one sequence.
+
+MediaPipe is a tracker: the first frames after a fresh start are detections
+without temporal context, and handedness can come out swapped. So each
+segment also decodes a short lead-in before its first frame, purely to let
+Hands and FaceMesh lock on; those frames are discarded, except that they
+overlap the previous segment's last frames, which is where the two
+segments' handedness is compared and reconciled. Face sampling uses global
+frame numbers, so the stitched output samples the face on the same frames
+a sequential run would.
+"""
+import math
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from itertools import islice
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .detector_pool import detector_pool
+from .frame_sampling import EveryNthFacePolicy, make_sampling_policy
+from .video_convert import _detect_frames, _landmarks_json, _read_capture_frames
+
+# Frames decoded before each segment only to warm up tracking (~0.5 s at 30 fps)
+SEGMENT_LEAD_IN = 15
+# Segments shorter than this cost more in warm-up than they save
+MIN_SEGMENT_FRAMES = 45
+
+_SWAP_HANDEDNESS = {"Left": "Right", "Right": "Left"}
+
+
+@dataclass(frozen=True)
+class Segment:
+    """Frames [start, end) of a video, decoded from start - lead_in. end=None reads to the end."""
+    start: int
+    end: Optional[int]
+    lead_in: int
+
+    @property
+    def first_decoded(self) -> int:
+        return self.start - self.lead_in
+
+
+def probe_video(video_path: str) -> Tuple[int, float]:
+    """(frame count, fps) from the container; the count can be approximate."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Could not open video file")
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS)
+    finally:
+        cap.release()
+
+
+def plan_segments(total_frames: int, segments: int, lead_in: int = SEGMENT_LEAD_IN,
+                  min_frames: int = MIN_SEGMENT_FRAMES) -> List[Segment]:
+    """
+    Split `total_frames` into at most `segments` equal parts of at least
+    `min_frames`. The last segment is open-ended, so an inexact frame count
+    from the container never drops frames.
+    """
+    count = max(1, min(segments, total_frames // max(1, min_frames)))
+    bounds = [round(i * total_frames / count) for i in range(count)]
+    return [
+        Segment(start=start, end=bounds[i + 1] if i + 1 < count else None, lead_in=min(lead_in, start))
+        for i, start in enumerate(bounds)
+    ]
+
+
+def extract_segment(video_path: str, segment: Segment, face_sample_rate: int = 10,
+                    sampling_policy: str = EveryNthFacePolicy.name) -> List[dict]:
+    """
+    Frame dicts for a segment, lead-in included, numbered as in the whole video.
+    Runs in a worker process.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Could not open video file")
+    try:
+        if segment.first_decoded:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, segment.first_decoded)
+            if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != segment.first_decoded:
+                raise ValueError(f"Could not seek to frame {segment.first_decoded}")
+        count = None if segment.end is None else segment.end - segment.first_decoded
+        frames = islice(_read_capture_frames(cap), count)
+
+        policy = make_sampling_policy(sampling_policy, face_sample_rate=face_sample_rate)
+        policy.reset()
+        with detector_pool.acquire() as detectors:
+            return _detect_frames(
+                frames, policy, detectors.hands, detectors.face_mesh, first_frame=segment.first_decoded
+            )
+    finally:
+        cap.release()
+
+
+def _wrist(hand: dict) -> np.ndarray:
+    point = hand["landmarks"][0]
+    return np.array([point["x"], point["y"]])
+
+
+def _handedness_votes(previous: List[dict], lead_in: List[dict]) -> Tuple[int, int]:
+    """
+    (agree, disagree) over hands seen by both segments in their overlap,
+    pairing each hand with the other segment's nearest hand by wrist position.
+    """
+    agree = disagree = 0
+    for before, after in zip(previous, lead_in):
+        for hand in after["hands"]:
+            if not before["hands"]:
+                break
+            nearest = min(before["hands"], key=lambda other: np.linalg.norm(_wrist(other) - _wrist(hand)))
+            if nearest["handedness"] == hand["handedness"]:
+                agree += 1
+            else:
+                disagree += 1
+    return agree, disagree
+
+
+def stitch_segments(segments: List[Segment], results: List[List[dict]]) -> List[dict]:
+    """
+    Join segment results into one frame list. Lead-in frames are dropped; a
+    segment whose hands mostly carry the opposite handedness to the previous
+    segment's over their overlap is relabelled, so a hand keeps its label
+    across the boundary.
+    """
+    stitched: List[dict] = []
+    for segment, frames in zip(segments, results):
+        lead_in, owned = frames[:segment.lead_in], frames[segment.lead_in:]
+        if stitched and lead_in:
+            agree, disagree = _handedness_votes(stitched[-len(lead_in):], lead_in)
+            if disagree > agree:
+                for frame in owned:
+                    for hand in frame["hands"]:
+                        hand["handedness"] = _SWAP_HANDEDNESS.get(hand["handedness"], hand["handedness"])
+        if stitched and owned and owned[0]["frame_number"] != len(stitched):
+            raise ValueError(f"Segment starting at frame {segment.start} decoded from frame {owned[0]['frame_number']}")
+        stitched.extend(owned)
+    return stitched
+
+
+def extract_video_segmented(
+    video_path: str,
+    word: str,
+    segments: int,
+    executor: Optional[Executor] = None,
+    face_sample_rate: int = 10,
+    sampling_policy: str = EveryNthFacePolicy.name,
+) -> str:
+    """
+    Same output as video_convert._extract_landmarks, extracted in up to
+    `segments` parts on `executor` (in this process, one after another, if None).
+
+    Raises:
+        ValueError: if the video can't be opened or no hands are found
+    """
+    total_frames, fps = probe_video(video_path)
+    plan = plan_segments(total_frames, segments)
+    args = (face_sample_rate, sampling_policy)
+    if executor is None:
+        results = [extract_segment(video_path, segment, *args) for segment in plan]
+    else:
+        futures = [executor.submit(extract_segment, video_path, segment, *args) for segment in plan]
+        results = [future.result() for future in futures]
+    return _landmarks_json(word, fps, stitch_segments(plan, results), face_sample_rate, sampling_policy)
+
+
+def segments_for(total_frames: int, fps: float, segment_seconds: float) -> int:
+    """How many segments of about `segment_seconds` a video splits into."""
+    if segment_seconds <= 0 or fps <= 0:
+        return 1
+    return max(1, math.ceil(total_frames / (segment_seconds * fps)))
@@ -0,0 +1,77 @@
+"""
+Tests for motion-based trimming of idle time.
+Run with: python -m pytest backend/app/services/test_active_segment.py
+"""
+import numpy as np
+
+from app.services.active_segment import ActiveSegmentTrimmer
+
+rng = np.random.default_rng(0)
+
+
+def still(count):
+    """Frames of a static scene with a little sensor noise."""
+    base = np.full((90, 160, 3), 120, dtype=np.uint8)
+    return [np.clip(base + rng.integers(-3, 4, base.shape), 0, 255).astype(np.uint8) for _ in range(count)]
+
+
+def moving(count):
+    """A hand-sized block sweeping across the same scene."""
+    frames = still(count)
+    for i, frame in enumerate(frames):
+        x = 20 + 6 * i
+        frame[30:60, x:x + 20] = 230
+    return frames
+
+
+def trim(frames, fps=10, **kwargs):
+    trimmer = ActiveSegmentTrimmer(fps, **kwargs)
+    kept = list(trimmer.filter(iter(frames)))
+    return kept, trimmer.active_range()
+
+
+def test_idle_frames_are_trimmed_with_a_margin():
+    frames = still(15) + moving(10) + still(15)
+    kept, active = trim(frames, margin_seconds=0.3)
+
+    # Frames 15-25 differ from the one before; 3 frames of margin on each side
+    assert active == {"start_frame": 12, "end_frame": 29, "source_frames": 40, "motion_found": True}
+    assert len(kept) == 17
+    assert kept[0] is frames[12] and kept[-1] is frames[28]
+
+
+def test_pauses_inside_the_sign_are_kept():
+    frames = still(5) + moving(5) + still(8) + moving(5) + still(5)
+    kept, active = trim(frames, margin_seconds=0.2)
+
+    assert active["start_frame"] == 3
+    assert active["end_frame"] == 26
+    assert kept == frames[3:26]
+
+
+def test_long_pauses_are_passed_on_instead_of_buffered():
+    frames = still(3) + moving(4) + still(30) + moving(4)
+    kept, active = trim(frames, margin_seconds=0.1, max_hold_seconds=1.0)
+
+    assert active["start_frame"] == 2
+    assert kept == frames[2:]
+
+
+def test_without_motion_the_last_frames_are_kept():
+    kept, active = trim(still(50), margin_seconds=0.1, max_hold_seconds=2.0)
+
+    assert active == {"start_frame": 30, "end_frame": 50, "source_frames": 50, "motion_found": False}
+    assert len(kept) == 20
+
+
+def test_held_frames_are_bounded_by_memory():
+    frames = still(3) + moving(4) + still(30)
+    trimmer = ActiveSegmentTrimmer(10, margin_seconds=0.2, max_hold_bytes=5 * frames[0].nbytes)
+    held = []
+    for _ in trimmer.filter(iter(frames)):
+        held.append(trimmer.source_frames - trimmer.passed)
+
+    assert max(held) <= 5 + 1  # plus the frame just decoded
+    # Only 5 trailing idle frames were held back, 2 of them (the margin) passed on at the end
+    assert trimmer.active_range()["end_frame"] == len(frames) - 3
+    assert trimmer.max_hold == 30 and trim(frames, margin_seconds=0.2)[1]["end_frame"] == 10
@@ -0,0 +1,121 @@
+"""
+Tests for the pool of warm MediaPipe detectors.
+Run with: python -m pytest backend/app/services/test_detector_pool.py
+"""
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.services import detector_pool as pool_module, video_convert
+from app.services.detector_pool import DetectorPool, record_worker_stats, worker_stats
+from app.services.frame_sampling import make_sampling_policy
+from app.services.video_decode import PipeDecoder
+
+VIDEO = Path(__file__).parent / "reference_videos" / "hello.mp4"
+
+
+class FakePair:
+    """Stands in for DetectorPair without building MediaPipe graphs."""
+    fail_reset = False
+
+    def __init__(self):
+        self.resets = 0
+        self.closed = False
+
+    def reset(self):
+        if self.fail_reset:
+            raise RuntimeError("graph broken")
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_pairs(monkeypatch):
+    monkeypatch.setattr(pool_module, "DetectorPair", FakePair)
+
+
+def test_preload_builds_every_pair_once(fake_pairs):
+    pool = DetectorPool(size=2)
+    pool.preload()
+    pool.preload()
+
+    stats = pool.stats()
+    assert (stats["created"], stats["available"]) == (2, 2)
+    with pool.acquire(), pool.acquire():
+        assert pool.stats()["available"] == 0
+    assert pool.stats()["created"] == 2  # nothing built on demand
+
+
+def test_pairs_are_reset_after_every_video(fake_pairs):
+    pool = DetectorPool(size=1)
+    with pool.acquire() as first:
+        assert first.resets == 0
+    with pool.acquire() as second:
+        assert second is first and second.resets == 1
+    assert first.resets == 2
+
+
+def test_pair_that_fails_to_reset_is_replaced(fake_pairs, monkeypatch):
+    pool = DetectorPool(size=1)
+    with pool.acquire() as broken:
+        monkeypatch.setattr(FakePair, "fail_reset", True)
+    monkeypatch.setattr(FakePair, "fail_reset", False)
+
+    assert broken.closed and pool.stats()["discarded"] == 1
+    with pool.acquire() as fresh:
+        assert fresh is not broken
+
+
+def test_waits_for_a_busy_pair_are_measured(fake_pairs):
+    pool = DetectorPool(size=1)
+    held = threading.Event()
+
+    def hold():
+        with pool.acquire():
+            held.set()
+            time.sleep(0.2)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    held.wait()
+    with pool.acquire():
+        pass
+    worker.join()
+
+    stats = pool.stats()
+    assert stats["acquisitions"] == 2
+    assert stats["max_wait_ms"] >= 100
+    assert 0 < stats["avg_wait_ms"] < stats["max_wait_ms"]
+
+    with pool.acquire():
+        with pytest.raises(TimeoutError):
+            with pool.acquire(timeout=0.01):
+                pass
+
+
+def test_worker_stats_weight_waits_by_acquisitions(monkeypatch):
+    monkeypatch.setattr(pool_module, "_worker_stats", {})
+    record_worker_stats({"pid": 1, "acquisitions": 3, "avg_wait_ms": 10.0, "max_wait_ms": 20.0, "discarded": 0})
+    record_worker_stats({"pid": 2, "acquisitions": 1, "avg_wait_ms": 2.0, "max_wait_ms": 2.0, "discarded": 1})
+    record_worker_stats({"pid": 1, "acquisitions": 1, "avg_wait_ms": 2.0, "max_wait_ms": 2.0, "discarded": 0})
+
+    stats = worker_stats()
+    assert (stats["workers_reporting"], stats["acquisitions"], stats["discarded"]) == (2, 2, 1)
+    assert stats["avg_wait_ms"] == 2.0 and stats["max_wait_ms"] == 2.0
+
+
+def test_tracking_does_not_carry_over_between_videos(monkeypatch):
+    # One real pair, used for the same video twice: reset makes the second run start cold
+    monkeypatch.setattr(video_convert, "detector_pool", DetectorPool(size=1))
+    with PipeDecoder(VIDEO.read_bytes(), suffix=".mp4", max_long_edge=320) as decoder:
+        frames, fps = list(decoder), decoder.info.fps
+
+    first = video_convert._extract_from_frames(frames, fps, "hello", make_sampling_policy())
+    second = video_convert._extract_from_frames(frames, fps, "hello", make_sampling_policy())
+
+    assert first == second
+    assert video_convert.detector_pool.stats()["created"] == 1
@@ -0,0 +1,81 @@
+"""
+Tests for the vectorized DTW kernel against a straightforward double loop.
+Run with: python -m pytest backend/app/services/test_dtw.py
+"""
+import numpy as np
+import pytest
+
+from app.services.dtw import band_limits, dtw, dtw_features, dtw_one_to_many, frame_distances, landmark_frames
+from app.services.landmark_load import load_reference_sequence
+
+
+def reference_dtw(cost, window=None):
+    n, m = cost.shape
+    lo, hi = band_limits(n, m, window)
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(lo[i - 1] + 1, hi[i - 1] + 1):
+            acc[i, j] = cost[i - 1, j - 1] + min(acc[i - 1, j - 1], acc[i - 1, j], acc[i, j - 1])
+    return acc[n, m]
+
+
+SHAPES = [(1, 1), (1, 6), (6, 1), (7, 13), (20, 9), (30, 30)]
+WINDOWS = [None, 1, 3, 0.2]
+
+
+@pytest.mark.parametrize("n,m", SHAPES)
+@pytest.mark.parametrize("window", WINDOWS)
+def test_matches_reference_implementation(n, m, window):
+    rng = np.random.default_rng(n * 100 + m)
+    cost = frame_distances(rng.normal(size=(n, 4)), rng.normal(size=(m, 4)))
+
+    result = dtw(cost, window=window, return_path=True)
+
+    assert result.distance == pytest.approx(reference_dtw(cost, window))
+    assert result.path[0] == (0, 0) and result.path[-1] == (n - 1, m - 1)
+    assert sum(cost[i, j] for i, j in result.path) == pytest.approx(result.distance)
+
+
+def test_path_follows_a_time_stretch():
+    a = np.array([[0.0], [1.0], [2.0]])
+    b = np.array([[0.0], [0.0], [1.0], [1.0], [2.0], [2.0]])
+
+    result = dtw_features(a, b, return_path=True)
+
+    assert result.distance == 0
+    assert all(a[i] == b[j] for i, j in result.path)
+
+
+def test_early_abandoning():
+    rng = np.random.default_rng(1)
+    cost = frame_distances(rng.normal(size=(20, 4)), rng.normal(size=(25, 4)))
+    full = dtw(cost).distance
+
+    assert dtw(cost, max_cost=full).distance == pytest.approx(full)
+    assert dtw(cost, max_cost=full * 0.99).abandoned
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+def test_one_to_many_matches_pairwise(window):
+    rng = np.random.default_rng(2)
+    query = rng.normal(size=(12, 4))
+    candidates = [rng.normal(size=(k, 4)) for k in (3, 12, 17, 1, 30)]
+    expected = np.array([dtw_features(query, c, window=window).distance for c in candidates])
+
+    assert np.allclose(dtw_one_to_many(query, candidates, window=window), expected)
+
+    finite = np.sort(expected)
+    limit = float(finite[1] + finite[2]) / 2
+    abandoned = dtw_one_to_many(query, candidates, window=window, max_cost=limit)
+    assert np.allclose(abandoned, np.where(expected <= limit, expected, np.inf))
+
+
+def test_references_are_nearest_to_themselves():
+    words = ["hello", "father", "thank-you", "please"]
+    frames = [landmark_frames(load_reference_sequence(w)) for w in words]
+
+    assert frames[0].shape[1] == 84
+    for i, query in enumerate(frames):
+        distances = dtw_one_to_many(query, frames, window=0.25)
+        assert int(np.argmin(distances)) == i
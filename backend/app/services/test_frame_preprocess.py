@@ -0,0 +1,65 @@
+"""
+Tests for frame preprocessing (fused color conversion, resolution cap, ROI crop).
+Run with: python -m pytest backend/app/services/test_frame_preprocess.py
+"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.frame_preprocess import Box, RoiCropper, to_full_frame, to_full_frame_points, to_model_rgb
+
+
+def frame_data(points, face=None):
+    hand = {"handedness": "Left", "landmarks": [{"x": x, "y": y, "z": 0.0} for x, y in points]}
+    return {"frame_number": 0, "hands": [hand] if points else [], "face_reference": face}
+
+
+def test_fused_conversion_matches_flip_then_cvtcolor():
+    bgr = np.random.default_rng(0).integers(0, 256, (36, 64, 3), dtype=np.uint8)
+
+    assert np.array_equal(to_model_rgb(bgr), cv2.cvtColor(cv2.flip(bgr, 1), cv2.COLOR_BGR2RGB))
+    assert to_model_rgb(bgr, max_long_edge=32).shape == (18, 32, 3)
+    assert to_model_rgb(bgr, max_long_edge=128).shape == (36, 64, 3)
+
+
+def test_crop_landmarks_map_back_to_the_full_frame():
+    rgb = np.zeros((100, 200, 3), dtype=np.uint8)
+    rgb[60, 150] = 255
+    cropper = RoiCropper(margin=0.1, min_size=0.2)
+    cropper.crop(rgb)
+    cropper.update(frame_data([(0.7, 0.5), (0.8, 0.7)]))
+
+    crop, box = cropper.crop(rgb)
+    y, x = np.argwhere(crop[..., 0] == 255)[0]
+    mapped = to_full_frame(x / crop.shape[1], y / crop.shape[0], 0.1, box)
+
+    assert crop.shape[:2] == (round((box.y1 - box.y0) * 100), round((box.x1 - box.x0) * 200))
+    assert mapped[:2] == pytest.approx((0.75, 0.6))
+    assert mapped[2] == pytest.approx(0.1 * (box.x1 - box.x0))
+    assert to_full_frame(0.5, 0.5, 0.1, None) == (0.5, 0.5, 0.1)
+
+    points = np.array([[x / crop.shape[1], y / crop.shape[0], 0.1], [0.5, 0.5, -0.2]])
+    assert np.allclose(to_full_frame_points(points, box), [to_full_frame(*p, box) for p in points])
+
+
+def test_crop_is_sticky_and_falls_back_to_the_full_frame():
+    rgb = np.zeros((100, 100, 3), dtype=np.uint8)
+    cropper = RoiCropper(margin=0.5, min_size=0.0, refresh_every=10)
+    assert cropper.crop(rgb)[1] is None  # nothing tracked yet
+
+    cropper.update(frame_data([(0.4, 0.4), (0.5, 0.5)], face={"nose_tip": {"x": 0.45, "y": 0.2, "z": 0}}))
+    first = cropper.crop(rgb)[1]
+    assert first == Box(0.35, 0.05, 0.55, 0.65)  # hands and face, plus half their size per side
+
+    cropper.update(frame_data([(0.41, 0.41), (0.51, 0.51)]))
+    assert cropper.crop(rgb)[1] == first  # small moves keep the crop
+
+    cropper.update(frame_data([(0.6, 0.4), (0.7, 0.5)]))
+    assert cropper.crop(rgb)[1].x1 > first.x1  # leaving it moves it
+
+    cropper.update(frame_data([]))
+    assert cropper.crop(rgb)[1] is None  # hands lost: look at the whole frame
+
+    cropper.update(frame_data([(0.4, 0.4), (0.5, 0.5)]))
+    boxes = [cropper.crop(rgb)[1] for _ in range(10)]
+    assert boxes.count(None) == 1  # periodic full-frame look for new hands
@@ -0,0 +1,125 @@
+"""
+Tests for the frame-sampling policies.
+Run with: python -m pytest backend/app/services/test_frame_sampling.py
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.frame_sampling import EveryNthFacePolicy, FrameSamplingPolicy, StableFacePolicy, make_sampling_policy
+from app.services.video_convert import FACE_KEY_POINTS, _detect_frames
+
+
+def face(x=0.5):
+    return {name: {"x": x, "y": 0.3, "z": 0.0} for name in FACE_KEY_POINTS}
+
+
+def sample(policy, faces) -> tuple:
+    """Drive a policy as the extractor does; faces[n] is what FaceMesh finds on frame n.
+    Returns (frames FaceMesh ran on, frames whose face was kept)."""
+    ran, kept = [], []
+    for n, found in enumerate(faces):
+        assert policy.run_hands(n)
+        if policy.run_face(n):
+            ran.append(n)
+            policy.observe_face(n, found)
+            if found is not None and policy.keep_face(n):
+                kept.append(n)
+    return ran, kept
+
+
+def test_all_runs_every_model_and_keeps_every_nth_face():
+    ran, kept = sample(FrameSamplingPolicy(face_sample_rate=5), [face()] * 12)
+    assert ran == list(range(12))
+    assert kept == [0, 5, 10]
+
+
+def test_every_nth_runs_face_only_on_samples_once_locked():
+    ran, kept = sample(EveryNthFacePolicy(face_sample_rate=5), [face()] * 12)
+    assert ran == [0, 5, 10]
+    assert kept == [0, 5, 10]
+
+
+def test_every_nth_searches_every_frame_until_a_face_is_found():
+    # No face for the first 3 frames; FaceMesh then locks on at frame 3
+    faces = [None] * 3 + [face()] * 9
+    ran, kept = sample(EveryNthFacePolicy(face_sample_rate=5), faces)
+    assert ran == [0, 1, 2, 3, 5, 10]
+    assert kept == [5, 10]  # frame 3 only served to lock on
+
+
+def test_every_nth_searches_again_after_losing_the_face():
+    faces = [face()] * 5 + [None] + [face()] * 6
+    ran, kept = sample(EveryNthFacePolicy(face_sample_rate=5), faces)
+    assert ran == [0, 5, 6, 10]
+    assert kept == [0, 10]
+
+
+def test_until_stable_stops_once_the_face_holds_still():
+    policy = StableFacePolicy(face_sample_rate=2, tolerance=0.01, stable_samples=2)
+    ran, kept = sample(policy, [face()] * 12)
+    assert ran == [0, 2, 4]  # two samples that matched the one before
+    assert kept == [0, 2, 4]
+    assert policy.is_stable
+
+
+def test_until_stable_keeps_sampling_a_moving_face():
+    faces = [face(0.5 + 0.02 * n) for n in range(12)]
+    ran, kept = sample(StableFacePolicy(face_sample_rate=2, tolerance=0.01, stable_samples=2), faces)
+    assert ran == kept == [0, 2, 4, 6, 8, 10]
+
+
+def test_until_stable_starts_counting_again_when_the_face_is_lost():
+    faces = [face(), None, face(), None, None, None, face(), None, face(), None, face(), None]
+    policy = StableFacePolicy(face_sample_rate=2, tolerance=0.01, stable_samples=2)
+    ran, kept = sample(policy, faces)
+    # Sample 4 finds nothing, so 6, 8 and 10 are needed before the face counts as still
+    assert kept == [0, 2, 6, 8, 10]
+    assert ran == [0, 2, 4, 5, 6, 8, 10]
+    assert policy.is_stable
+
+
+def test_reset_forgets_the_previous_video():
+    policy = StableFacePolicy(face_sample_rate=2, stable_samples=1)
+    sample(policy, [face()] * 6)
+    assert policy.is_stable
+    policy.reset()
+    assert not policy.is_stable
+    assert sample(policy, [None, face(), face()])[0] == [0, 1, 2]
+
+
+def test_make_sampling_policy():
+    assert isinstance(make_sampling_policy("until_stable", 4), StableFacePolicy)
+    assert make_sampling_policy().face_sample_rate == 10
+    with pytest.raises(ValueError, match="Unknown frame sampling policy"):
+        make_sampling_policy("sometimes")
+
+
+class FakeModel:
+    """Records the frames a model ran on; frames carry their number in the first pixel."""
+
+    def __init__(self, finds_face=None):
+        self.frames = []
+        self.finds_face = finds_face
+
+    def process(self, rgb):
+        n = int(rgb[0, 0, 0])
+        self.frames.append(n)
+        if self.finds_face is None:
+            return SimpleNamespace(multi_hand_landmarks=None)
+        mesh = [SimpleNamespace(x=0.5, y=0.3, z=0.0)] * 478
+        found = [SimpleNamespace(landmark=mesh)] if self.finds_face(n) else None
+        return SimpleNamespace(multi_face_landmarks=found)
+
+
+def test_extractor_runs_the_models_the_policy_asks_for():
+    frames = [np.full((4, 4, 3), n, dtype=np.uint8) for n in range(12)]
+    hands, face_mesh = FakeModel(), FakeModel(finds_face=lambda n: n >= 2)
+
+    data = _detect_frames(frames, EveryNthFacePolicy(face_sample_rate=5), hands, face_mesh)
+
+    assert hands.frames == list(range(12))
+    assert face_mesh.frames == [0, 1, 2, 5, 10]
+    assert [f["frame_number"] for f in data if f["face_reference"]] == [5, 10]
+    assert data[5]["face_reference"]["nose_tip"] == {"x": 0.5, "y": 0.3, "z": 0.0}
@@ -0,0 +1,164 @@
+"""
+Tests for the SQLite job queue and its runner.
+Run with: python -m pytest backend/app/services/test_job_queue.py
+"""
+import asyncio
+import sqlite3
+import time
+
+from app.services.job_queue import JobQueue, JobRunner
+
+
+def make_queue(tmp_path, **kwargs):
+    options = dict(max_attempts=3, visibility_timeout=30.0, retry_delay=0.0)
+    options.update(kwargs)
+    return JobQueue(tmp_path / "jobs.sqlite3", **options)
+
+
+def test_job_is_claimed_once_and_completed(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.enqueue({"word": "hello"})
+
+    job = queue.claim("a")
+    assert job.id == job_id and job.payload == {"word": "hello"} and job.attempts == 1
+    assert queue.claim("b") is None
+
+    assert queue.complete(job_id, "a", {"score": 3})
+    done = queue.get(job_id)
+    assert done.status == "done" and done.result == {"score": 3}
+    assert queue.stats() == {"queued": 0, "running": 0, "done": 1, "failed": 0}
+
+
+def test_jobs_survive_a_restart(tmp_path):
+    job_id = make_queue(tmp_path).enqueue({"word": "hello"})
+    assert make_queue(tmp_path).claim("a").id == job_id
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=0.05, max_attempts=2)
+    job_id = queue.enqueue({})
+    queue.claim("crashed")
+    time.sleep(0.1)
+
+    job = queue.claim("b")
+    assert job.id == job_id and job.attempts == 2
+    assert not queue.complete(job_id, "crashed", {})  # its lease was lost
+    assert queue.complete(job_id, "b", {})
+
+    queue.enqueue({})
+    queue.claim("crashed")
+    time.sleep(0.1)
+    queue.claim("crashed")
+    time.sleep(0.1)
+    assert queue.claim("b") is None  # out of attempts
+    assert queue.stats()["failed"] == 1
+
+
+def test_failures_are_retried_only_when_retryable(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    job_id = queue.enqueue({})
+    assert queue.fail(job_id, "a", "busy", retry=True) is None  # not claimed by "a"
+
+    queue.claim("a")
+    assert queue.fail(job_id, "a", "busy", retry=True) == "queued"
+    queue.claim("a")
+    assert queue.fail(job_id, "a", "busy", retry=True) == "failed"
+    assert queue.get(job_id).error == "busy"
+
+    other = queue.enqueue({})
+    queue.claim("a")
+    assert queue.fail(other, "a", "bad video") == "failed"
+
+
+def test_runner_retries_and_cleans_up(tmp_path):
+    queue = make_queue(tmp_path)
+    calls, finished = [], []
+
+    async def handler(job):
+        calls.append(job.attempts)
+        if job.attempts == 1:
+            raise RuntimeError("worker crashed")
+        return {"word": job.payload["word"]}
+
+    async def run():
+        runner = JobRunner(queue, handler, lambda e: isinstance(e, RuntimeError), workers=2,
+                           on_finished=lambda job: finished.append(job.id), poll_interval=0.01)
+        job_id = queue.enqueue({"word": "hello"})
+        runner.start()
+        try:
+            for _ in range(200):
+                if finished:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await runner.stop()
+        return job_id, runner.stats()
+
+    job_id, stats = asyncio.run(run())
+    assert calls == [1, 2]
+    assert queue.get(job_id).result == {"word": "hello"}
+    assert finished == [job_id]
+    assert stats["retried"] == 1 and stats["done"] == 1
+
+
+def test_runner_survives_errors_recording_an_outcome(tmp_path):
+    queue = make_queue(tmp_path)
+    complete, completions = queue.complete, []
+
+    def locked_the_first_time(*args):
+        completions.append(args[0])
+        if len(completions) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return complete(*args)
+
+    queue.complete = locked_the_first_time
+
+    async def handler(job):
+        return {"word": job.payload["word"]}
+
+    async def run():
+        runner = JobRunner(queue, handler, lambda e: False, workers=1, poll_interval=0.01)
+        first, second = queue.enqueue({"word": "hello"}), queue.enqueue({"word": "father"})
+        runner.start()
+        try:
+            for _ in range(200):
+                if queue.get(second).status == "done":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await runner.stop()
+        return first, second, runner.stats()
+
+    first, second, stats = asyncio.run(run())
+    assert queue.get(first).status == "running"  # its lease runs out and it is run again
+    assert queue.get(second).status == "done"
+    assert stats["errors"] == 1 and stats["done"] == 1
+
+
+def test_outcome_is_finished_when_the_runner_stops_while_recording_it(tmp_path):
+    queue = make_queue(tmp_path)
+    complete, finished = queue.complete, []
+
+    async def handler(job):
+        return {"word": job.payload["word"]}
+
+    async def run():
+        loop, recording = asyncio.get_running_loop(), asyncio.Event()
+
+        def slow_complete(*args):
+            loop.call_soon_threadsafe(recording.set)
+            time.sleep(0.1)
+            return complete(*args)
+
+        queue.complete = slow_complete
+        runner = JobRunner(queue, handler, lambda e: False, workers=1,
+                           on_finished=lambda job: finished.append(job.id), poll_interval=0.01)
+        job_id = queue.enqueue({"word": "hello"})
+        runner.start()
+        await recording.wait()
+        await runner.stop()  # while complete() runs in its thread
+        return job_id, runner.stats()
+
+    job_id, stats = asyncio.run(run())
+    assert queue.get(job_id).status == "done"
+    assert finished == [job_id] and stats["done"] == 1
@@ -0,0 +1,55 @@
+"""
+Tests for the vectorized landmark conversion and the compact JSON writer.
+Run with: python -m pytest backend/app/services/test_json_codec.py
+"""
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services import json_codec
+from app.services.frame_preprocess import Box, to_full_frame
+from app.services.video_convert import _landmarks_json, _points, read_summary
+
+
+def landmarks(n, seed):
+    rng = np.random.default_rng(seed)
+    return [SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in rng.uniform(-0.1, 1.1, (n, 3))]
+
+
+def point(lm, box):
+    """The per-landmark conversion _points replaced."""
+    x, y, z = to_full_frame(lm.x, lm.y, lm.z, box)
+    return {'x': round(x, 4), 'y': round(y, 4), 'z': round(z, 4)}
+
+
+def test_points_match_the_per_landmark_conversion():
+    lists = [landmarks(21, 0), landmarks(21, 1), landmarks(8, 2)]
+    for box in (None, Box(0.1, 0.2, 0.7, 0.9)):
+        assert _points(lists, box) == [[point(lm, box) for lm in lms] for lms in lists]
+    assert _points([[], []], None) == [[], []]
+
+
+def test_document_is_compact_and_keeps_its_schema(monkeypatch):
+    hand = {"handedness": "Left", "landmarks": _points([landmarks(21, 3)], None)[0]}
+    frames = [{"frame_number": 0, "hands": [hand], "face_reference": None},
+              {"frame_number": 1, "hands": [], "face_reference": None}]
+    text = _landmarks_json("hello", np.float64(30.0), frames, 10, "every_nth", active_range={"start_frame": 4})
+
+    assert "\n" not in text and ", " not in text
+    data = json.loads(text)
+    assert data["frames"] == frames and data["fps"] == 30.0 and data["frames_with_hands"] == 1
+    assert read_summary(text) == {k: v for k, v in data.items() if k != "frames"}
+
+    monkeypatch.setattr(json_codec, "orjson", None)
+    assert json_codec.dumps(data) == text
+
+
+def test_summary_is_read_from_either_layout():
+    data = {"word": "frames", "fps": 30.0, "active_range": {"start_frame": 2, "end_frame": 9},
+            "frames": [{"frame_number": 0, "hands": [], "face_reference": None}]}
+    summary = {k: v for k, v in data.items() if k != "frames"}
+
+    assert read_summary(json.dumps(data, indent=2)) == summary  # as documents were written before
+    assert read_summary(json_codec.dumps(data)) == summary
+    assert read_summary('{"word": "hello"}') == {"word": "hello"}
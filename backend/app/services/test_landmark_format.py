@@ -0,0 +1,127 @@
+"""
+Tests for the binary landmark format (.lmk) and its JSON converters.
+Run with: python -m pytest backend/app/services/test_landmark_format.py
+"""
+import copy
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.services import landmark_load
+from app.services.landmark_format import (
+    FORMAT_VERSION, MAGIC, _ALIGN, binary_file_to_json, json_file_to_binary, json_to_sequence,
+    read_landmarks, sequence_to_json, write_landmarks,
+)
+from app.services.reference_store import ReferenceStore
+
+REFERENCE_DIR = Path(__file__).parent / "reference_landmarks"
+
+
+@pytest.fixture(scope="module")
+def recording():
+    return json.loads((REFERENCE_DIR / "hello.json").read_text())
+
+
+def with_third_hand(data: dict) -> dict:
+    """A recording where MediaPipe briefly reported a third hand."""
+    data = copy.deepcopy(data)
+    data["frames"][4]["hands"].append(copy.deepcopy(data["frames"][4]["hands"][0]))
+    return data
+
+
+def test_json_round_trip_through_lmk(tmp_path, recording):
+    for data in (recording, with_third_hand(recording)):
+        # float32 holds every 4-decimal value, so the JSON comes back unchanged
+        back = sequence_to_json(read_landmarks(write_landmarks(tmp_path / "exact.lmk", data, dtype=np.float32)))
+        assert back == data
+
+        # float16 only changes the 3rd-4th decimal
+        back = sequence_to_json(read_landmarks(write_landmarks(tmp_path / "small.lmk", data)))
+        assert {k: v for k, v in back.items() if k != "frames"} == {k: v for k, v in data.items() if k != "frames"}
+        for frame, original in zip(back["frames"], data["frames"]):
+            assert [h["handedness"] for h in frame["hands"]] == [h["handedness"] for h in original["hands"]]
+            assert (frame["face_reference"] is None) == (original["face_reference"] is None)
+            for hand, original_hand in zip(frame["hands"], original["hands"]):
+                for point, original_point in zip(hand["landmarks"], original_hand["landmarks"]):
+                    assert point == pytest.approx(original_point, abs=1e-3)
+
+
+def test_cli_converters_round_trip(tmp_path, recording):
+    source = tmp_path / "hello.json"
+    source.write_text(json.dumps(recording))
+
+    lmk = json_file_to_binary(source, dtype=np.float32)
+    source.unlink()
+    assert binary_file_to_json(lmk) == source
+    assert json.loads(source.read_text()) == recording
+
+
+def test_arrays_are_read_only_memory_maps(tmp_path, recording):
+    path = write_landmarks(tmp_path / "hello.lmk", recording)
+    seq = read_landmarks(path)
+
+    for name in ("hands", "hand_mask", "face_frames", "face"):
+        array = getattr(seq, name)
+        assert isinstance(array, np.memmap), name
+        assert array.offset % _ALIGN == 0
+        with pytest.raises(ValueError):
+            array[0] = 0
+    assert seq.hands.dtype == np.float16 and seq.hands.shape == (51, 2, 21, 3)
+    assert np.isnan(seq.hands[seq.hand_mask == 0]).all()
+    assert list(seq.face_frames) == [f["frame_number"] for f in recording["frames"] if f["face_reference"]]
+    assert path.read_bytes().startswith(MAGIC)
+
+
+def test_recording_without_face_or_hands(tmp_path):
+    data = {"word": "empty", "face_key_points_info": ["nose_tip"], "frames": [
+        {"frame_number": 0, "hands": [], "face_reference": None},
+    ]}
+    seq = read_landmarks(write_landmarks(tmp_path / "empty.lmk", data))
+
+    assert seq.face.shape == (0, 1, 3) and seq.face_frames.shape == (0,)
+    assert sequence_to_json(seq) == data
+
+
+def test_newer_or_foreign_files_are_rejected(tmp_path, recording):
+    path = write_landmarks(tmp_path / "hello.lmk", recording)
+    data = bytearray(path.read_bytes())
+    data[6:8] = (FORMAT_VERSION + 1).to_bytes(2, "little")
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match=f"v{FORMAT_VERSION + 1}"):
+        read_landmarks(path)
+
+    path.write_bytes(b"{}")
+    with pytest.raises(ValueError, match="not a landmark file"):
+        read_landmarks(path)
+
+
+def test_committed_binaries_match_their_json():
+    words = sorted(path.stem for path in REFERENCE_DIR.glob("*.json") if not path.name.startswith("."))
+    assert sorted(path.stem for path in REFERENCE_DIR.glob("*.lmk")) == words
+    for word in words:
+        expected = json_to_sequence(json.loads((REFERENCE_DIR / f"{word}.json").read_text()))
+        seq = read_landmarks(REFERENCE_DIR / f"{word}.lmk")
+        assert np.array_equal(seq.hands, expected.hands, equal_nan=True), word
+        assert np.array_equal(seq.hand_mask, expected.hand_mask), word
+        assert np.array_equal(seq.face_frames, expected.face_frames), word
+        assert np.array_equal(seq.face, expected.face), word
+
+
+def test_reference_loading_prefers_an_up_to_date_binary(tmp_path, monkeypatch, recording):
+    json_path = tmp_path / "hello.json"
+    json_path.write_text(json.dumps(recording))
+    lmk_path = write_landmarks(tmp_path / "hello.lmk", recording)
+    monkeypatch.setattr(landmark_load, "REFERENCE_LANDMARKS_DIR", tmp_path)
+    monkeypatch.setattr(landmark_load, "reference_store", ReferenceStore(tmp_path))
+
+    os.utime(lmk_path, ns=(2 * 10**18, 2 * 10**18))
+    assert isinstance(landmark_load.load_reference_sequence("hello").hands, np.memmap)
+
+    os.utime(lmk_path, ns=(10**18 - 1, 10**18 - 1))  # older than the JSON: re-extracted since
+    os.utime(json_path, ns=(10**18, 10**18))
+    seq = landmark_load.load_reference_sequence("hello")
+    assert not isinstance(seq.hands, np.memmap)
+    assert seq.num_frames == 51
@@ -0,0 +1,117 @@
+"""
+Tests for validation of client-computed landmarks.
+Run with: python -m pytest backend/app/services/test_landmark_input.py
+"""
+import copy
+import gzip
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.services.landmark_format import json_to_sequence, read_landmarks, write_landmarks
+from app.services.landmark_input import LandmarkValidationError, decompress, parse_client_landmarks
+
+REFERENCE = Path(__file__).parent / "reference_landmarks" / "hello.json"
+
+
+@pytest.fixture(scope="module")
+def recording():
+    return json.loads(REFERENCE.read_text())
+
+
+def lmk_bytes(tmp_path, seq) -> bytes:
+    return write_landmarks(tmp_path / "attempt.lmk", seq).read_bytes()
+
+
+def parse_json(data, encoding=""):
+    body = data if isinstance(data, bytes) else json.dumps(data).encode()
+    return parse_client_landmarks(body, "application/json", encoding, "hello")
+
+
+def test_json_and_binary_forms_agree(tmp_path, recording):
+    from_json, seq = parse_json(recording)
+    from_binary, _ = parse_client_landmarks(
+        gzip.compress(lmk_bytes(tmp_path, recording)), "application/octet-stream", "gzip", "hello"
+    )
+
+    expected = json_to_sequence(recording, dtype=np.float32)
+    assert seq.num_frames == expected.num_frames
+    assert np.allclose(np.nan_to_num(seq.hands), np.nan_to_num(expected.hands), atol=1e-4)
+    # float16 storage in .lmk only changes the 3rd-4th decimal
+    a, b = json.loads(from_json), json.loads(from_binary)
+    assert a["frames_with_hands"] == b["frames_with_hands"] == recording["frames_with_hands"]
+    assert a["frames_with_face"] == b["frames_with_face"]
+    assert a["frame_sampling_policy"] == "client"
+
+
+@pytest.mark.parametrize("edit, message", [
+    (lambda d: d["frames"][2]["hands"][0]["landmarks"][0].update(x=640.0), "less than or equal to 2"),
+    (lambda d: d["frames"][2]["hands"][0]["landmarks"].pop(), "at least 21 items"),
+    (lambda d: d["frames"][2]["hands"][0]["landmarks"][0].update(visibility=1.0), "Extra inputs"),
+    (lambda d: d["frames"][2].update(frame_number=9), "frame_number 9"),
+    (lambda d: d["frames"][2]["hands"][0].update(handedness="Both"), "'Left' or 'Right'"),
+    (lambda d: d.update(fps=0), "fps"),
+    (lambda d: d.update(frames=d["frames"] * 20), "at most 900 items"),
+    (lambda d: [frame.update(hands=[]) for frame in d["frames"]], "No hands detected"),
+    (lambda d: d["frames"][0].update(face_reference={"nose_tip": {"x": 0, "y": 0, "z": 0}}), "exactly the points"),
+])
+def test_invalid_json_is_rejected(recording, edit, message):
+    data = copy.deepcopy(recording)
+    edit(data)
+
+    with pytest.raises(LandmarkValidationError, match=message):
+        parse_json(data)
+
+
+def test_non_finite_values_are_rejected():
+    body = b'{"fps": 30, "frames": [{"frame_number": 0, "hands": [{"handedness": "Left", "landmarks": ['
+    body += b", ".join([b'{"x": NaN, "y": 0, "z": 0}'] * 21) + b"]}]}]}"
+
+    with pytest.raises(LandmarkValidationError, match="finite"):
+        parse_json(body)
+
+
+def test_invalid_binary_is_rejected(tmp_path, recording):
+    def parse(seq):
+        return parse_client_landmarks(lmk_bytes(tmp_path, seq), "application/octet-stream", "", "hello")
+
+    seq = json_to_sequence(recording, dtype=np.float32)
+    seq.hand_mask = seq.hand_mask.copy()
+    seq.hand_mask[0, 0] = 7
+    with pytest.raises(LandmarkValidationError, match="hand_mask"):
+        parse(seq)
+
+    seq = json_to_sequence(recording, dtype=np.float32)
+    frame = int(np.argmax(seq.hand_mask[:, 0] > 0))
+    seq.hands[frame, 0, 0, 0] = np.nan
+    with pytest.raises(LandmarkValidationError, match="finite"):
+        parse(seq)
+
+    seq = json_to_sequence(recording, dtype=np.float32)
+    seq.face_frames = seq.face_frames[::-1].copy()
+    with pytest.raises(LandmarkValidationError, match="face_frames"):
+        parse(seq)
+
+    data = lmk_bytes(tmp_path, recording)
+    with pytest.raises(LandmarkValidationError, match="past the end"):
+        parse_client_landmarks(data[:len(data) // 2], "application/octet-stream", "", "hello")
+    with pytest.raises(LandmarkValidationError, match="not a landmark file"):
+        parse_client_landmarks(b"\0" * 64, "application/octet-stream", "", "hello")
+
+
+def test_binary_round_trip_reads_like_a_file(tmp_path, recording):
+    data = lmk_bytes(tmp_path, recording)
+    _, seq = parse_client_landmarks(data, "application/octet-stream", "", "hello")
+
+    assert np.array_equal(seq.hand_mask, read_landmarks(tmp_path / "attempt.lmk").hand_mask)
+
+
+def test_decompression_is_bounded():
+    with pytest.raises(LandmarkValidationError, match="too large"):
+        decompress(gzip.compress(b" " * 2000), "gzip", max_size=1000)
+    with pytest.raises(LandmarkValidationError, match="truncated"):
+        decompress(gzip.compress(b" " * 2000)[:-10], "gzip")
+    with pytest.raises(LandmarkValidationError, match="Content-Encoding"):
+        decompress(b"", "br")
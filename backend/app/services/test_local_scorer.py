@@ -0,0 +1,75 @@
+"""
+Tests for the local sign scorer, using the committed reference landmarks.
+Run with: python -m pytest backend/app/services/test_local_scorer.py
+"""
+import numpy as np
+
+from app.services.landmark_format import LandmarkSequence
+from app.services.landmark_load import load_reference_sequence
+from app.services.local_scorer import evaluate_locally, score_sequences
+
+
+def transformed(seq: LandmarkSequence, scale=1.0, shift=(0.0, 0.0), repeat=1) -> LandmarkSequence:
+    """The same signing filmed closer/further, off-center, or `repeat` times slower."""
+    offset = np.array([shift[0], shift[1], 0.0], dtype=np.float32)
+    hands = np.asarray(seq.hands, dtype=np.float32) * scale + offset
+    face = np.asarray(seq.face, dtype=np.float32) * scale + offset
+    return LandmarkSequence(
+        meta=dict(seq.meta),
+        hands=np.repeat(hands, repeat, axis=0),
+        hand_mask=np.repeat(np.asarray(seq.hand_mask), repeat, axis=0),
+        face_frames=np.asarray(seq.face_frames) * repeat,
+        face=face,
+        face_key_points=list(seq.face_key_points),
+    )
+
+
+def test_reference_against_itself_is_perfect():
+    reference = load_reference_sequence("hello")
+    result = score_sequences(reference, reference)
+
+    assert result.cost == 0
+    assert result.score == 4
+
+
+def test_framing_and_speed_do_not_change_the_score():
+    reference = load_reference_sequence("father")
+    attempt = transformed(reference, scale=0.7, shift=(0.1, -0.05), repeat=2)
+
+    result = score_sequences(attempt, reference)
+
+    assert result.score == 4
+    assert result.cost < 0.05
+    assert result.duration_ratio == 2.0
+
+
+def test_different_sign_scores_lower():
+    reference = load_reference_sequence("thank-you")
+    attempt = load_reference_sequence("father")
+
+    evaluation = evaluate_locally(attempt, reference)
+
+    assert evaluation.overall_score_0_to_4 <= 1
+    assert evaluation.cons.points
+
+
+
+def test_held_pose_scores_below_a_different_sign():
+    # One mid-sign pose of hello, held still, is close to every frame of hello's path
+    reference = load_reference_sequence("hello")
+    middle = len(reference.hands) // 2
+    attempt = LandmarkSequence(
+        meta=dict(reference.meta),
+        hands=np.repeat(np.asarray(reference.hands)[middle:middle + 1], len(reference.hands), axis=0),
+        hand_mask=np.repeat(np.asarray(reference.hand_mask)[middle:middle + 1], len(reference.hands), axis=0),
+        face_frames=np.asarray(reference.face_frames),
+        face=np.asarray(reference.face),
+        face_key_points=list(reference.face_key_points),
+    )
+
+    held = score_sequences(attempt, reference)
+    different = score_sequences(load_reference_sequence("father"), reference)
+
+    assert held.motion_ratio < 0.1
+    assert held.score < different.score
+    assert any("barely moved" in con for con in evaluate_locally(attempt, reference).cons.points)
@@ -0,0 +1,60 @@
+"""
+Tests for per-stage latency metrics.
+Run with: python -m pytest backend/app/services/test_metrics.py
+"""
+from app.services.metrics import (
+    Histograms, collect_timings, current_timings, note_container, note_fallback, request_timings, timed_frames,
+    timed_stage,
+)
+
+
+def test_stages_are_recorded_only_inside_a_request():
+    with timed_stage("decode"):
+        pass
+    note_container("json")
+    assert current_timings() is None
+
+    with request_timings() as timings:
+        with timed_stage("decode"):
+            pass
+        with timed_stage("decode"):
+            pass
+        list(timed_frames(range(3), "hands"))
+        note_container("webm")
+    assert list(timings.stages) == ["decode", "hands"]
+    assert timings.container == "webm"
+    assert current_timings() is None
+
+
+def test_worker_timings_merge_into_the_request():
+    def work():
+        with timed_stage("gemini_call"):
+            note_fallback()
+        return "result"
+
+    with request_timings() as timings:
+        result, worker = collect_timings(work)
+        assert "gemini_call" not in timings.stages  # the worker had its own timings
+        timings.merge(worker)
+    assert result == "result"
+    assert "gemini_call" in timings.stages and timings.fallback
+
+
+def test_server_timing_header():
+    with request_timings() as timings:
+        timings.add("decode", 0.1234)
+    header = timings.server_timing()
+    assert header.startswith("decode;dur=123.4, total;dur=")
+
+
+def test_histogram_buckets_are_cumulative():
+    histograms = Histograms("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+    histograms.observe(("decode",), 0.05)
+    histograms.observe(("decode",), 0.5)
+    histograms.observe(("decode",), 5.0)
+    lines = histograms.render()
+    assert 'demo_seconds_bucket{stage="decode",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="decode",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{stage="decode",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="decode"} 3' in lines
+    assert 'demo_seconds_sum{stage="decode"} 5.550000' in lines
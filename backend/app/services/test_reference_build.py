@@ -0,0 +1,150 @@
+"""
+Tests for the incremental reference build (with a stand-in extractor).
+Run with: python -m pytest backend/app/services/test_reference_build.py
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app.services import reference_build
+from app.services.landmark_format import read_landmarks
+from app.services.reference_build import MANIFEST_NAME, build_references, load_manifest
+from app.services.reference_store import ReferenceStore
+
+REFERENCE = Path(__file__).parent / "reference_landmarks" / "hello.json"
+
+
+class FakeExtractor:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+        self.data = json.loads(REFERENCE.read_text())
+
+    def __call__(self, video_path, word, face_sample_rate, sampling_policy):
+        self.calls.append(word)
+        if word in self.fail:
+            raise ValueError("No hands detected in video")
+        return {"data": dict(self.data, word=word, video_file=Path(video_path).name), "seconds": 0.01}
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    for word in ("hello", "please", "sorry"):
+        (videos / f"{word}.mp4").write_bytes(word.encode() * 100)
+    return videos, tmp_path / "out"
+
+
+def build(dirs, extract, **kwargs):
+    videos, out = dirs
+    return build_references(videos, out, workers=0, extract=extract, log=lambda _: None, **kwargs)
+
+
+def test_first_build_writes_outputs_and_manifest(dirs):
+    extract = FakeExtractor()
+    summary = build(dirs, extract)
+
+    out = dirs[1]
+    assert sorted(summary.built) == ["hello", "please", "sorry"]
+    assert json.loads((out / "please.json").read_text())["word"] == "please"
+    assert read_landmarks(out / "please.lmk").num_frames == extract.data["total_frames"]
+    assert set(load_manifest(out)) == {"hello", "please", "sorry"}
+    assert not list(out.glob(".*.tmp"))
+
+
+def test_manifest_is_not_served_as_a_word(dirs):
+    videos, out = dirs
+    build(dirs, FakeExtractor())
+    # A manifest left by an earlier build is read, then replaced
+    (out / MANIFEST_NAME).rename(out / "manifest.json")
+    extract = FakeExtractor()
+    build(dirs, extract)
+
+    assert extract.calls == []
+    assert not (out / "manifest.json").exists()
+    store = ReferenceStore(out)
+    assert store.words() == ["hello", "please", "sorry"]
+    with pytest.raises(FileNotFoundError):
+        store.get(MANIFEST_NAME)
+
+
+def test_only_changed_videos_are_rebuilt(dirs):
+    videos, out = dirs
+    build(dirs, FakeExtractor())
+
+    (videos / "hello.mp4").write_bytes(b"new take")
+    os.utime(videos / "please.mp4")  # touched, same content
+    (out / "sorry.lmk").unlink()
+    extract = FakeExtractor()
+    summary = build(dirs, extract)
+
+    assert sorted(extract.calls) == ["hello", "sorry"]
+    assert summary.skipped == ["please"]
+
+
+def test_extractor_settings_invalidate_the_manifest(dirs):
+    build(dirs, FakeExtractor())
+
+    extract = FakeExtractor()
+    build(dirs, extract, face_sample_rate=5)
+
+    assert len(extract.calls) == 3
+
+
+def test_segment_settings_invalidate_the_manifest(dirs, monkeypatch):
+    monkeypatch.setattr(reference_build, "probe_video", lambda path: (30, 10.0))  # too short to split
+    build(dirs, FakeExtractor())
+
+    extract = FakeExtractor()
+    build(dirs, extract, segment_seconds=5)
+    build(dirs, extract, segment_seconds=5)
+    assert len(extract.calls) == 3
+
+    build(dirs, extract, segment_seconds=2)
+    build(dirs, extract)
+    assert len(extract.calls) == 9
+
+
+def test_failures_are_retried_on_the_next_run(dirs):
+    summary = build(dirs, FakeExtractor(fail={"sorry"}))
+
+    assert set(summary.failed) == {"sorry"}
+    assert "sorry" not in load_manifest(dirs[1])
+
+    extract = FakeExtractor()
+    build(dirs, extract)
+    assert extract.calls == ["sorry"]
+
+
+def test_corrupt_manifest_rebuilds_everything(dirs):
+    build(dirs, FakeExtractor())
+    (dirs[1] / MANIFEST_NAME).write_text("{not json")
+
+    extract = FakeExtractor()
+    build(dirs, extract)
+
+    assert len(extract.calls) == 3
+
+
+def test_long_videos_are_extracted_in_segments(dirs, monkeypatch):
+    calls = []
+
+    def fake_segment(video_path, segment, face_sample_rate, sampling_policy):
+        calls.append(segment)
+        last = segment.end if segment.end is not None else 100
+        hands = [{"handedness": "Left", "landmarks": [{"x": 0.5, "y": 0.5, "z": 0.0}] * 21}]
+        return [{"frame_number": n, "hands": hands, "face_reference": None}
+                for n in range(segment.first_decoded, last)]
+
+    monkeypatch.setattr(reference_build, "probe_video", lambda path: (100, 10.0))
+    monkeypatch.setattr(reference_build, "extract_segment", fake_segment)
+    summary = build(dirs, FakeExtractor(), words=["hello"], segment_seconds=5)
+
+    data = json.loads((dirs[1] / "hello.json").read_text())
+    assert summary.built == ["hello"]
+    assert [(s.start, s.end) for s in calls] == [(0, 50), (50, None)]
+    assert [f["frame_number"] for f in data["frames"]] == list(range(100))
+    assert data["video_file"] == "hello.mp4"
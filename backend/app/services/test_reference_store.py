@@ -0,0 +1,69 @@
+"""
+Tests for the in-process reference landmark cache.
+Run with: python -m pytest backend/app/services/test_reference_store.py
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app.services.reference_store import ReferenceStore
+
+
+def write(path: Path, data: dict, mtime_ns: int) -> None:
+    path.write_text(json.dumps(data))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def store(tmp_path):
+    write(tmp_path / "hello.json", {"word": "hello", "frames": [1]}, 10**18)
+    write(tmp_path / "father.json", {"word": "father", "frames": [2]}, 10**18)
+    (tmp_path / ".manifest").write_text("{}")
+    return ReferenceStore(tmp_path)
+
+
+def test_preload_serves_words_without_listing_the_directory(store, monkeypatch):
+    store.preload()
+    assert store.stats()["cached_words"] == 2
+
+    def no_listing(*args):
+        raise AssertionError("directory listed again")
+
+    monkeypatch.setattr(Path, "glob", no_listing)
+    assert store.words() == ["father", "hello"]
+    assert store.get_data("hello") == {"word": "hello", "frames": [1]}
+    assert store.stats()["hits"] >= 1
+
+
+def test_added_and_removed_files_change_the_words(store):
+    store.preload()
+    write(store.directory / "mother.json", {"word": "mother"}, 10**18)
+    (store.directory / "father.json").unlink()
+    os.utime(store.directory, ns=(2 * 10**18, 2 * 10**18))  # as any change to the directory does
+
+    assert store.words() == ["hello", "mother"]
+    with pytest.raises(FileNotFoundError):
+        store.get("father")
+    with pytest.raises(FileNotFoundError):
+        store.get("../hello")
+
+
+def test_changed_files_are_reloaded_only_when_their_content_differs(store):
+    path = store.directory / "hello.json"
+    first = store.get("hello")
+
+    write(path, {"word": "hello", "frames": [1]}, 10**18 + 1)  # touched, same content
+    assert store.get("hello").data is first.data
+    assert store.stats()["reloads"] == 0
+
+    write(path, {"word": "hello", "frames": [3]}, 10**18 + 1)  # same size and mtime: not noticed
+    assert store.get("hello").data == {"word": "hello", "frames": [1]}
+
+    write(path, {"word": "hello", "frames": [3]}, 10**18 + 2)  # new mtime
+    assert store.get_data("hello") == {"word": "hello", "frames": [3]}
+
+    write(path, {"word": "hello", "frames": [30]}, 10**18 + 2)  # new size
+    assert json.loads(store.get_json("hello")) == {"word": "hello", "frames": [30]}
+    assert store.stats()["reloads"] == 2
@@ -0,0 +1,80 @@
+"""
+Tests for the two-tier result cache.
+Run with: python -m pytest backend/app/services/test_result_cache.py
+"""
+from app.services.result_cache import ResultCache, cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, clock=None, **kwargs):
+    options = dict(memory_bytes=1000, disk_bytes=1000, max_age=60)
+    options.update(kwargs)
+    return ResultCache("test", directory=tmp_path, clock=clock or FakeClock(), **options)
+
+
+def test_key_depends_on_every_part():
+    assert cache_key("ab", "c") != cache_key("a", "bc")
+    assert cache_key(b"video", "hello") == cache_key(b"video", "hello")
+    assert cache_key(b"video", "hello") != cache_key(b"video", "goodbye")
+
+
+def test_hit_miss_counters(tmp_path):
+    cache = make_cache(tmp_path)
+
+    assert cache.get("k") is None
+    cache.put("k", "value")
+    assert cache.get("k") == "value"
+
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_hits"], stats["disk_hits"]) == (1, 1, 0)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_memory_lru_falls_back_to_disk(tmp_path):
+    cache = make_cache(tmp_path, memory_bytes=250)
+    for key in "abc":
+        cache.put(key, key * 100)
+
+    # "a" was pushed out of memory but is still on disk
+    assert cache.stats()["memory_items"] == 2
+    assert cache.get("a") == "a" * 100
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_is_capped_by_size(tmp_path):
+    cache = make_cache(tmp_path, memory_bytes=0, disk_bytes=250)
+    for key in "abc":
+        cache.put(key, key * 100)
+
+    assert cache.get("a") is None
+    assert cache.get("c") == "c" * 100
+    stats = cache.stats()
+    assert stats["evicted"] == 1
+    assert stats["disk_bytes"] == 200
+
+
+def test_entries_expire(tmp_path):
+    clock = FakeClock()
+    cache = make_cache(tmp_path, clock)
+    cache.put("k", "value")
+
+    clock.now += 61
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 2  # once per tier
+    assert not list(tmp_path.glob("test/*/*"))
+
+
+def test_disk_entries_survive_a_restart(tmp_path):
+    make_cache(tmp_path).put("k", "value")
+
+    restarted = make_cache(tmp_path)
+
+    assert restarted.get("k") == "value"
+    assert restarted.stats()["disk_hits"] == 1
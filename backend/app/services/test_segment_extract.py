@@ -0,0 +1,71 @@
+"""
+Tests for segment-parallel extraction.
+Run with: python -m pytest backend/app/services/test_segment_extract.py
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from app.services.segment_extract import Segment, extract_segment, plan_segments, stitch_segments
+from app.services.video_convert import _extract_landmarks
+
+VIDEO = Path(__file__).parent / "reference_videos" / "hello.mp4"
+
+
+def hand(handedness, x):
+    return {"handedness": handedness, "landmarks": [{"x": x, "y": 0.5, "z": 0.0}] * 21}
+
+
+def frames(first, count, hands):
+    return [{"frame_number": n, "hands": hands(n), "face_reference": None} for n in range(first, first + count)]
+
+
+def test_plan_covers_every_frame_once():
+    plan = plan_segments(300, 4, lead_in=15, min_frames=45)
+
+    assert [(s.start, s.end) for s in plan] == [(0, 75), (75, 150), (150, 225), (225, None)]
+    assert [s.lead_in for s in plan] == [0, 15, 15, 15]
+    assert plan_segments(100, 4, min_frames=45) == [Segment(0, 50, 0), Segment(50, None, 15)]
+    assert plan_segments(30, 4, min_frames=45) == [Segment(0, None, 0)]
+
+
+def test_stitch_drops_lead_in_and_reconciles_handedness():
+    plan = [Segment(0, 10, 0), Segment(10, None, 4)]
+    first = frames(0, 10, lambda n: [hand("Left", 0.2), hand("Right", 0.8)])
+    # The second segment's tracker labelled the same two hands the other way round
+    second = frames(6, 14, lambda n: [hand("Right", 0.21), hand("Left", 0.79)])
+
+    stitched = stitch_segments(plan, [first, second])
+
+    assert [f["frame_number"] for f in stitched] == list(range(20))
+    assert all([h["handedness"] for h in f["hands"]] == ["Left", "Right"] for f in stitched)
+
+
+def test_stitch_keeps_agreeing_labels_and_rejects_gaps():
+    plan = [Segment(0, 10, 0), Segment(10, None, 4)]
+    first = frames(0, 10, lambda n: [hand("Left", 0.2)])
+    second = frames(6, 10, lambda n: [hand("Left", 0.2)] if n < 12 else [hand("Right", 0.7)])
+
+    stitched = stitch_segments(plan, [first, second])
+    assert stitched[15]["hands"][0]["handedness"] == "Right"
+
+    with pytest.raises(ValueError, match="decoded from frame 12"):
+        stitch_segments(plan, [first, frames(8, 10, lambda n: [])])
+
+
+def test_segments_match_sequential_extraction():
+    sequential = json.loads(_extract_landmarks(str(VIDEO), "hello"))
+    plan = plan_segments(sequential["total_frames"], 3, lead_in=8, min_frames=15)
+    stitched = stitch_segments(plan, [extract_segment(str(VIDEO), segment) for segment in plan])
+
+    assert len(plan) == 3
+    assert [f["frame_number"] for f in stitched] == list(range(sequential["total_frames"]))
+    # Face sampling follows global frame numbers, not each segment's own
+    assert [f["frame_number"] for f in stitched if f["face_reference"]] == \
+        [f["frame_number"] for f in sequential["frames"] if f["face_reference"]]
+    same_hands = sum(
+        [h["handedness"] for h in a["hands"]] == [h["handedness"] for h in b["hands"]]
+        for a, b in zip(stitched, sequential["frames"])
+    )
+    assert same_hands >= 0.9 * len(stitched)
@@ -0,0 +1,197 @@
+"""
+Tests for streamed uploads: multipart parsing and decoding from a growing spool file.
+Run with: python -m pytest backend/app/services/test_upload_stream.py
+"""
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.services.upload_spool import SpoolReader, UploadAbortedError, UploadSpool
+from app.services.upload_stream import (
+    StreamedUpload, UploadError, UploadTooLargeError, UploadTooLongError, WebSocketUpload,
+)
+from app.services import video_decode
+from app.services.video_decode import PipeDecoder
+
+VIDEO = Path(__file__).parent / "reference_videos" / "hello.mp4"
+BOUNDARY = "test-boundary"
+
+
+class FakeRequest:
+    def __init__(self, body: bytes, chunk_size: int = 1000, content_length: bool = True):
+        self.headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+        if content_length:
+            self.headers["content-length"] = str(len(body))
+        self._body = body
+        self._chunk_size = chunk_size
+        self.chunks_read = 0
+
+    async def stream(self):
+        for i in range(0, len(self._body), self._chunk_size):
+            self.chunks_read += 1
+            yield self._body[i:i + self._chunk_size]
+
+
+def multipart(field: str, data: bytes, content_type: str = "video/mp4") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="note"\r\n\r\nhi\r\n'
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="a.mp4"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+class FakeWebSocket:
+    def __init__(self, *messages):
+        self.messages = list(messages)
+
+    async def receive(self):
+        message = self.messages.pop(0)
+        if message is None:
+            return {"type": "websocket.disconnect", "code": 1001}
+        if isinstance(message, bytes):
+            return {"type": "websocket.receive", "bytes": message}
+        return {"type": "websocket.receive", "text": message}
+
+
+async def read_all(upload) -> bytes:
+    if isinstance(upload, StreamedUpload):
+        await upload.open()
+    return b"".join([chunk async for chunk in upload])
+
+
+def test_file_field_is_streamed_in_chunks():
+    data = bytes(range(256)) * 40
+    request = FakeRequest(multipart("video", data))
+    upload = StreamedUpload(request, "video", max_size=len(data))
+
+    assert asyncio.run(read_all(upload)) == data
+    assert upload.content_type == "video/mp4"
+    assert upload.filename == "a.mp4"
+    assert upload.size == len(data)
+    assert request.chunks_read > 5
+
+
+def test_oversized_upload_is_rejected_from_content_length():
+    request = FakeRequest(multipart("video", b"x" * 200_000))
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(read_all(StreamedUpload(request, "video", max_size=100_000)))
+    assert request.chunks_read == 0
+
+
+def test_oversized_upload_is_rejected_while_streaming():
+    request = FakeRequest(multipart("video", b"x" * 200_000), content_length=False)
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(read_all(StreamedUpload(request, "video", max_size=100_000)))
+    assert request.chunks_read < 110
+
+
+def test_missing_field():
+    with pytest.raises(UploadError):
+        asyncio.run(read_all(StreamedUpload(FakeRequest(multipart("other", b"x")), "video", max_size=100)))
+
+
+def test_websocket_recording_ends_at_stop():
+    upload = WebSocketUpload(FakeWebSocket(b"ab", b"cd", '{"type": "stop"}', b"ignored"), max_size=10)
+
+    assert asyncio.run(read_all(upload)) == b"abcd"
+    assert upload.size == 4
+    assert upload.stopped_at is not None
+
+
+@pytest.mark.parametrize("messages, error", [
+    ((b"ab", '{"type": "cancel"}'), UploadError),
+    ((b"ab", "hello"), UploadError),
+    ((b"abcdef", b"ghijkl"), UploadTooLargeError),
+    ((b"ab", None), WebSocketDisconnect),
+])
+def test_websocket_recording_errors(messages, error):
+    with pytest.raises(error):
+        asyncio.run(read_all(WebSocketUpload(FakeWebSocket(*messages), max_size=10)))
+
+
+def test_websocket_recording_frame_limit():
+    upload = WebSocketUpload(FakeWebSocket(b"a", b"b", b"c", '{"type": "stop"}'), max_size=10, max_chunks=2)
+    with pytest.raises(UploadTooLongError):
+        asyncio.run(read_all(upload))
+
+
+class RecordingReader(SpoolReader):
+    """Notes how much of the upload had arrived when each chunk reached ffmpeg."""
+
+    def __init__(self, spool: UploadSpool):
+        super().__init__(spool.path)
+        self.spool = spool
+        self.arrived = []
+
+    def chunks(self, chunk_size: int = 256 * 1024):
+        for chunk in super().chunks(chunk_size):
+            self.arrived.append(self.spool.size)
+            yield chunk
+
+
+def test_decoding_starts_before_the_upload_finishes(tmp_path, monkeypatch):
+    # The test clip is smaller than the container sniffing window
+    monkeypatch.setattr(video_decode, "_SPOOL_HEAD_SIZE", 4096)
+    data = VIDEO.read_bytes()
+
+    with UploadSpool(".mp4", directory=tmp_path) as spool:
+        def upload_slowly():
+            for i in range(0, len(data), 4096):
+                spool.write(data[i:i + 4096])
+                time.sleep(0.01)
+            spool.finish()
+
+        writer = threading.Thread(target=upload_slowly)
+        writer.start()
+        reader = RecordingReader(spool)
+        with PipeDecoder(reader, suffix=".mp4") as decoder:
+            frames = sum(1 for _ in decoder)
+        writer.join()
+
+    with PipeDecoder(data, suffix=".mp4") as decoder:
+        assert frames == sum(1 for _ in decoder)
+    # ffmpeg was fed the upload in pieces while it was still arriving
+    assert len(reader.arrived) > 1
+    assert reader.arrived[0] < len(data)
+
+
+def test_aborted_upload_stops_decoding(tmp_path):
+    data = VIDEO.read_bytes()
+    with UploadSpool(".mp4", directory=tmp_path) as spool:
+        spool.write(data[: len(data) // 2])
+        reader = SpoolReader(spool.path)
+        spool.abort()
+
+        with pytest.raises(UploadAbortedError):
+            list(reader.chunks())
+        with pytest.raises(ValueError):
+            with PipeDecoder(reader, suffix=".mp4") as decoder:
+                list(decoder)
+
+
+def test_live_jpeg_frames(tmp_path):
+    frames = []
+    for i in range(12):
+        image = np.full((48, 64, 3), i * 20, dtype=np.uint8)
+        frames.append(cv2.imencode(".jpg", image)[1].tobytes())
+
+    with UploadSpool(".mjpeg", directory=tmp_path) as spool:
+        for frame in frames:
+            spool.write(frame)
+        spool.finish()
+        with PipeDecoder(SpoolReader(spool.path), suffix=".mjpeg", frame_rate=15, live=True) as decoder:
+            assert decoder.info.fps == 15
+            decoded = list(decoder)
+
+    assert len(decoded) == len(frames)
+    assert decoded[0].shape == (48, 64, 3)
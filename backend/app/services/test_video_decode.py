@@ -0,0 +1,83 @@
+"""
+Tests for the ffmpeg pipe decoder.
+Run with: python -m pytest backend/app/services/test_video_decode.py
+"""
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services import video_decode
+from app.services.upload_spool import SpoolReader, UploadSpool
+from app.services.video_decode import PipeDecoder, _needs_seekable_input
+
+VIDEO = Path(__file__).parent / "reference_videos" / "hello.mp4"
+
+
+def opencv_frames(path: Path) -> list:
+    cap = cv2.VideoCapture(str(path))
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_frames_match_opencv_mirrored():
+    expected = opencv_frames(VIDEO)
+    with PipeDecoder(VIDEO.read_bytes(), suffix=".mp4") as decoder:
+        info = decoder.info
+        frames = list(decoder)
+
+    assert len(frames) == len(expected)
+    assert (info.height, info.width) == expected[0].shape[:2]
+    assert info.fps == pytest.approx(cv2.VideoCapture(str(VIDEO)).get(cv2.CAP_PROP_FPS), rel=0.01)
+    mirrored = cv2.cvtColor(cv2.flip(expected[0], 1), cv2.COLOR_BGR2RGB)
+    assert np.abs(frames[0].astype(int) - mirrored).mean() < 3  # YUV 4:2:0 round trip
+
+
+def test_scaling_and_fps_reduction():
+    with PipeDecoder(VIDEO.read_bytes(), suffix=".mp4", max_long_edge=160, target_fps=10) as decoder:
+        frames = list(decoder)
+        assert max(decoder.info.width, decoder.info.height) <= 160
+        assert decoder.info.fps == 10
+    assert max(frames[0].shape[:2]) <= 160
+
+
+def test_invalid_input_raises_value_error():
+    assert _needs_seekable_input(b"\x00\x00\x00\x08mdat", ".mp4")
+    assert not _needs_seekable_input(b"\x00\x00\x00\x08moov", ".mp4")
+    with pytest.raises(ValueError):
+        with PipeDecoder(b"not a video", suffix=".webm") as decoder:
+            list(decoder)
+
+
+def test_slow_consumer_is_not_timed_out(monkeypatch):
+    # Slower in total than the timeout, but never idle for that long
+    monkeypatch.setattr(video_decode, "DECODE_TIMEOUT", 0.5)
+    with PipeDecoder(VIDEO.read_bytes(), suffix=".mp4", max_long_edge=64, target_fps=10) as decoder:
+        count = 0
+        for _ in decoder:
+            count += 1
+            time.sleep(0.1)
+    assert count * 0.1 > 0.5
+
+
+def test_stalled_decode_is_killed(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_decode, "DECODE_TIMEOUT", 0.5)
+    data = VIDEO.read_bytes()
+    with UploadSpool(".webm", directory=tmp_path) as spool:
+        spool.write(data[:1024])  # then nothing more arrives, but the upload isn't abandoned yet
+        # SpoolReader's own idle timeout is longer than the decoder's here
+        reader = SpoolReader(spool.path, idle_timeout=30)
+        start = time.monotonic()
+        with pytest.raises(ValueError, match="timed out"):
+            with PipeDecoder(reader, suffix=".webm") as decoder:
+                list(decoder)
+        spool.abort()
+    assert time.monotonic() - start < 5
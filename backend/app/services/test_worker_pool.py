@@ -0,0 +1,87 @@
+"""
+Tests for the bounded worker pools.
+Run with: python -m pytest backend/app/services/test_worker_pool.py
+"""
+import asyncio
+import os
+import threading
+
+import pytest
+
+from app.services.worker_pool import PoolSaturatedError, WorkerPool
+
+
+async def fill(pool: WorkerPool, release: threading.Event) -> list:
+    """Start as many blocking jobs as the pool holds; return their tasks."""
+    jobs = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(pool.capacity)]
+    await asyncio.sleep(0.05)
+    return jobs
+
+
+def test_full_pool_rejects_new_jobs_until_one_finishes():
+    pool = WorkerPool("test", max_workers=1, max_queue=2, retry_after=7)
+    release = threading.Event()
+
+    async def run():
+        jobs = await fill(pool, release)
+        assert pool.stats()["in_flight"] == 3
+        with pytest.raises(PoolSaturatedError) as rejected:
+            await pool.run(lambda: None)
+        release.set()
+        await asyncio.gather(*jobs)
+        await pool.run(lambda: None)  # room again
+        return rejected.value
+
+    try:
+        error = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert (error.pool_name, error.status_code, error.retry_after) == ("test", 503, 7)
+    assert pool.stats() == {"workers": 1, "queue_size": 2, "in_flight": 0,
+                            "completed": 4, "failed": 0, "rejected": 1}
+
+
+def test_queue_bounds():
+    assert WorkerPool("test", max_workers=2, max_queue=0).capacity == 2
+    assert WorkerPool("test", max_workers=0, max_queue=-1).capacity == 1
+    assert PoolSaturatedError("evaluation", 429, 2).status_code == 429
+
+
+def test_failures_are_counted_apart_from_completions():
+    pool = WorkerPool("test", max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("bad video")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await pool.run(fail)
+        return await pool.run(sum, [1, 2])
+
+    try:
+        assert asyncio.run(run()) == 3
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert (stats["completed"], stats["failed"], stats["in_flight"]) == (1, 1, 0)
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_saturation_is_answered_with_retry_after(monkeypatch, status):
+    os.environ.setdefault("GEMINI_API_KEY", "test-key")
+    os.environ.setdefault("RESULT_CACHE", "0")
+    from fastapi.testclient import TestClient
+    from app import main
+
+    # Every worker and queue slot taken
+    full = WorkerPool("extraction", max_workers=1, max_queue=0, saturated_status=status, retry_after=3)
+    full._in_flight = full.capacity
+    monkeypatch.setattr(main, "extraction_pool", full)
+
+    response = TestClient(main.app).post("/api/evaluate-sign?word=hello&mode=local",
+                                         files={"video": ("hello.webm", b"\x1a\x45\xdf\xa3" * 64, "video/webm")})
+
+    assert response.status_code == status
+    assert response.headers["Retry-After"] == "3"
+    assert "Server is busy (extraction queue is full)" in response.json()["detail"]
+    assert full.stats()["rejected"] == 1
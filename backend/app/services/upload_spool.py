@@ -0,0 +1,166 @@
+"""
+Spool files that let an extraction worker decode an upload while it is still
+arriving.
+
+The API process appends each received chunk to a spool file (UploadSpool) and
+marks it done or aborted at the end; the worker process follows the file as
+it grows (SpoolReader) and feeds it to ffmpeg. Neither side ever holds the
+whole upload in memory, and the worker never blocks the API process: if the
+worker starts late it simply finds more of the file already written.
+
+Markers are sibling files, so the protocol works across processes:
+    <name>.part          upload bytes
+    <name>.part.done     upload complete
+    <name>.part.aborted  upload rejected or abandoned
+
+A worker can also report how far it has got through a file of its own
+(write_progress / read_progress), e.g. for a progress bar.
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+UPLOAD_SPOOL_DIR = Path(os.getenv("UPLOAD_SPOOL_DIR", tempfile.gettempdir()))
+
+# A reader gives up if the spool file stops growing for this long
+SPOOL_IDLE_TIMEOUT = 30.0
+
+
+class UploadAbortedError(ValueError):
+    """The upload was rejected or abandoned before it completed."""
+
+
+class UploadSpool:
+    """
+    Writer side, used by the API process.
+
+    Usage:
+        with UploadSpool(".webm") as spool:
+            start_worker(spool.path)
+            for chunk in upload:
+                spool.write(chunk)
+            spool.finish()
+    """
+
+    def __init__(self, suffix: str = ".mp4", directory: Optional[Path] = None):
+        directory = Path(directory or UPLOAD_SPOOL_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(suffix=f"{suffix}.part", dir=directory)
+        self.path = name
+        self.size = 0
+        self._file = os.fdopen(fd, "wb", buffering=0)
+        self._state: Optional[str] = None
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def _mark(self, state: str) -> None:
+        if self._state is not None:
+            return
+        self._state = state
+        self._file.close()
+        Path(f"{self.path}.{state}").touch()
+
+    def finish(self) -> None:
+        self._mark("done")
+
+    def abort(self) -> None:
+        self._mark("aborted")
+
+    def close(self) -> None:
+        self.abort()  # no-op if already finished
+        for path in (self.path, f"{self.path}.done", f"{self.path}.aborted"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "UploadSpool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def write_progress(path: str, frames: int) -> None:
+    """Worker side: record the number of frames decoded so far (replaces the file atomically)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(frames))
+    os.replace(tmp, path)
+
+
+def new_progress_file(directory: Optional[Path] = None) -> str:
+    """API side: an empty file for the worker's write_progress, kept with the upload spools."""
+    directory = Path(directory or UPLOAD_SPOOL_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(suffix=".progress", dir=directory)
+    os.close(fd)
+    return name
+
+
+def read_progress(path: str) -> int:
+    """API side: the last number of frames write_progress recorded, 0 before the first."""
+    try:
+        return int(Path(path).read_text() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+class SpoolReader:
+    """
+    Reader side, used by the extraction worker.
+
+    Raises UploadAbortedError from any method once the writer aborts, removes
+    the spool, or stops writing for SPOOL_IDLE_TIMEOUT seconds.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.01, idle_timeout: float = SPOOL_IDLE_TIMEOUT):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+
+    def _complete(self) -> bool:
+        if os.path.exists(f"{self.path}.aborted") or not os.path.exists(self.path):
+            raise UploadAbortedError("Upload aborted")
+        return os.path.exists(f"{self.path}.done")
+
+    def _wait(self, ready) -> None:
+        last_size, last_change = -1, time.monotonic()
+        while not ready():
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                raise UploadAbortedError("Upload aborted")
+            if size != last_size:
+                last_size, last_change = size, time.monotonic()
+            elif time.monotonic() - last_change > self.idle_timeout:
+                raise UploadAbortedError("Upload stalled")
+            time.sleep(self.poll_interval)
+
+    def head(self, size: int) -> bytes:
+        """The first `size` bytes (fewer if the complete upload is shorter)."""
+        self._wait(lambda: self._complete() or os.path.getsize(self.path) >= size)
+        with open(self.path, "rb") as f:
+            return f.read(size)
+
+    def wait_complete(self) -> None:
+        self._wait(self._complete)
+
+    def chunks(self, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+        """Yield the upload's bytes as they arrive, until it is complete."""
+        with open(self.path, "rb") as f:
+            while True:
+                data = f.read(chunk_size)
+                if data:
+                    yield data
+                    continue
+                if self._complete():
+                    rest = f.read()
+                    if rest:
+                        yield rest
+                    return
+                self._wait(lambda: self._complete() or os.path.getsize(self.path) > f.tell())
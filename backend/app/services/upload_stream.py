@@ -0,0 +1,284 @@
+"""
+Streaming multipart upload parsing.
+
+FastAPI's UploadFile parameters make the framework read the entire request
+body before the endpoint runs, and the endpoints then pulled the whole file
+into memory with `await video.read()`. StreamedUpload instead parses the
+multipart body as it arrives and hands out the file's bytes chunk by chunk,
+so a request never holds more than one network chunk in memory. The size
+limit is enforced as the bytes arrive (or up front from Content-Length), and
+the upload is hashed on the way through for the result cache.
+
+WebSocketUpload does the same for a recording streamed over a WebSocket while
+it is being made, one binary message per chunk, and FileUpload for an upload
+stored earlier (a queued job's video).
+"""
+import asyncio
+import hashlib
+import json
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # older releases of python-multipart
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadError(ValueError):
+    """The request does not carry a usable upload."""
+
+
+class UploadTooLargeError(UploadError):
+    pass
+
+
+class UploadTooLongError(UploadError):
+    """A streamed recording went on for longer than allowed."""
+
+
+async def read_body(request: Request, max_size: int) -> bytes:
+    """
+    The whole (non-multipart) request body, refusing anything over max_size
+    before reading it where Content-Length allows, and otherwise as soon as
+    the running total passes it.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > max_size:
+        raise UploadTooLargeError("Upload too large")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_size:
+            raise UploadTooLargeError("Upload too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class StreamedUpload:
+    """
+    One file field of a multipart/form-data request, read incrementally.
+
+    Usage:
+        upload = StreamedUpload(request, "video", max_size=50 * 1024 * 1024)
+        await upload.open()              # parses up to the file's part headers
+        print(upload.content_type)
+        async for chunk in upload:       # raises UploadTooLargeError past max_size
+            ...
+        upload.size, upload.sha256
+
+    Raises:
+        UploadError: if the body is not multipart or has no such field
+        UploadTooLargeError: as soon as the file exceeds max_size
+    """
+
+    def __init__(self, request: Request, field: str, max_size: int):
+        self.request = request
+        self.field = field
+        self.max_size = max_size
+        self.content_type = ""
+        self.filename = ""
+        self.size = 0
+
+        self._hash = hashlib.sha256()
+        self._body: Optional[AsyncIterator[bytes]] = None
+        self._parser: Optional[MultipartParser] = None
+        self._events: List[Tuple[str, bytes]] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: dict = {}
+        self._in_field = False
+        self._field_done = False
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    # Parser callbacks
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._in_field = options.get(b"name", b"").decode("latin-1") == self.field and not self._field_done
+        if self._in_field:
+            self.filename = options.get(b"filename", b"").decode("utf-8", errors="replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+            self._events.append(("headers", b""))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._in_field:
+            self._in_field = False
+            self._field_done = True
+            self._events.append(("end", b""))
+
+    # Driving the parser
+
+    async def _next_events(self) -> bool:
+        """Feed the next body chunk to the parser; False once the body is exhausted."""
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            return False
+        if chunk:
+            self._parser.write(chunk)
+        return True
+
+    async def open(self) -> None:
+        content_type, params = parse_options_header(self.request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise UploadError("Expected a multipart/form-data upload")
+
+        length = self.request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > self.max_size + _MULTIPART_OVERHEAD:
+            raise UploadTooLargeError("Upload too large")
+
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        self._body = self.request.stream().__aiter__()
+
+        while not any(kind == "headers" for kind, _ in self._events):
+            if not await self._next_events():
+                raise UploadError(f"No '{self.field}' file in the upload")
+        while self._events and self._events[0][0] != "headers":
+            self._events.pop(0)
+        self._events.pop(0)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while True:
+            events, self._events = self._events, []
+            for kind, data in events:
+                if kind == "end":
+                    return
+                self.size += len(data)
+                if self.size > self.max_size:
+                    raise UploadTooLargeError("Upload too large")
+                self._hash.update(data)
+                yield data
+            if not await self._next_events():
+                raise UploadError("Upload ended before the file was complete")
+
+
+class WebSocketUpload:
+    """
+    A recording streamed over an accepted WebSocket.
+
+    The client sends the recording as binary messages (MediaRecorder chunks,
+    or one JPEG per frame) and ends it with the text message {"type": "stop"},
+    or gives up with {"type": "cancel"}. Iterating yields the chunks until the
+    stop message. With `max_duration`, the stop message must arrive within
+    that many seconds of the start of iteration, however quiet the client is;
+    with `max_chunks`, at most that many binary messages are accepted (frames,
+    for one JPEG per message).
+
+    Raises:
+        UploadError: on cancel or an unexpected text message
+        UploadTooLargeError: as soon as the recording exceeds max_size
+        UploadTooLongError: once the recording exceeds max_duration or max_chunks
+        WebSocketDisconnect: if the client goes away mid-recording
+    """
+
+    def __init__(self, websocket: WebSocket, max_size: int, max_duration: Optional[float] = None,
+                 max_chunks: Optional[int] = None):
+        self.websocket = websocket
+        self.max_size = max_size
+        self.max_duration = max_duration
+        self.max_chunks = max_chunks
+        self.size = 0
+        self.chunks = 0
+        self.stopped_at: Optional[float] = None  # time.monotonic() of the stop message
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    async def _receive(self, deadline: Optional[float]) -> dict:
+        if deadline is None:
+            return await self.websocket.receive()
+        try:
+            return await asyncio.wait_for(self.websocket.receive(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise UploadTooLongError(f"Recording longer than {self.max_duration:g} seconds")
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        deadline = time.monotonic() + self.max_duration if self.max_duration else None
+        while True:
+            message = await self._receive(deadline)
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            data = message.get("bytes")
+            if data is not None:
+                self.size += len(data)
+                self.chunks += 1
+                if self.size > self.max_size:
+                    raise UploadTooLargeError("Upload too large")
+                if self.max_chunks is not None and self.chunks > self.max_chunks:
+                    raise UploadTooLongError(f"Recording longer than {self.max_chunks} frames")
+                self._hash.update(data)
+                yield data
+                continue
+
+            try:
+                kind = json.loads(message.get("text") or "{}").get("type")
+            except (ValueError, AttributeError):
+                kind = None
+            if kind == "stop":
+                self.stopped_at = time.monotonic()
+                return
+            if kind == "cancel":
+                raise UploadError("Recording cancelled")
+            raise UploadError('Expected binary video data or {"type": "stop"}')
+
+
+class FileUpload:
+    """An upload stored in a file, handed out in chunks like StreamedUpload."""
+
+    def __init__(self, path: str, chunk_size: int = 1024 * 1024):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, self.chunk_size)
+                if not chunk:
+                    return
+                self.size += len(chunk)
+                self._hash.update(chunk)
+                yield chunk
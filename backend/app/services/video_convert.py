@@ -1,12 +1,44 @@
 import cv2
-import mediapipe as mp
 import json
-import tempfile
 import os
-import subprocess
+import re
+import time
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from .active_segment import ActiveSegmentTrimmer
+from .detector_pool import detector_pool
+from .frame_preprocess import RoiCropper, to_full_frame_points, to_model_rgb
+from .frame_sampling import FrameSamplingPolicy, EveryNthFacePolicy, make_sampling_policy
+from .json_codec import dumps
+from .metrics import timed_frames, timed_stage
+from .upload_spool import SpoolReader, write_progress
+from .video_decode import PipeDecoder
+
+# Which models to run on which frames; see frame_sampling.py for the options
+FRAME_SAMPLING_POLICY = os.getenv("FRAME_SAMPLING_POLICY", EveryNthFacePolicy.name)
+
+# Optional downscaling / frame-rate reduction applied by ffmpeg while decoding (0 = off)
+DECODE_MAX_LONG_EDGE = int(os.getenv("DECODE_MAX_LONG_EDGE", "0")) or None
+DECODE_TARGET_FPS = float(os.getenv("DECODE_TARGET_FPS", "0")) or None
+# Run the models on a crop around the previous frame's hands and face (see frame_preprocess.py)
+FRAME_ROI_CROP = os.getenv("FRAME_ROI_CROP", "0") == "1"
+# Skip the still frames before and after the sign in uploads (see active_segment.py),
+# keeping TRIM_IDLE_MARGIN seconds of them on each side
+TRIM_IDLE = os.getenv("TRIM_IDLE", "1") == "1"
+TRIM_IDLE_MARGIN = float(os.getenv("TRIM_IDLE_MARGIN", "0.3"))
+# Memory the trimmer may hold still frames in, per extraction
+TRIM_IDLE_BUFFER_MB = int(os.getenv("TRIM_IDLE_BUFFER_MB", "128"))
+
+# Bump when a change to extraction changes its output, so cached results are not reused
+EXTRACTOR_VERSION = "3"
+
+
+def extractor_fingerprint() -> str:
+    """Everything that determines convert_video_to_json's output for a given upload and word."""
+    return f"{EXTRACTOR_VERSION}:{FRAME_SAMPLING_POLICY}:{DECODE_MAX_LONG_EDGE}:{DECODE_TARGET_FPS}:{FRAME_ROI_CROP}:{TRIM_IDLE and f'{TRIM_IDLE_MARGIN}/{TRIM_IDLE_BUFFER_MB}'}"
 
-mp_face_mesh = mp.solutions.face_mesh
-mp_hands = mp.solutions.hands
 
 # Key face landmarks for reference (8 points instead of 478)
 FACE_KEY_POINTS = {
@@ -21,35 +53,6 @@ FACE_KEY_POINTS = {
 }
 
 
-def _transcode_to_mp4(video_bytes: bytes, input_suffix: str) -> bytes:
-    """Use ffmpeg to convert any video format to mp4 so OpenCV can decode it."""
-    inp_path = None
-    out_path = None
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=input_suffix) as inp:
-            inp.write(video_bytes)
-            inp_path = inp.name
-        out_path = inp_path.replace(input_suffix, '_converted.mp4')
-        result = subprocess.run(
-            [
-                'ffmpeg', '-y', '-i', inp_path,
-                '-c:v', 'libx264', '-preset', 'ultrafast',
-                '-an',          # drop audio — not needed for landmark extraction
-                out_path
-            ],
-            capture_output=True,
-            timeout=60,
-        )
-        if result.returncode != 0:
-            raise ValueError(f"ffmpeg transcoding failed: {result.stderr.decode(errors='replace')}")
-        with open(out_path, 'rb') as f:
-            return f.read()
-    finally:
-        for p in (inp_path, out_path):
-            if p and os.path.exists(p):
-                os.remove(p)
-
-
 def convert_video_to_json(word: str, video: bytes, suffix: str = '.mp4') -> str:
     """
     Convert video to JSON landmark string.
@@ -57,48 +60,128 @@ def convert_video_to_json(word: str, video: bytes, suffix: str = '.mp4') -> str:
     Args:
         word: The ASL word being signed
         video: Video file content as bytes
-        suffix: File extension to use for the temp file (e.g. '.mp4' or '.webm')
+        suffix: Container extension of the upload (e.g. '.mp4', '.webm' or '.mkv')
 
     Returns:
         JSON string containing landmark data
     """
-    # Transcode non-mp4 formats (e.g. webm from browser) to mp4 so OpenCV can decode them
-    if suffix != '.mp4':
-        video = _transcode_to_mp4(video, suffix)
-        suffix = '.mp4'
+    # Decode straight from memory through an ffmpeg pipe (no temp files, no re-encode)
+    policy = make_sampling_policy(FRAME_SAMPLING_POLICY, face_sample_rate=10)
+    with PipeDecoder(
+        video,
+        suffix=suffix,
+        max_long_edge=DECODE_MAX_LONG_EDGE,
+        target_fps=DECODE_TARGET_FPS,
+    ) as decoder:
+        return _extract_from_frames(
+            decoder, decoder.info.fps, word, policy, _upload_roi(), _upload_trimmer(decoder.info.fps)
+        )
 
-    # Write video bytes to a temporary file with the correct extension
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-        temp_file.write(video)
-        temp_path = temp_file.name
 
+def convert_upload_to_json(
+    word: str,
+    spool_path: str,
+    suffix: str = '.mp4',
+    frame_rate: Optional[float] = None,
+    live: bool = False,
+    progress_path: Optional[str] = None,
+) -> str:
+    """
+    Like convert_video_to_json, for an upload still being written to a spool file.
+
+    Decoding and landmark extraction start right away and follow the file as
+    it grows (see upload_spool.py), using one set of detectors throughout, so
+    MediaPipe keeps tracking across chunks. For a recording streamed while it
+    is made, pass live=True and the recording's frame rate (see PipeDecoder).
+    With `progress_path`, the number of frames decoded so far is written
+    there as extraction goes (see upload_spool.read_progress).
+
+    Raises:
+        ValueError: if the video can't be decoded or the upload is aborted
+    """
+    policy = make_sampling_policy(FRAME_SAMPLING_POLICY, face_sample_rate=10)
+    with PipeDecoder(
+        SpoolReader(spool_path),
+        suffix=suffix,
+        max_long_edge=DECODE_MAX_LONG_EDGE,
+        target_fps=DECODE_TARGET_FPS,
+        frame_rate=frame_rate,
+        live=live,
+    ) as decoder:
+        frames = _reporting_progress(decoder, progress_path) if progress_path else decoder
+        return _extract_from_frames(
+            frames, decoder.info.fps, word, policy, _upload_roi(), _upload_trimmer(decoder.info.fps)
+        )
+
+
+def _reporting_progress(frames: Iterable[np.ndarray], path: str, interval: float = 0.2) -> Iterator[np.ndarray]:
+    """Pass `frames` through, writing how many have been produced to `path` every `interval` seconds."""
+    count, written_at = 0, 0.0
+    for frame in frames:
+        count += 1
+        if time.monotonic() - written_at >= interval:
+            write_progress(path, count)
+            written_at = time.monotonic()
+        yield frame
+    write_progress(path, count)
+
+
+def expected_frames(path: str) -> Optional[int]:
+    """
+    How many frames decoding the complete upload at `path` should produce,
+    from its container's frame count, or None if the container doesn't say
+    (e.g. MediaRecorder WebM).
+    """
+    cap = cv2.VideoCapture(path)
     try:
-        landmarks_json = _extract_landmarks(temp_path, word, face_sample_rate=10)
-        return landmarks_json
+        count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
     finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        cap.release()
+    if not 0 < count < 1e7:
+        return None
+    if DECODE_TARGET_FPS and fps > DECODE_TARGET_FPS:
+        count *= DECODE_TARGET_FPS / fps
+    return int(round(count))
+
+
+def _upload_roi() -> Optional[RoiCropper]:
+    return RoiCropper() if FRAME_ROI_CROP else None
+
+
+def _upload_trimmer(fps: float) -> Optional[ActiveSegmentTrimmer]:
+    if not TRIM_IDLE:
+        return None
+    return ActiveSegmentTrimmer(fps, margin_seconds=TRIM_IDLE_MARGIN, max_hold_bytes=TRIM_IDLE_BUFFER_MB * 1024 * 1024)
+
+
+def _read_capture_frames(cap, max_long_edge: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Yield mirrored RGB frames from an opened cv2.VideoCapture (see frame_preprocess.py)."""
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        yield to_model_rgb(frame, max_long_edge)
 
 
-def _extract_landmarks(video_path: str, word: str, face_sample_rate: int = 10) -> str:
+def _extract_landmarks(
+    video_path: str,
+    word: str,
+    face_sample_rate: int = 10,
+    sampling_policy: FrameSamplingPolicy = None,
+    max_long_edge: Optional[int] = None,
+    roi: Optional[RoiCropper] = None,
+) -> str:
     """
     Extract hand landmarks (every frame) + face reference (sampled).
     Same logic as landmark_extractor.py but returns JSON string instead of saving to file.
+    `sampling_policy` decides which models run on each frame (default: face every
+    `face_sample_rate` frames). Frames are downsized to `max_long_edge` and,
+    with `roi`, cropped around the signer before the models see them.
     """
-    # Initialize MediaPipe
-    hands = mp_hands.Hands(
-        static_image_mode=False,
-        max_num_hands=2,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
-    )
-
-    face_mesh = mp_face_mesh.FaceMesh(
-        max_num_faces=1,
-        refine_landmarks=False,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
-    )
+    if sampling_policy is None:
+        sampling_policy = EveryNthFacePolicy(face_sample_rate)
 
     # Open video
     cap = cv2.VideoCapture(video_path)
@@ -106,24 +189,82 @@ def _extract_landmarks(video_path: str, word: str, face_sample_rate: int = 10) -
     if not cap.isOpened():
         raise ValueError(f"Could not open video file")
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        return _extract_from_frames(_read_capture_frames(cap, max_long_edge), fps, word, sampling_policy, roi)
+    finally:
+        cap.release()
 
-    landmarks_data = []
-    frame_count = 0
-    frames_with_hands = 0
-    frames_with_face = 0
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+def _extract_from_frames(
+    frames: Iterable[np.ndarray],
+    fps: float,
+    word: str,
+    sampling_policy: FrameSamplingPolicy,
+    roi: Optional[RoiCropper] = None,
+    trimmer: Optional[ActiveSegmentTrimmer] = None,
+) -> str:
+    """
+    Run the hands/face detectors over mirrored RGB frames.
+    MediaPipe detectors are borrowed from the warm detector pool and reset afterwards.
+    With `trimmer`, only the active part of the video is extracted (frames are
+    numbered from its start) and the output records which part that was.
+    """
+    sampling_policy.reset()
+    if roi is not None:
+        roi.reset()
+    frames = timed_frames(frames, "decode")
+    if trimmer is not None:
+        frames = trimmer.filter(frames)
+    with detector_pool.acquire() as detectors:
+        landmarks_data = _detect_frames(frames, sampling_policy, detectors.hands, detectors.face_mesh, roi=roi)
+    with timed_stage("serialize"):
+        return _landmarks_json(
+            word, fps, landmarks_data, sampling_policy.face_sample_rate, sampling_policy.name,
+            active_range=trimmer.active_range() if trimmer is not None else None,
+        )
 
-        frame = cv2.flip(frame, 1)
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-        results_hands = hands.process(rgb)
-        results_face = face_mesh.process(rgb)
+def _points(landmark_lists, box) -> list:
+    """
+    Full-frame {'x', 'y', 'z'} dicts, rounded to 4 places, for each of several
+    MediaPipe landmark lists. All of a frame's landmarks are copied into one
+    array, so mapping and rounding them is one vectorized pass.
+    """
+    coords = np.array([(lm.x, lm.y, lm.z) for landmarks in landmark_lists for lm in landmarks], dtype=np.float64)
+    if not len(coords):
+        return [[] for _ in landmark_lists]
+    rows = to_full_frame_points(coords, box).round(4).tolist()
+    points, start = [], 0
+    for landmarks in landmark_lists:
+        end = start + len(landmarks)
+        points.append([{'x': x, 'y': y, 'z': z} for x, y, z in rows[start:end]])
+        start = end
+    return points
+
+
+def _detect_frames(frames, sampling_policy: FrameSamplingPolicy, hands, face_mesh, first_frame: int = 0,
+                   roi: Optional[RoiCropper] = None):
+    """
+    Per-frame landmark dicts for `frames`, numbered from `first_frame` (the
+    sampling policy sees the same numbers, so a segment of a video samples the
+    face on the same frames as the whole video would). With `roi`, the models
+    run on a crop and landmarks are mapped back to full-frame coordinates.
+    """
+    landmarks_data = []
+    frame_count = first_frame
+
+    for rgb in frames:
+        box = None
+        if roi is not None:
+            rgb, box = roi.crop(rgb)
+
+        # Only run the models the sampling policy asks for on this frame
+        with timed_stage("hands"):
+            results_hands = hands.process(rgb) if sampling_policy.run_hands(frame_count) else None
+        run_face = sampling_policy.run_face(frame_count)
+        with timed_stage("face"):
+            results_face = face_mesh.process(rgb) if run_face else None
 
         # Save EVERY frame for hands
         frame_data = {
@@ -132,64 +273,102 @@ def _extract_landmarks(video_path: str, word: str, face_sample_rate: int = 10) -
             'face_reference': None  # Only populated every Nth frame
         }
 
-        # Extract hand landmarks - EVERY FRAME
-        if results_hands.multi_hand_landmarks:
-            frames_with_hands += 1
-
-            for hand_idx, hand_landmarks in enumerate(results_hands.multi_hand_landmarks):
-                handedness = results_hands.multi_handedness[hand_idx].classification[0].label
-
-                landmarks_list = []
-                for lm in hand_landmarks.landmark:
-                    landmarks_list.append({
-                        'x': round(lm.x, 4),
-                        'y': round(lm.y, 4),
-                        'z': round(lm.z, 4)
-                    })
-
-                frame_data['hands'].append({
-                    'handedness': handedness,
-                    'landmarks': landmarks_list
-                })
-
-        # Extract face landmarks - ONLY EVERY Nth FRAME
-        if frame_count % face_sample_rate == 0:
-            if results_face.multi_face_landmarks:
-                frames_with_face += 1
-                face_landmarks = results_face.multi_face_landmarks[0].landmark
-
-                face_key_points = {}
-                for name, idx in FACE_KEY_POINTS.items():
-                    lm = face_landmarks[idx]
-                    face_key_points[name] = {
-                        'x': round(lm.x, 4),
-                        'y': round(lm.y, 4),
-                        'z': round(lm.z, 4)
-                    }
+        # Hand landmarks - EVERY FRAME; face key points - ONLY ON FRAMES THE POLICY SAMPLED
+        hand_results = []
+        if results_hands is not None and results_hands.multi_hand_landmarks:
+            hand_results = results_hands.multi_hand_landmarks
+        face_landmarks = []
+        if run_face and results_face.multi_face_landmarks:
+            face_mesh_landmarks = results_face.multi_face_landmarks[0].landmark
+            face_landmarks = [face_mesh_landmarks[idx] for idx in FACE_KEY_POINTS.values()]
+
+        # Converted together, in one pass
+        *hand_points, face_points = _points([hand.landmark for hand in hand_results] + [face_landmarks], box)
 
+        for hand_idx, landmarks_list in enumerate(hand_points):
+            handedness = results_hands.multi_handedness[hand_idx].classification[0].label
+
+            frame_data['hands'].append({
+                'handedness': handedness,
+                'landmarks': landmarks_list
+            })
+
+        if run_face:
+            face_key_points = dict(zip(FACE_KEY_POINTS, face_points)) if face_points else None
+
+            sampling_policy.observe_face(frame_count, face_key_points)
+
+            if face_key_points is not None and sampling_policy.keep_face(frame_count):
                 frame_data['face_reference'] = face_key_points
 
+        if roi is not None:
+            roi.update(frame_data)
+
         # Save ALL frames (even if no hands, to keep frame numbers consistent)
         landmarks_data.append(frame_data)
         frame_count += 1
 
-    cap.release()
-    hands.close()
-    face_mesh.close()
+    return landmarks_data
 
+
+def _landmarks_json(word: str, fps: float, landmarks_data: list, face_sample_rate: int, policy_name: str,
+                    active_range: Optional[dict] = None) -> str:
+    """The landmark JSON document for a video's frame dicts."""
+    frames_with_hands = sum(1 for frame in landmarks_data if frame['hands'])
     if frames_with_hands == 0:
         raise ValueError("No hands detected in video")
 
     # Build output data
     output_data = {
         'word': word,
-        'total_frames': frame_count,
+        'total_frames': len(landmarks_data),
         'frames_with_hands': frames_with_hands,
-        'frames_with_face': frames_with_face,
+        'frames_with_face': sum(1 for frame in landmarks_data if frame['face_reference'] is not None),
         'face_sample_rate': face_sample_rate,
+        'frame_sampling_policy': policy_name,
         'fps': fps,
         'face_key_points_info': list(FACE_KEY_POINTS.keys()),
-        'frames': landmarks_data
     }
+    if active_range is not None:
+        output_data['active_range'] = active_range
+    output_data['frames'] = landmarks_data
+
+    return dumps(output_data)
+
+
+def read_summary(landmarks_json: str) -> dict:
+    """
+    The top-level fields of a landmark JSON document, without parsing its frames.
+
+    Members are decoded one at a time up to "frames", which _landmarks_json
+    (and landmark_format.sequence_to_json) write last; anything after it is
+    not read.
+
+    Raises:
+        ValueError: if the document is not a JSON object
+    """
+    summary = {}
+    pos = _skip_space(landmarks_json, 0)
+    if not landmarks_json.startswith("{", pos):
+        raise ValueError("Landmark document is not a JSON object")
+    pos = _skip_space(landmarks_json, pos + 1)
+    while not landmarks_json.startswith("}", pos):
+        key, pos = _json_decoder.raw_decode(landmarks_json, pos)
+        pos = _skip_space(landmarks_json, pos)
+        if not isinstance(key, str) or not landmarks_json.startswith(":", pos):
+            raise ValueError(f"Malformed landmark document at character {pos}")
+        if key == "frames":
+            break
+        summary[key], pos = _json_decoder.raw_decode(landmarks_json, _skip_space(landmarks_json, pos + 1))
+        pos = _skip_space(landmarks_json, pos)
+        if landmarks_json.startswith(",", pos):
+            pos = _skip_space(landmarks_json, pos + 1)
+    return summary
+
+
+_json_decoder = json.JSONDecoder()
+_SPACE = re.compile(r"\s*")
+
 
-    return json.dumps(output_data, indent=2)
\ No newline at end of file
+def _skip_space(text: str, pos: int) -> int:
+    return _SPACE.match(text, pos).end()
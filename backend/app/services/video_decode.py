@@ -0,0 +1,330 @@
+"""
+In-memory video decoding through an ffmpeg pipe.
+
+Upload bytes are written to ffmpeg's stdin and decoded frames are read back
+from its stdout as a YUV4MPEG2 stream, which carries the frame size and rate
+in its header, so no probing step, temp file or re-encode is needed. ffmpeg
+also mirrors the frames (the extractors work on selfie-view frames), and can
+optionally downscale them and reduce the frame rate before they reach Python.
+
+Supports everything ffmpeg can demux from a pipe (MP4, WebM, MKV, ...). MP4s
+whose index ('moov' box) comes after the media data can't be read from a
+pipe; those are handed to ffmpeg through a file in /dev/shm (memory-backed
+on Linux) instead.
+
+PipeDecoder also accepts a SpoolReader (see upload_spool.py) instead of bytes,
+in which case decoding starts while the upload is still being received. For
+live recordings (live=True) ffmpeg skips its multi-second input probing so
+frames come out as soon as they arrive, and a stream of concatenated JPEG
+frames ('.mjpeg') is accepted alongside the container formats.
+"""
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from .upload_spool import SpoolReader, UploadAbortedError
+
+# Kill ffmpeg if it makes no progress (no input fed to it, no frame read from it) for this long.
+# Not a limit on the whole decode: frames are pulled as the models process them, and a
+# streamed upload arrives as fast as the client sends it.
+DECODE_TIMEOUT = 60
+
+_SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+_ISO_BMFF_SUFFIXES = {".mp4", ".m4v", ".mov"}
+# Bytes of a spooled upload inspected to decide whether it can be piped
+_SPOOL_HEAD_SIZE = 64 * 1024
+# Inputs without a container, named by the suffix the caller passes
+_RAW_INPUT_FORMATS = {".mjpeg": "mjpeg"}
+# Probing limits for live input: enough for the container header, not seconds of video
+_LIVE_PROBE_ARGS = ["-probesize", "32768", "-analyzeduration", "0"]
+
+
+@dataclass
+class VideoStreamInfo:
+    """Properties of the decoded stream (after any scaling / fps reduction)."""
+    width: int
+    height: int
+    fps: float
+
+
+def _needs_seekable_input(video: bytes, suffix: str) -> bool:
+    """True for MP4/MOV files whose 'moov' box comes after 'mdat' (not pipe-readable)."""
+    if suffix.lower() not in _ISO_BMFF_SUFFIXES:
+        return False
+    offset = 0
+    while offset + 8 <= len(video):
+        size, box_type = struct.unpack(">I4s", video[offset:offset + 8])
+        if box_type == b"moov":
+            return False
+        if box_type == b"mdat":
+            return True
+        if size == 1 and offset + 16 <= len(video):
+            size = struct.unpack(">Q", video[offset + 8:offset + 16])[0]
+        if size < 8:
+            break
+        offset += size
+    return True
+
+
+def _build_filters(flip: bool, max_long_edge: Optional[int], target_fps: Optional[float]) -> str:
+    filters = []
+    if target_fps:
+        filters.append(f"fps={target_fps}")
+    if flip:
+        filters.append("hflip")
+    if max_long_edge:
+        filters.append(
+            f"scale=w='min(iw,{max_long_edge})':h='min(ih,{max_long_edge})'"
+            ":force_original_aspect_ratio=decrease:force_divisible_by=2"
+        )
+    else:
+        # 4:2:0 output needs even dimensions
+        filters.append("scale=trunc(iw/2)*2:trunc(ih/2)*2")
+    return ",".join(filters)
+
+
+def _input_args(suffix: str, frame_rate: Optional[float], live: bool) -> List[str]:
+    args = list(_LIVE_PROBE_ARGS) if live else []
+    raw_format = _RAW_INPUT_FORMATS.get(suffix.lower())
+    if raw_format:
+        args += ["-f", raw_format]
+        if frame_rate:
+            args += ["-framerate", str(frame_rate)]
+    return args
+
+
+def _ffmpeg_command(
+    input_path: str,
+    flip: bool,
+    max_long_edge: Optional[int],
+    target_fps: Optional[float],
+    input_args: Optional[List[str]] = None,
+) -> List[str]:
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        *(input_args or []),
+        "-i", input_path,
+        "-an",  # drop audio — not needed for landmark extraction
+        "-vf", _build_filters(flip, max_long_edge, target_fps),
+        "-pix_fmt", "yuv420p",
+        "-f", "yuv4mpegpipe",
+        "pipe:1",
+    ]
+
+
+def _parse_y4m_header(line: bytes) -> VideoStreamInfo:
+    params = line.decode("ascii", errors="replace").split()
+    if not params or params[0] != "YUV4MPEG2":
+        raise ValueError("Could not open video file")
+    width = height = 0
+    fps = 0.0
+    for p in params[1:]:
+        if p[0] == "W":
+            width = int(p[1:])
+        elif p[0] == "H":
+            height = int(p[1:])
+        elif p[0] == "F":
+            num, den = p[1:].split(":")
+            fps = int(num) / int(den) if int(den) else 0.0
+    return VideoStreamInfo(width=width, height=height, fps=fps)
+
+
+def _yuv_to_rgb(buf: bytes, info: VideoStreamInfo) -> np.ndarray:
+    yuv = np.frombuffer(buf, dtype=np.uint8).reshape(info.height * 3 // 2, info.width)
+    return cv2.cvtColor(yuv, cv2.COLOR_YUV2RGB_I420)
+
+
+def _frame_size(info: VideoStreamInfo) -> int:
+    return info.width * info.height * 3 // 2
+
+
+class PipeDecoder:
+    """
+    Decode a video held in memory, or still arriving in a spool file, into RGB frames.
+
+    Usage:
+        with PipeDecoder(video_bytes, suffix='.webm') as decoder:
+            fps = decoder.info.fps
+            for rgb in decoder:
+                ...
+
+    Frames are mirrored (selfie view) unless flip=False. With a SpoolReader,
+    decoding follows the upload as it grows; MP4s that need seekable input
+    wait for the upload to complete and are read from the spool file.
+
+    live=True is for recordings streamed while they are made: ffmpeg starts
+    decoding after the first few KB instead of probing seconds of input, and
+    the output is resampled to `frame_rate` (browser recordings have variable
+    frame timing, which would otherwise be guessed from too little input).
+    `frame_rate` is also the rate of '.mjpeg' frame streams, which carry none.
+
+    Raises:
+        ValueError: if ffmpeg can't decode the input, or makes no progress for DECODE_TIMEOUT seconds
+    """
+
+    def __init__(
+        self,
+        video: Union[bytes, SpoolReader],
+        suffix: str = ".mp4",
+        max_long_edge: Optional[int] = None,
+        target_fps: Optional[float] = None,
+        flip: bool = True,
+        frame_rate: Optional[float] = None,
+        live: bool = False,
+    ):
+        self.video = video
+        self.suffix = suffix
+        self.max_long_edge = max_long_edge
+        self.target_fps = target_fps or (frame_rate if live else None)
+        self.flip = flip
+        self.frame_rate = frame_rate
+        self.live = live
+        self.info: Optional[VideoStreamInfo] = None
+
+        self._proc: Optional[subprocess.Popen] = None
+        self._writer: Optional[threading.Thread] = None
+        self._shm_path: Optional[str] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self._last_progress = 0.0
+        self._timed_out = False
+        self._aborted = False
+
+    def _input(self):
+        """(ffmpeg input path, whether to feed stdin)."""
+        if isinstance(self.video, SpoolReader):
+            if self.suffix.lower() not in _ISO_BMFF_SUFFIXES:
+                return "pipe:0", True  # streamable as it arrives; no need to wait for the head
+            if _needs_seekable_input(self.video.head(_SPOOL_HEAD_SIZE), self.suffix):
+                self.video.wait_complete()
+                return self.video.path, False
+            return "pipe:0", True
+
+        if _needs_seekable_input(self.video, self.suffix):
+            with tempfile.NamedTemporaryFile(delete=False, suffix=self.suffix, dir=_SHM_DIR) as f:
+                f.write(self.video)
+                self._shm_path = f.name
+            return self._shm_path, False
+        return "pipe:0", True
+
+    def __enter__(self) -> "PipeDecoder":
+        try:
+            input_path, feed = self._input()
+        except UploadAbortedError as e:
+            raise ValueError(str(e))
+
+        self._proc = subprocess.Popen(
+            _ffmpeg_command(
+                input_path, self.flip, self.max_long_edge, self.target_fps,
+                _input_args(self.suffix, self.frame_rate, self.live),
+            ),
+            stdin=subprocess.PIPE if feed else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self._last_progress = time.monotonic()
+        self._watchdog = threading.Thread(target=self._kill_when_stalled, args=(self._proc,), daemon=True)
+        self._watchdog.start()
+
+        if feed:
+            # Feed stdin from a thread so a full stdout pipe can't deadlock us
+            self._writer = threading.Thread(target=self._feed_stdin, args=(self._proc,), daemon=True)
+            self._writer.start()
+
+        header = self._proc.stdout.readline()
+        if not header:
+            self._finish()
+            raise ValueError("Could not open video file")
+        self.info = _parse_y4m_header(header)
+        return self
+
+    def _feed_stdin(self, proc: subprocess.Popen) -> None:
+        try:
+            if isinstance(self.video, SpoolReader):
+                for chunk in self.video.chunks():
+                    proc.stdin.write(chunk)
+                    self._last_progress = time.monotonic()
+            else:
+                proc.stdin.write(self.video)
+        except UploadAbortedError:
+            # The upload was rejected mid-stream: stop decoding what we have
+            self._aborted = True
+            proc.kill()
+        except (BrokenPipeError, OSError):
+            pass  # ffmpeg exited early; its stderr explains why
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    def _kill_when_stalled(self, proc: subprocess.Popen) -> None:
+        while not self._done.is_set():
+            idle = time.monotonic() - self._last_progress
+            if idle >= DECODE_TIMEOUT:
+                if proc.poll() is None:
+                    self._timed_out = True
+                    proc.kill()
+                return
+            self._done.wait(DECODE_TIMEOUT - idle)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        frame_size = _frame_size(self.info)
+        stdout = self._proc.stdout
+        while True:
+            marker = stdout.readline()
+            if not marker:
+                break
+            buf = stdout.read(frame_size)
+            if len(buf) < frame_size:
+                break
+            self._last_progress = time.monotonic()
+            yield _yuv_to_rgb(buf, self.info)
+        self._finish()
+
+    def _finish(self) -> None:
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        if self._writer is not None:
+            self._writer.join(timeout=1)
+        stderr = proc.stderr.read()
+        returncode = proc.wait()
+        self._cleanup(proc)
+        if self._aborted:
+            raise ValueError("Upload aborted")
+        if self._timed_out:
+            raise ValueError("ffmpeg decoding timed out")
+        if returncode != 0:
+            raise ValueError(f"ffmpeg decoding failed: {stderr.decode(errors='replace')}")
+
+    def _cleanup(self, proc: subprocess.Popen) -> None:
+        self._done.set()
+        for stream in (proc.stdout, proc.stderr):
+            stream.close()
+        if self._shm_path and os.path.exists(self._shm_path):
+            os.remove(self._shm_path)
+            self._shm_path = None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._proc is None:
+            return
+        if exc_type is not None or self._proc.poll() is None:
+            # Stopped early (error or caller broke out of the loop): don't wait for ffmpeg
+            proc, self._proc = self._proc, None
+            proc.kill()
+            proc.wait()
+            if self._writer is not None:
+                self._writer.join(timeout=1)
+            self._cleanup(proc)
+        else:
+            self._finish()
+
@@ -0,0 +1,173 @@
+"""
+Bounded worker pools for running blocking work off the event loop.
+
+Video extraction (ffmpeg + MediaPipe) is CPU-bound and runs in a process pool
+so a single uvicorn instance can use every core. The pool caps the number of
+jobs that may be running or waiting; once full, new jobs are rejected with
+PoolSaturatedError instead of piling up behind the current ones. Gemini
+calls are async and limited the same way by gemini/async_client.py, sized
+by EVALUATION_WORKERS and EVALUATION_QUEUE_SIZE.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from .detector_pool import preload_detectors
+
+
+def _noop() -> None:
+    pass
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool already has as many jobs as it is allowed to hold."""
+
+    def __init__(self, pool_name: str, status_code: int, retry_after: int):
+        super().__init__(f"Server is busy ({pool_name} queue is full). Please try again shortly.")
+        self.pool_name = pool_name
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised when a process worker died (e.g. OOM-killed) while running a job."""
+
+
+class WorkerPool:
+    """
+    An executor with a bounded queue.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may
+    wait for a free worker. The executor is created lazily on first use so
+    scripts that import this module never spawn processes they don't need.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        use_processes: bool = False,
+        saturated_status: int = 503,
+        retry_after: int = 2,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+    ):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.use_processes = use_processes
+        self.saturated_status = saturated_status
+        self.retry_after = retry_after
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.use_processes:
+            # spawn, not fork: MediaPipe/TFLite threads are not fork-safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.name,
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+
+    async def warm(self) -> None:
+        """
+        Bring every worker up (running its initializer) before traffic arrives.
+        Process pools otherwise spawn workers lazily on the first requests.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _noop) for _ in range(self.max_workers)
+        ))
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) in the pool and await its result.
+
+        Raises:
+            PoolSaturatedError: if the pool is already at capacity
+        """
+        if self._in_flight >= self.capacity:
+            self._rejected += 1
+            raise PoolSaturatedError(self.name, self.saturated_status, self.retry_after)
+
+        self.start()
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); rebuild the pool for the next job
+            self._failed += 1
+            self.shutdown(wait=False)
+            raise WorkerCrashedError(f"{self.name} worker crashed while processing the request")
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+        self._completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "queue_size": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+EXTRACTION_WORKERS = _env_int("EXTRACTION_WORKERS", os.cpu_count() or 1)
+EXTRACTION_QUEUE_SIZE = _env_int("EXTRACTION_QUEUE_SIZE", 2 * EXTRACTION_WORKERS)
+EVALUATION_WORKERS = _env_int("EVALUATION_WORKERS", 8)
+EVALUATION_QUEUE_SIZE = _env_int("EVALUATION_QUEUE_SIZE", 32)
+
+extraction_pool = WorkerPool(
+    "extraction",
+    max_workers=EXTRACTION_WORKERS,
+    max_queue=EXTRACTION_QUEUE_SIZE,
+    use_processes=True,
+    saturated_status=503,
+    initializer=preload_detectors,
+)
@@ -0,0 +1,50 @@
+"""
+Tests for /api/evaluate-batch.
+Run with: python -m pytest backend/app/test_evaluate_batch.py
+"""
+import json
+import os
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESULT_CACHE", "0")
+
+from fastapi.testclient import TestClient
+
+from app import main
+
+ATTEMPT = Path(__file__).parent / "gemini" / "test_files" / "attempt" / "greeting_attempt.json"
+
+
+def test_local_attempts_fail_on_their_own(monkeypatch):
+    attempt = json.loads(ATTEMPT.read_text())
+    score_locally = main._score_locally
+
+    def fail_on_short(word, attempt_landmarks):
+        if len(json.loads(attempt_landmarks)["frames"]) < len(attempt["frames"]):
+            raise RuntimeError("scorer crashed")
+        return score_locally(word, attempt_landmarks)
+
+    monkeypatch.setattr(main, "_score_locally", fail_on_short)
+    short = dict(attempt, frames=attempt["frames"][:-5])
+    response = TestClient(main.app).post(
+        "/api/evaluate-batch?word=greeting&mode=local",
+        json={"attempts": [attempt, short, "not an attempt"]},
+    )
+
+    assert response.status_code == 200
+    evaluation, crashed, invalid = response.json()["results"]
+    assert 0 <= evaluation["evaluation"]["overall_score_0_to_4"] <= 4
+    assert crashed == {"error": "scorer crashed"}
+    assert invalid["error"].startswith("Invalid landmarks")
+
+
+def test_batch_outside_a_timed_request(monkeypatch):
+    # Without the timing middleware there are no request timings to record the container on
+    monkeypatch.setattr(main, "TIMED_PATHS", set())
+    response = TestClient(main.app).post(
+        "/api/evaluate-batch?word=greeting&mode=local",
+        json={"attempts": [json.loads(ATTEMPT.read_text())]},
+    )
+    assert response.status_code == 200
+    assert "evaluation" in response.json()["results"][0]
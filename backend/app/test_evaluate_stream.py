@@ -0,0 +1,114 @@
+"""
+Tests for the /api/evaluate-sign/stream event stream.
+Run with: python -m pytest backend/app/test_evaluate_stream.py
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESULT_CACHE", "0")
+
+from fastapi.testclient import TestClient
+
+from google.genai import errors as genai_errors
+
+from app import main
+from app.gemini import getresponse
+from app.services import upload_spool
+from app.services.worker_pool import extraction_pool
+
+VIDEO = Path(__file__).parent / "services" / "reference_videos" / "hello.mp4"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_spool, "UPLOAD_SPOOL_DIR", tmp_path)
+    yield TestClient(main.app)
+    extraction_pool.shutdown()
+
+
+def events(response) -> list:
+    """(event, data) pairs of a Server-Sent Events body."""
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        parsed.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return parsed
+
+
+def post(client, video: bytes, mime="video/mp4", mode="local"):
+    return client.post(f"/api/evaluate-sign/stream?word=hello&mode={mode}",
+                       files={"video": ("hello.mp4", video, mime)})
+
+
+def test_events_run_from_extraction_to_the_result(client, tmp_path, monkeypatch):
+    progress_files = []
+    new_progress_file = main.new_progress_file
+
+    def recorded():
+        progress_files.append(new_progress_file())
+        return progress_files[-1]
+
+    monkeypatch.setattr(main, "new_progress_file", recorded)
+
+    response = post(client, VIDEO.read_bytes())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    stream = events(response)
+    names = [event for event, _ in stream]
+    assert names[-2:] == ["progress", "result"]
+    assert set(names[:-2]) == {"progress"}
+    extracting = [data for event, data in stream if data.get("stage") == "extracting"]
+    assert extracting and extracting[-1]["frame"] == extracting[-1]["total"] > 0
+    assert stream[-2][1] == {"stage": "evaluating"}
+    result = stream[-1][1]
+    assert result["word"] == "hello" and 0 <= result["evaluation"]["overall_score_0_to_4"] <= 4
+
+    assert Path(progress_files[0]).parent == tmp_path  # with the upload spools, and removed afterwards
+    assert not list(tmp_path.iterdir())
+
+
+def test_scoring_errors_end_the_stream_with_an_error_event(client, monkeypatch):
+    def crash(word, attempt_landmarks):
+        raise RuntimeError("scorer crashed")
+
+    monkeypatch.setattr(main, "_score_locally", crash)
+    stream = events(post(client, VIDEO.read_bytes()))
+
+    assert stream[-2] == ("progress", {"stage": "evaluating"})
+    assert stream[-1] == ("error", {"detail": "AI evaluation failed: scorer crashed", "status": 500})
+
+
+@pytest.mark.parametrize("mode, score", [("auto", "local"), ("gemini", 0)])
+def test_gemini_errors_fall_back_to_the_local_score_in_auto_mode(client, monkeypatch, mode, score):
+    async def rejected(request):
+        raise genai_errors.ClientError(400, {"error": {"code": 400, "message": "Request contains an invalid argument"}})
+        yield
+
+    monkeypatch.setattr(getresponse, "CONTEXT_CACHE_ENABLED", False)
+    monkeypatch.setattr(getresponse, "_generate_stream", rejected)
+    local = main._score_locally("hello", main._load_reference("hello"))
+    monkeypatch.setattr(main, "_score_locally", lambda word, attempt_landmarks: local)
+
+    event, data = events(post(client, VIDEO.read_bytes(), mode=mode))[-1]
+
+    assert event == "result"
+    if score == "local":
+        assert data["evaluation"] == local.model_dump()
+    else:
+        assert data["evaluation"]["overall_score_0_to_4"] == 0
+
+
+def test_videos_that_cannot_be_decoded_are_rejected(client):
+    response = post(client, b"not a video" * 100, mime="video/webm")
+
+    if response.status_code == 200:  # the upload was in before decoding failed
+        event, data = events(response)[-1]
+        assert event == "error" and data["status"] == 400
+    else:
+        assert response.status_code == 400
+        assert "Video processing error" in response.json()["detail"]
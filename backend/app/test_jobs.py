@@ -0,0 +1,46 @@
+"""
+Tests for job mode: which failures are retried.
+Run with: python -m pytest backend/app/test_jobs.py
+"""
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESULT_CACHE", "0")
+
+from app import main
+from app.gemini.async_client import GeminiUnavailableError
+from app.services.job_queue import JobQueue, JobRunner
+from app.services.worker_pool import PoolSaturatedError, WorkerCrashedError
+
+
+def test_only_transient_failures_are_retried():
+    assert main._job_retryable(PoolSaturatedError("extraction", 503, 2))
+    assert main._job_retryable(GeminiUnavailableError("deadline exceeded"))
+    assert main._job_retryable(WorkerCrashedError("extraction worker crashed"))
+    assert main._job_retryable(TimeoutError("Timed out waiting for a free MediaPipe detector"))
+    assert not main._job_retryable(FileNotFoundError("upload.webm"))
+    assert not main._job_retryable(PermissionError("hello.json"))
+    assert not main._job_retryable(ValueError("Could not decode video"))
+
+
+def test_missing_upload_fails_on_the_first_attempt(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3", max_attempts=3, retry_delay=0.0)
+    job_id = queue.enqueue({"word": "hello", "mode": "local", "upload": str(tmp_path / "gone.webm"),
+                            "suffix": ".webm"})
+
+    async def run():
+        runner = JobRunner(queue, main._run_job, main._job_retryable, workers=1, poll_interval=0.01)
+        runner.start()
+        try:
+            for _ in range(200):
+                if queue.get(job_id).status == "failed":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await runner.stop()
+
+    asyncio.run(run())
+    job = queue.get(job_id)
+    assert (job.status, job.attempts) == ("failed", 1)
+    assert "gone.webm" in job.error
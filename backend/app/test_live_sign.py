@@ -0,0 +1,82 @@
+"""
+Tests for the /api/live-sign WebSocket protocol.
+Run with: python -m pytest backend/app/test_live_sign.py
+"""
+import os
+from pathlib import Path
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESULT_CACHE", "0")
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services.worker_pool import extraction_pool
+
+VIDEO = Path(__file__).parent / "services" / "reference_videos" / "hello.mp4"
+
+
+@pytest.fixture
+def client():
+    yield TestClient(main.app)
+    extraction_pool.shutdown()
+
+
+def closed_with(ws) -> int:
+    with pytest.raises(WebSocketDisconnect) as closed:
+        ws.receive_json()
+    return closed.value.code
+
+
+def test_recording_is_extracted_and_scored(client):
+    data = VIDEO.read_bytes()
+    with client.websocket_connect("/api/live-sign?word=hello&format=mp4&mode=local") as ws:
+        assert ws.receive_json() == {"type": "ready"}
+        for i in range(0, len(data), 64 * 1024):
+            ws.send_bytes(data[i:i + 64 * 1024])
+        ws.send_json({"type": "stop"})
+
+        extracted = ws.receive_json()
+        assert extracted["type"] == "extracted" and extracted["wait_ms"] >= 0
+        assert "active_range" in extracted
+        result = ws.receive_json()
+        assert result["type"] == "result" and result["word"] == "hello"
+        assert 0 <= result["evaluation"]["overall_score_0_to_4"] <= 4
+        assert closed_with(ws) == 1000
+    assert main.live_sessions.active == 0
+
+
+def test_invalid_options_are_rejected_before_ready(client):
+    with client.websocket_connect("/api/live-sign?word=hello&format=avi") as ws:
+        message = ws.receive_json()
+        assert message["type"] == "error" and "Invalid format" in message["detail"]
+        assert closed_with(ws) == main.WS_POLICY_VIOLATION
+
+
+def test_sessions_over_the_limit_are_turned_away(client, monkeypatch):
+    monkeypatch.setattr(main, "live_sessions", main._LiveSessions(0))
+    with client.websocket_connect("/api/live-sign?word=hello") as ws:
+        assert "Too many live sessions" in ws.receive_json()["detail"]
+        assert closed_with(ws) == main.WS_TRY_AGAIN_LATER
+    assert main.live_sessions.rejected == 1
+
+
+def test_recording_is_cut_off_after_the_time_limit(client, monkeypatch):
+    monkeypatch.setattr(main, "LIVE_MAX_SECONDS", 0.2)
+    with client.websocket_connect("/api/live-sign?word=hello") as ws:
+        assert ws.receive_json() == {"type": "ready"}
+        message = ws.receive_json()  # the client never stops
+        assert message["type"] == "error" and "longer than" in message["detail"]
+        assert closed_with(ws) == main.WS_POLICY_VIOLATION
+    assert main.live_sessions.active == 0
+
+
+def test_cancelled_recording(client):
+    with client.websocket_connect("/api/live-sign?word=hello") as ws:
+        assert ws.receive_json() == {"type": "ready"}
+        ws.send_json({"type": "cancel"})
+        assert ws.receive_json() == {"type": "error", "detail": "Recording cancelled"}
+        assert closed_with(ws) == main.WS_POLICY_VIOLATION
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 """
 Process all reference videos and extract landmarks
+
+Builds in parallel without a preview window and only re-extracts videos that
+changed since the last run; see backend/app/services/reference_build.py.
+Arguments are passed through, e.g. --force, --workers 4, --dry-run.
 """
 import sys
 from pathlib import Path
@@ -9,14 +13,11 @@ from pathlib import Path
 backend_path = Path(__file__).parent / 'backend'
 sys.path.insert(0, str(backend_path))
 
-from app.services.landmark_extractor import extract_multiple_videos
+from app.services.reference_build import main
 
 if __name__ == "__main__":
     print("\n🎬 Processing all reference videos...")
-    print("This will extract landmarks from every video in reference_videos/")
-    print("and save them as JSON files in reference_landmarks/\n")
-
-    # Process all videos with face sampling every 10 frames
-    extract_multiple_videos(face_sample_rate=10)
+    print("This will extract landmarks from new or changed videos in reference_videos/")
+    print("and save them as JSON + .lmk files in reference_landmarks/\n")
 
-    print("\n✅ All done!")
+    sys.exit(main(sys.argv[1:]))